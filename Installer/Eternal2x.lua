@@ -1,5 +1,5 @@
 -- Eternal2x Resolve Script Panel (Workspace > Scripts)
--- Compact UI: 4 actions + 1 sensitivity slider
+-- Compact UI: 5 actions + 1 sensitivity slider
 
 local function script_dir()
     local info = debug.getinfo(1, "S")
@@ -74,6 +74,14 @@ local function is_windows()
     return package.config:sub(1, 1) == "\\"
 end
 
+local function temp_dir()
+    local dir = os.getenv("TEMP") or os.getenv("TMP") or os.getenv("TMPDIR")
+    if not dir or dir == "" then
+        dir = is_windows() and "C:/Windows/Temp" or "/tmp"
+    end
+    return trim_trailing_sep(dir)
+end
+
 local function get_selected_clip_path(resolve)
     local project = resolve:GetProjectManager():GetCurrentProject()
     if not project then return nil, "No active project." end
@@ -128,11 +136,16 @@ local REPO_ROOT = trim_trailing_sep(conf["repo_root"] or root or "")
 local PYTHON = conf["python"] or (is_windows() and "python" or "python3")
 local UPDATE_URL = conf["update_url"] or ""
 local AUTO_UPDATE = parse_bool(conf["auto_update"], true)
+-- Opt-in (worker_daemon=true): run stages through the resident worker
+-- (Stages.worker_client / worker_daemon), so numpy/cv2 and the Resolve
+-- connection stay loaded between clicks. The client starts the daemon on
+-- first use and runs the stage itself only if it never started there.
+local WORKER_DAEMON = parse_bool(conf["worker_daemon"], false)
 
 local win = disp:AddWindow({
     ID = "Eternal2x",
     WindowTitle = "Eternal2x",
-    Geometry = {100, 100, 430, 420},
+    Geometry = {100, 100, 430, 460},
     StyleSheet = [[
         QWidget {
             background-color: #0d131c;
@@ -205,6 +218,7 @@ local win = disp:AddWindow({
         ui:Button{ID="RegroupBtn", Text="Regroup"},
         ui:Button{ID="UpscaleBtn", Text="Upscale + Interpolate"},
     },
+    ui:Button{ID="DetectTimelineBtn", Text="Detect All Clips on Timeline"},
     ui:Label{ID="UpdateSection", Text="UPDATES", ObjectName="Section"},
     ui:Button{ID="UpdateBtn", Text="Check for Updates"},
     ui:Label{ID="SensitivitySection", Text="SENSITIVITY", ObjectName="Section"},
@@ -237,11 +251,43 @@ local function sensitivity_value()
     return v / 100.0
 end
 
-function win.On.SensSlider.ValueChanged(ev)
+-- Threshold sweep written by the last Detect: slider position (0-100) -> counts.
+local sweep = nil
+
+local function load_sweep(path)
+    local f = io.open(path, "r")
+    if not f then
+        return nil
+    end
+    local text = f:read("*a")
+    f:close()
+    local out = {}
+    local pattern = '"threshold":%s*([%-%d%.eE]+),%s*"segments":%s*(%d+),%s*"motion_frames":%s*(%d+)'
+    for t, segs, frames in text:gmatch(pattern) do
+        local pos = math.floor(tonumber(t) * 100 + 0.5)
+        out[pos] = {segments = tonumber(segs), frames = tonumber(frames)}
+    end
+    if next(out) == nil then
+        return nil
+    end
+    return out
+end
+
+local function update_sens_label()
     local v = sensitivity_value()
-    if items and items.SensLabel then
-        items.SensLabel.Text = string.format("Interpolate Sensitivity: %.2f", v)
+    if not (items and items.SensLabel) then
+        return
     end
+    local text = string.format("Interpolate Sensitivity: %.2f", v)
+    local entry = sweep and sweep[math.floor(v * 100 + 0.5)]
+    if entry then
+        text = text .. string.format("  (%d segments, %d frames)", entry.segments, entry.frames)
+    end
+    items.SensLabel.Text = text
+end
+
+function win.On.SensSlider.ValueChanged(ev)
+    update_sens_label()
 end
 
 local function build_command(module_name, extra_args)
@@ -264,7 +310,11 @@ local function run_stage(stage_label, module_name, extra_args)
         return
     end
     set_status(stage_label .. " running...")
-    local ok = run_command(build_command(module_name, extra_args))
+    local cmd = build_command(module_name, extra_args)
+    if WORKER_DAEMON then
+        cmd = build_command("Stages.worker_client", " " .. module_name .. (extra_args or ""))
+    end
+    local ok = run_command(cmd)
     if ok == true or ok == 0 then
         set_status(stage_label .. " finished.")
     else
@@ -310,9 +360,22 @@ function win.On.DetectBtn.Clicked(ev)
         return
     end
     local v = sensitivity_value()
+    local sweep_path = temp_dir() .. "/eternal2x_sweep.json"  -- per-run output, kept out of the repo
+    os.remove(sweep_path)
     local args = " --video " .. shell_quote(path)
         .. " --sensitivity " .. string.format("%.4f", v)
+        .. " --sweep_out " .. shell_quote(sweep_path)
     run_stage("Detect", "Stages.resolve_detect_markers", args)
+    sweep = load_sweep(sweep_path)
+    update_sens_label()
+end
+
+function win.On.DetectTimelineBtn.Clicked(ev)
+    local v = sensitivity_value()
+    local args = " --timeline --sensitivity " .. string.format("%.4f", v)
+    run_stage("Detect Timeline", "Stages.resolve_detect_markers", args)
+    sweep = nil  -- the sweep describes one clip; a timeline run has none
+    update_sens_label()
 end
 
 function win.On.CutFrameBtn.Clicked(ev)
@@ -80,7 +80,8 @@ def main() -> int:
         f"repo_root={repo_root}\n"
         f"python={python_path}\n"
         f"update_url={DEFAULT_UPDATE_URL}\n"
-        "auto_update=true\n",
+        "auto_update=true\n"
+        "worker_daemon=false\n",
         encoding="utf-8",
     )
 
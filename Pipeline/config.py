@@ -14,4 +14,36 @@ class UpscaleConfig:
     tile_grid: int = 8 # 8 = 8x8 tiles
     min_segment_frames: int = 4 # ignore tiny bursts
     merge_gap_frames: int = 2 # merge close segments
-    sample_every_n: int = 1 # analyze every Nth frame
\ No newline at end of file
+    sample_every_n: int = 1 # analyze every Nth frame
+    adaptive_sampling: bool = False # rescore every frame near the threshold after the stride-N pass
+    adaptive_margin: float = 0.5 # refine band = sensitivity * margin (near threshold or jump)
+    auto_sensitivity: str = "off" # "off", "percent" (top auto_motion_percent of frames) or "split" (Otsu)
+    auto_motion_percent: float = 10.0 # share of frames treated as motion in "percent" mode
+    static_cascade: bool = False # score on a 32x18 thumbnail first; clearly static pairs skip the detail kernel
+    static_floor: float = 0.02 # thumbnail score below this counts as static
+    score_roi: str = "" # "" = full frame, "x,y,w,h" in source pixels, or "auto" (crop letterbox/pillarbox bars)
+    roi_black_level: int = 24 # "auto": rows/columns never brighter than this in sampled frames are bars
+
+    #Frame decoding
+    frame_source: str = "opencv" # "opencv", "ffmpeg" (gray + scale in the decoder) or "auto"
+    ffmpeg_path: str = "ffmpeg" # ffmpeg binary for the ffmpeg frame source
+    sequence_fps: float = 24.0 # frame rate assumed for image sequences (folders / patterns)
+    sequence_workers: int = 0 # image-sequence decode threads, 0 = all cores
+    sequence_read_ahead: int = 8 # image-sequence frames decoded ahead of the scorer
+    raw_size: str = "" # "WxH" = input is headerless raw frames (file, or "-" for stdin); "" = container/sequence
+    raw_pix_fmt: str = "gray" # raw frame layout: gray, yuv420p, yuv422p, yuv444p, nv12 or nv21 (8-bit)
+    raw_fps: float = 24.0 # frame rate assumed for raw input
+
+    #Parallel scoring
+    score_workers: int = 1 # >1 = score chunks in worker processes, 0 = all cores
+    score_chunk_frames: int = 1800 # frames per worker chunk
+    decode_ahead: int = 0 # >0 = decoder thread keeps this many frames queued
+    score_batch_frames: int = 0 # >1 = detail diff/blur/tile pass over stacks of this many frames
+    score_ring_slots: int = 0 # >0 = one decoder process feeds score_workers scorers through a shared-memory ring of this many frames
+    timeline_jobs: int = 0 # timeline-wide Detect: sources scored at once (one process each), 0 = all cores
+    timeline_gap_frames: int = 48 # timeline-wide Detect: used ranges of one source closer than this are scored as one
+
+    #Score cache
+    score_cache: bool = True # reuse per-frame scores across Detect runs
+    score_cache_dir: str = "" # empty = per-user cache folder
+    score_cache_mb: int = 256 # size cap; least recently used entries are evicted
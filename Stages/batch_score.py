@@ -0,0 +1,409 @@
+# Stages/batch_score.py
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+from Stages.image_sequence import is_image_sequence, resolve_sequence
+from Stages.motion_score import compute_motion_scores
+from Stages.score_cache import cache_from_config, lookup_scores, score_params
+from Stages.score_file import DTYPES, write_score_file
+
+
+MANIFEST_VERSION = 1
+VIDEO_EXTENSIONS = (".mov", ".mp4", ".m4v", ".mxf", ".mkv", ".avi", ".mts", ".m2ts", ".webm")
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+
+def _input_bytes(path: Path) -> int:
+    # Scheduling weight: file size, or the summed frame sizes of an image sequence.
+    try:
+        if is_image_sequence(path):
+            return sum(f.stat().st_size for f in resolve_sequence(path))
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def collect_inputs(inputs: List[str], recursive: bool = False) -> List[Path]:
+    """
+    Files to score from `inputs`: video files as given, image sequences
+    (folders and patterns, see Stages.image_sequence) as one input each, and
+    the videos in a folder - or, if it holds none, the folder as a sequence.
+    `recursive` also walks subfolders. Duplicates are dropped, order kept.
+    """
+    found: List[Path] = []
+
+    def walk(folder: Path) -> None:
+        videos, subfolders = [], []
+        for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+            if entry.is_dir():
+                subfolders.append(Path(entry.path))
+            elif Path(entry.name).suffix.lower() in VIDEO_EXTENSIONS:
+                videos.append(Path(entry.path))
+        if videos:
+            found.extend(videos)
+        elif resolve_sequence(folder):
+            found.append(folder)
+        if recursive:
+            for sub in subfolders:
+                walk(sub)
+
+    for value in inputs:
+        path = Path(value).expanduser()
+        if path.is_dir():
+            walk(path)
+        elif path.is_file() or is_image_sequence(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(f"No such input: {value}")
+    unique: Dict[str, Path] = {}
+    for path in found:
+        unique.setdefault(str(path.resolve()), path.resolve())
+    return list(unique.values())
+
+
+def read_list_file(path: Path) -> List[str]:
+    # One input per line; blank lines and "#" comments are ignored.
+    with Path(path).open("r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def _output_names(paths: List[Path]) -> List[str]:
+    # "<stem>.e2xs", with "_2", "_3", ... for stems seen before (same name in different folders).
+    seen: Dict[str, int] = {}
+    names = []
+    for path in paths:
+        stem = path.stem if path.suffix else path.name
+        stem = stem.replace("%", "").replace("#", "").replace("*", "") or "sequence"
+        count = seen.get(stem.lower(), 0) + 1
+        seen[stem.lower()] = count
+        names.append(f"{stem}.e2xs" if count == 1 else f"{stem}_{count}.e2xs")
+    return names
+
+
+class Manifest:
+    """
+    JSON job list for one batch run: the scoring config, the outputs and one
+    entry per input with its status (pending / done / failed), frame count,
+    fps, scoring time and error. Every change is written through atomically
+    (temp file + os.replace), so an interrupted run leaves the manifest as
+    of its last finished file and --resume picks up the rest.
+    """
+
+    def __init__(self, path: Path, data: Dict):
+        self.path = Path(path)
+        self.data = data
+
+    @classmethod
+    def create(
+        cls,
+        path: Path,
+        inputs: List[Path],
+        cfg: UpscaleConfig,
+        out_dir: Optional[Path],
+        scores_format: str,
+    ) -> "Manifest":
+        names = _output_names(inputs)
+        jobs = [
+            {
+                "path": str(p),
+                "bytes": _input_bytes(p),
+                "output": str(out_dir / name) if out_dir is not None else "",
+                "status": PENDING,
+            }
+            for p, name in zip(inputs, names)
+        ]
+        data = {
+            "version": MANIFEST_VERSION,
+            "config": asdict(cfg),
+            "scores_format": scores_format,
+            "out_dir": str(out_dir) if out_dir is not None else "",
+            "jobs": jobs,
+            "runs": [],
+        }
+        manifest = cls(path, data)
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        with Path(path).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or data.get("version", 0) > MANIFEST_VERSION or "jobs" not in data:
+            raise ValueError(f"Not a batch manifest (or a newer version): {path}")
+        return cls(path, data)
+
+    @property
+    def jobs(self) -> List[Dict]:
+        return self.data["jobs"]
+
+    def config(self) -> UpscaleConfig:
+        # Unknown keys (from another version) are ignored, missing ones keep their defaults.
+        known = {f.name for f in fields(UpscaleConfig)}
+        return UpscaleConfig(**{k: v for k, v in self.data.get("config", {}).items() if k in known})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def counts(self) -> Dict[str, int]:
+        out = {PENDING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs:
+            out[job["status"]] = out.get(job["status"], 0) + 1
+        return out
+
+
+def _score_job(path: str, cfg: UpscaleConfig, output: str, scores_format: str) -> Tuple[np.ndarray, float, float]:
+    """
+    Pool worker: scores one input and, with `output`, writes it as a score
+    file (temp file + rename, so a killed run never leaves a torn one).
+    Returns (scores, fps, seconds).
+    """
+    t0 = time.perf_counter()
+    scores, fps = compute_motion_scores(Path(path), cfg)
+    if output:
+        _write_output(Path(output), scores, fps, cfg, scores_format, path)
+    return scores, fps, time.perf_counter() - t0
+
+
+def _write_output(path: Path, scores: np.ndarray, fps: float, cfg: UpscaleConfig, fmt: str, source: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    write_score_file(tmp, scores, fps, fmt=fmt, settings=score_params(cfg, 640), extra={"source": source})
+    os.replace(tmp, path)
+
+
+def run_batch(manifest: Manifest, workers: int, retry_failed: bool = False) -> Iterator[Tuple[Dict, str]]:
+    """
+    Scores every pending job of `manifest` (and failed ones with
+    `retry_failed`), yielding (job, how) as each one finishes, with how =
+    "cache", "scored", "copy" (same content and settings as a job scored in
+    this run) or "failed". The manifest is saved after each job.
+
+    Cache hits are served in this process first. The rest run largest-first
+    on a ProcessPoolExecutor of `workers` processes, which import numpy/cv2
+    once and then take file after file; each scores its file serially
+    (score_workers / the frame ring only apply with one worker). Cache writes
+    stay in this process, score files are written by the workers.
+    """
+    cfg = manifest.config()
+    fmt = manifest.data.get("scores_format", "f32")
+    cache = cache_from_config(cfg)
+    todo = [job for job in manifest.jobs if job["status"] == PENDING or (retry_failed and job["status"] == FAILED)]
+
+    def finish(job: Dict, how: str, scores=None, fps: float = 0.0, seconds: float = 0.0, error: str = "") -> Tuple:
+        if how == "failed":
+            job.update(status=FAILED, error=error)
+        else:
+            if how != "scored" and job["output"] and not Path(job["output"]).is_file():
+                _write_output(Path(job["output"]), scores, fps, cfg, fmt, job["path"])
+            job.update(status=DONE, frames=int(len(scores)), fps=float(fps), seconds=round(seconds, 3), source=how)
+            job.pop("error", None)
+        manifest.save()
+        return job, how
+
+    pending: List[Tuple[Dict, Optional[str]]] = []
+    copies: Dict[str, List[Dict]] = {}  # cache key -> later jobs with the same content and settings
+    for job in todo:
+        key = hit = None
+        if cache is not None:
+            try:
+                key, hit = lookup_scores(cache, Path(job["path"]), cfg)
+            except OSError:
+                pass  # missing input; scoring reports it
+        if hit is not None:
+            yield finish(job, "cache", *hit)
+        elif key is not None and key in copies:
+            copies[key].append(job)  # e.g. the same card offloaded twice: score once
+        else:
+            pending.append((job, key))
+            if key is not None:
+                copies[key] = []
+
+    pending.sort(key=lambda p: p[0].get("bytes", 0), reverse=True)
+    workers = max(1, min(workers, len(pending)))
+    inner = cfg if workers == 1 else replace(cfg, score_workers=1, score_ring_slots=0)
+
+    def done(job: Dict, key: Optional[str], result=None, error: str = "") -> Iterator[Tuple[Dict, str]]:
+        same = copies.get(key, []) if key is not None else []
+        if result is None:
+            for j in [job] + same:
+                yield finish(j, "failed", error=error)
+            return
+        scores, fps, seconds = result
+        if cache is not None and key is not None:
+            cache.put(key, scores, fps, source=job["path"])
+        yield finish(job, "scored", scores, fps, seconds)
+        for j in same:
+            yield finish(j, "copy", scores, fps)
+
+    if workers == 1:
+        for job, key in pending:
+            try:
+                result = _score_job(job["path"], inner, job["output"], fmt)
+            except Exception as exc:
+                yield from done(job, key, error=str(exc))
+                continue
+            yield from done(job, key, result)
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            pool.submit(_score_job, job["path"], inner, job["output"], fmt): (job, key) for job, key in pending
+        }
+        for future in as_completed(futures):
+            job, key = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                yield from done(job, key, error=str(exc))
+                continue
+            yield from done(job, key, result)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def describe_run(finished: List[Tuple[Dict, str]], wall_s: float, manifest: Manifest) -> List[str]:
+    """Throughput summary of one run_batch pass."""
+    scored = [job for job, how in finished if how == "scored"]
+    cached = sum(1 for _job, how in finished if how in ("cache", "copy"))
+    failed = [job for job, how in finished if how == "failed"]
+    frames = sum(job["frames"] for job in scored)
+    data_mb = sum(job.get("bytes", 0) for job in scored) / 2 ** 20
+    busy = sum(job["seconds"] for job in scored)
+    counts = manifest.counts()
+    lines = [
+        f"Batch: {len(scored)} scored, {cached} from cache or copies, {len(failed)} failed in {wall_s:.1f}s; "
+        f"manifest {counts[DONE]}/{len(manifest.jobs)} done, {counts[PENDING]} pending, {counts[FAILED]} failed."
+    ]
+    if scored:
+        lines.append(
+            f"Throughput: {frames} frames, {frames / max(wall_s, 1e-9):.0f} fps overall "
+            f"({frames / max(busy, 1e-9):.0f} fps per worker), {data_mb / max(wall_s, 1e-9):.1f} MiB/s of input."
+        )
+        slowest = max(scored, key=lambda job: job["seconds"])
+        name = Path(slowest["path"]).name
+        lines.append(f"Slowest: {name} ({slowest['frames']} frames in {slowest['seconds']:.1f}s).")
+    for job in failed:
+        lines.append(f"Failed: {job['path']}: {job['error']}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score many videos / image sequences in one process pool, with a resumable job manifest."
+    )
+    parser.add_argument("inputs", nargs="*", help="Video files, image sequences or folders of them")
+    parser.add_argument("--list", default=None, help="Text file with one input per line (# comments allowed)")
+    parser.add_argument("--recursive", action="store_true", help="Also walk subfolders of folder inputs")
+    parser.add_argument(
+        "--manifest", default="batch_manifest.json", help="Job manifest to write (default: batch_manifest.json)"
+    )
+    parser.add_argument(
+        "--resume",
+        default=None,
+        metavar="MANIFEST",
+        help="Continue an interrupted run from its manifest (its inputs, config and outputs)",
+    )
+    parser.add_argument("--retry_failed", action="store_true", help="With --resume, also rerun failed jobs")
+    parser.add_argument("--out_dir", default=None, help="Also write one binary score file per input here")
+    parser.add_argument(
+        "--scores_format",
+        choices=sorted(DTYPES),
+        default="f32",
+        help="Format of --out_dir score files (default: f32)",
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="Files scored at once, one process each (0 = all cores)")
+    parser.add_argument("--no_cache", action="store_true", help="Do not read or fill the score cache")
+    parser.add_argument("--cache_dir", default=None, help="Override cfg.score_cache_dir")
+    parser.add_argument("--motion_mode", choices=["detail", "global"], default=None, help="Override cfg.motion_mode")
+    parser.add_argument("--tile_grid", default=None, help="Override cfg.tile_grid, e.g. 8 or 16x9")
+    parser.add_argument("--sample_every_n", type=int, default=None, help="Override cfg.sample_every_n")
+    parser.add_argument("--static_cascade", action="store_true", help="Thumbnail pre-check for static pairs")
+    parser.add_argument(
+        "--frame_source", choices=["opencv", "ffmpeg", "auto"], default=None, help="Override cfg.frame_source"
+    )
+    parser.add_argument("--decode_ahead", type=int, default=None, help="Override cfg.decode_ahead (queued frames)")
+    parser.add_argument("--batch_frames", type=int, default=None, help="Override cfg.score_batch_frames")
+    parser.add_argument("--roi", default=None, help="Override cfg.score_roi: x,y,w,h, 'auto' or 'full'")
+    parser.add_argument("--sequence_fps", type=float, default=None, help="Override cfg.sequence_fps (image sequences)")
+    args = parser.parse_args()
+
+    if args.resume:
+        if args.inputs or args.list:
+            parser.error("--resume continues the manifest's own inputs; do not pass new ones")
+        manifest = Manifest.load(Path(args.resume))
+        print(f"Resuming {args.resume}: {manifest.counts()[DONE]}/{len(manifest.jobs)} done.")
+    else:
+        inputs = list(args.inputs) + (read_list_file(Path(args.list)) if args.list else [])
+        if not inputs:
+            parser.error("give inputs (files, folders, --list) or --resume MANIFEST")
+        if Path(args.manifest).exists():
+            parser.error(f"{args.manifest} exists; continue it with --resume or pick another --manifest")
+        cfg = UpscaleConfig()
+        if args.no_cache:
+            cfg.score_cache = False
+        if args.cache_dir is not None:
+            cfg.score_cache_dir = args.cache_dir
+        if args.motion_mode is not None:
+            cfg.motion_mode = args.motion_mode
+        if args.tile_grid is not None:
+            cfg.tile_grid = args.tile_grid
+        if args.sample_every_n is not None:
+            cfg.sample_every_n = args.sample_every_n
+        if args.static_cascade:
+            cfg.static_cascade = True
+        if args.frame_source is not None:
+            cfg.frame_source = args.frame_source
+        if args.decode_ahead is not None:
+            cfg.decode_ahead = args.decode_ahead
+        if args.batch_frames is not None:
+            cfg.score_batch_frames = args.batch_frames
+        if args.roi is not None:
+            cfg.score_roi = "" if args.roi.lower() == "full" else args.roi
+        if args.sequence_fps is not None:
+            cfg.sequence_fps = args.sequence_fps
+        if not cfg.score_cache and not args.out_dir:
+            parser.error("--no_cache needs --out_dir, or the scores would go nowhere")
+        paths = collect_inputs(inputs, args.recursive)
+        out_dir = Path(args.out_dir).resolve() if args.out_dir else None
+        manifest = Manifest.create(Path(args.manifest), paths, cfg, out_dir, args.scores_format)
+        print(f"Wrote manifest with {len(paths)} input(s) -> {args.manifest}")
+
+    workers = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    started = time.time()
+    t0 = time.perf_counter()
+    finished: List[Tuple[Dict, str]] = []
+    try:
+        for job, how in run_batch(manifest, workers, retry_failed=args.retry_failed):
+            finished.append((job, how))
+            detail = job.get("error", "") if how == "failed" else f"{job['frames']} frames, {job['seconds']:.1f}s"
+            print(f"[{len(finished)}] {how}: {job['path']} ({detail})", flush=True)
+    except KeyboardInterrupt:
+        print(f"Interrupted; finished files are recorded. Continue with --resume {manifest.path}")
+    wall_s = time.perf_counter() - t0
+
+    frames = sum(job["frames"] for job, how in finished if how == "scored")
+    run = {"started": started, "wall_s": round(wall_s, 3), "workers": workers, "finished": len(finished)}
+    manifest.data["runs"].append(dict(run, frames=frames))
+    manifest.save()
+    for line in describe_run(finished, wall_s, manifest):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
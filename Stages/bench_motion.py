@@ -0,0 +1,543 @@
+# Stages/bench_motion.py
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import cv2
+
+from Pipeline.config import UpscaleConfig
+from Stages.frame_detect import detect_motion_segments, segments_to_dict
+from Stages.frame_source import scaled_size
+from Stages.motion_score import ScoreBuffer, compute_motion_scores, iter_score_batches, start_scoring_run
+from Stages.score_kernels import FrameStack, parse_tile_grid
+
+
+BENCH_VERSION = 1  # bump when clip generation or the result layout changes
+PATTERNS = ("static", "pan", "bursts")
+CLIP_FPS = 30.0
+
+
+@dataclass(frozen=True)
+class ClipSpec:
+    width: int
+    height: int
+    frames: int
+    pattern: str
+    seed: int = 0
+    fps: float = CLIP_FPS
+
+    @property
+    def name(self) -> str:
+        rate = "" if self.fps == CLIP_FPS else f"_{self.fps:.3f}fps"
+        return f"{self.pattern}_{self.width}x{self.height}_{self.frames}f_s{self.seed}{rate}"
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    clip: ClipSpec
+    motion_mode: str
+    tile_grid: Optional[Tuple[int, int]]  # None for global mode, which has no tiles
+    sample_every_n: int
+    max_width: int
+    frame_source: str = "opencv"
+    static_floor: Optional[float] = None  # None = full kernel on every pair
+    batch: int = 0  # score_batch_frames; 0 = one pair per call
+
+    @property
+    def case_id(self) -> str:
+        grid = "-" if self.tile_grid is None else f"{self.tile_grid[0]}x{self.tile_grid[1]}"
+        cascade = "" if self.static_floor is None else f"|cascade={self.static_floor:g}"
+        batch = f"|batch={self.batch}" if self.batch > 1 else ""
+        return (
+            f"{self.clip.name}|{self.motion_mode}|grid={grid}|n={self.sample_every_n}"
+            f"|w={self.max_width}|src={self.frame_source}{cascade}{batch}"
+        )
+
+
+# Suites are axis lists; every combination is run (global mode collapses the grid axis).
+SUITES: Dict[str, Dict] = {
+    "quick": {
+        "resolutions": [(640, 360)],
+        "frames": 120,
+        "patterns": list(PATTERNS),
+        "modes": ["detail", "global"],
+        "grids": [(8, 8)],
+        "strides": [1, 4],
+        "widths": [640],
+    },
+    "full": {
+        "resolutions": [(640, 360), (1280, 720), (1920, 1080)],
+        "frames": 300,
+        "patterns": list(PATTERNS),
+        "modes": ["detail", "global"],
+        "grids": [(4, 4), (8, 8), (16, 9)],
+        "strides": [1, 2, 4],
+        "widths": [320, 640],
+    },
+}
+
+
+def _background(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    # Smooth random texture with some hard edges, so blur + diff behave like real footage.
+    small = rng.integers(0, 256, size=(max(2, height // 16), max(2, width // 16), 3), dtype=np.uint8)
+    bg = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    for _ in range(12):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(width // 20, width // 4)), int(rng.integers(height // 20, height // 4))
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        cv2.rectangle(bg, (x, y), (x + w, y + h), color, thickness=-1)
+    return bg
+
+
+def _render_frame(spec: ClipSpec, bg: np.ndarray, i: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    static: fixed background plus light sensor noise
+    pan:    background scrolls 4 px/frame (global motion on every frame)
+    bursts: fixed background, a block moves fast for 15 frames out of every 60
+    """
+    h, w = bg.shape[:2]
+    if spec.pattern == "pan":
+        frame = np.roll(bg, shift=(i * 4) % w, axis=1)
+    else:
+        frame = bg.copy()
+    if spec.pattern == "bursts" and (i % 60) >= 45:
+        size = max(8, min(w, h) // 6)
+        t = (i % 60) - 45
+        x = int((t / 15.0) * (w - size))
+        y = (h - size) // 2
+        cv2.rectangle(frame, (x, y), (x + size, y + size), (255, 255, 255), thickness=-1)
+    noise = rng.integers(-3, 4, size=frame.shape, dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def make_clip(spec: ClipSpec, clip_dir: Path) -> Path:
+    """Writes the clip once (mp4v) and reuses it; content is deterministic for a given spec."""
+    if spec.pattern not in PATTERNS:
+        raise ValueError(f"Unknown clip pattern: {spec.pattern} (expected one of {', '.join(PATTERNS)})")
+    path = Path(clip_dir) / f"{spec.name}_v{BENCH_VERSION}.mp4"
+    if path.exists() and path.stat().st_size > 0:
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.mp4")
+    writer = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), spec.fps, (spec.width, spec.height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a VideoWriter for {tmp}")
+    rng = np.random.default_rng(spec.seed)
+    bg = _background(spec.width, spec.height, rng)
+    try:
+        for i in range(spec.frames):
+            writer.write(_render_frame(spec, bg, i, rng))
+    finally:
+        writer.release()
+    os.replace(tmp, path)
+    return path
+
+
+def build_cases(
+    suite: Dict,
+    frame_sources: Sequence[str] = ("opencv",),
+    seed: int = 0,
+    static_floors: Sequence[Optional[float]] = (None,),
+    batches: Sequence[int] = (0,),
+) -> List[BenchCase]:
+    clips = [
+        ClipSpec(w, h, int(suite["frames"]), pattern, seed)
+        for (w, h), pattern in itertools.product(suite["resolutions"], suite["patterns"])
+    ]
+    cases: List[BenchCase] = []
+    seen = set()
+    for clip, mode, grid, n, width, src, floor, batch in itertools.product(
+        clips, suite["modes"], suite["grids"], suite["strides"], suite["widths"], frame_sources, static_floors, batches
+    ):
+        if batch > 1 and (floor is not None or mode == "global"):
+            continue  # the cascade takes precedence over batching; global scores stay per pair
+        case = BenchCase(
+            clip, mode, None if mode == "global" else parse_tile_grid(grid), int(n), int(width), src, floor,
+            int(batch),
+        )
+        if case.case_id not in seen:
+            seen.add(case.case_id)
+            cases.append(case)
+    return cases
+
+
+def case_config(case: BenchCase) -> UpscaleConfig:
+    cfg = UpscaleConfig(
+        motion_mode=case.motion_mode,
+        sample_every_n=case.sample_every_n,
+        frame_source=case.frame_source,
+        score_workers=1,
+        score_cache=False,
+    )
+    if case.tile_grid is not None:
+        cfg.tile_grid = case.tile_grid
+    if case.static_floor is not None:
+        cfg.static_cascade = True
+        cfg.static_floor = case.static_floor
+    cfg.score_batch_frames = case.batch
+    return cfg
+
+
+def run_case(case: BenchCase, clip_path: Path, repeats: int = 3, allocs: bool = False) -> Dict:
+    """
+    Times compute_motion_scores on one clip/config; reports the best of `repeats` runs.
+    Static-cascade cases also score the clip once with the full kernel and
+    report the cascade's accuracy against it. With `allocs`, the per-frame
+    allocation figures of measure_allocations are added.
+    """
+    cfg = case_config(case)
+    times = []
+    frames = 0
+    stats: Dict = {}
+    for _ in range(max(1, repeats)):
+        stats = {}
+        t0 = time.perf_counter()
+        scores, _fps = compute_motion_scores(clip_path, cfg, max_width=case.max_width, stats=stats)
+        times.append(time.perf_counter() - t0)
+        frames = len(scores)
+
+    best = min(times)
+    result = {
+        "id": case.case_id,
+        "clip": asdict(case.clip),
+        "motion_mode": case.motion_mode,
+        "tile_grid": list(case.tile_grid) if case.tile_grid is not None else None,
+        "sample_every_n": case.sample_every_n,
+        "max_width": case.max_width,
+        "frame_source": case.frame_source,
+        "frames": frames,
+        "seconds": best,
+        "seconds_all": times,
+        "fps": frames / best if best > 0 else 0.0,
+    }
+    if case.static_floor is not None:
+        reference, _fps = compute_motion_scores(
+            clip_path, replace(cfg, static_cascade=False), max_width=case.max_width
+        )
+        result["static_floor"] = case.static_floor
+        result["cascade"] = cascade_accuracy(scores, reference, stats, cfg)
+    if case.batch > 1:
+        result["batch"] = case.batch
+        width, height = scaled_size(case.clip.width, case.clip.height, case.max_width)
+        grid = case.tile_grid or (1, 1)
+        result["batch_bytes"] = FrameStack(case.batch, height, width, grid).nbytes
+    if allocs:
+        result["allocations"] = measure_allocations(cfg, clip_path, case.max_width)
+    return result
+
+
+def measure_allocations(cfg: UpscaleConfig, clip_path: Path, max_width: int = 640, warmup: int = 5) -> Dict:
+    """
+    Steady-state allocation per sampled frame on the serial path, from
+    tracemalloc (numpy and OpenCV output arrays are traced): for each sample,
+    the peak traced memory while it is decoded and scored minus the traced
+    memory before it. The first `warmup` samples, which allocate the reused
+    buffers, are left out. Decoder-internal memory is not traced.
+    """
+    run = start_scoring_run(clip_path, replace(cfg, score_workers=1), max_width)
+    out = ScoreBuffer(max(1, run.source.frame_count) + 1)
+    transient: List[int] = []
+    retained: List[int] = []
+    tracemalloc.start()
+    try:
+        batches = iter_score_batches(run, out)
+        while True:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            try:
+                next(batches)
+            except StopIteration:
+                break
+            current, peak = tracemalloc.get_traced_memory()
+            transient.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+        run.source.release()
+
+    steady = np.asarray(transient[warmup:] or [0], dtype=np.float64)
+    return {
+        "samples": len(transient),
+        "frame_bytes": int(run.prev.nbytes),
+        "transient_bytes_mean": float(steady.mean()),
+        "transient_bytes_max": int(steady.max()),
+        "retained_bytes": int(sum(retained[warmup:])),
+    }
+
+
+def cascade_accuracy(scores: Sequence[float], reference: Sequence[float], stats: Dict, cfg: UpscaleConfig) -> Dict:
+    """
+    Cascade scores against full-kernel scores of the same clip: fast-path
+    share, score error, frames whose motion/no-motion call flipped at
+    cfg.sensitivity, and whether the detected segments are identical.
+    """
+    a = np.asarray(scores, dtype=np.float64)
+    b = np.asarray(reference, dtype=np.float64)
+    n = min(len(a), len(b))
+    a, b = a[:n], b[:n]
+    err = np.abs(a - b)
+    samples = max(1, int(stats.get("cascade_samples", 0)))
+    return {
+        "fast_samples": int(stats.get("cascade_fast", 0)),
+        "samples": int(stats.get("cascade_samples", 0)),
+        "fast_fraction": stats.get("cascade_fast", 0) / samples,
+        "max_abs_error": float(err.max()) if n else 0.0,
+        "mean_abs_error": float(err.mean()) if n else 0.0,
+        "flipped_frames": int(np.count_nonzero((a >= cfg.sensitivity) != (b >= cfg.sensitivity))),
+        "segments_match": segments_to_dict(detect_motion_segments(a, cfg))
+        == segments_to_dict(detect_motion_segments(b, cfg)),
+    }
+
+
+def synthetic_scores(frames: int, seed: int = 0) -> np.ndarray:
+    # Noisy low-motion baseline with ~1 burst per 100 frames, roughly 5k segments per 1M frames.
+    rng = np.random.default_rng(seed)
+    scores = np.abs(rng.normal(0.05, 0.04, size=frames))
+    starts = rng.integers(0, max(1, frames), size=max(1, frames // 100))
+    for width in (2, 5, 12):
+        idx = (starts[:, None] + np.arange(width)).ravel()
+        scores[idx[idx < frames]] += 0.3
+    return scores
+
+
+def run_segmentation_case(frames: int, repeats: int = 3, seed: int = 0, as_list: bool = False) -> Dict:
+    """Times detect_motion_segments + segments_to_dict on a synthetic score series."""
+    cfg = UpscaleConfig()
+    scores = synthetic_scores(frames, seed)
+    series = scores.tolist() if as_list else scores
+    times = []
+    count = 0
+    for _ in range(max(1, repeats)):
+        t0 = time.perf_counter()
+        count = len(segments_to_dict(detect_motion_segments(series, cfg)))
+        times.append(time.perf_counter() - t0)
+
+    best = min(times)
+    return {
+        "id": f"segments|{frames}f|input={'list' if as_list else 'array'}|s{seed}",
+        "frames": frames,
+        "segments": count,
+        "seconds": best,
+        "seconds_all": times,
+        "fps": frames / best if best > 0 else 0.0,
+    }
+
+
+def environment() -> Dict:
+    return {
+        "bench_version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def run_suite(cases: Sequence[BenchCase], clip_dir: Path, repeats: int = 3, log=print, allocs: bool = False) -> Dict:
+    results = []
+    for i, case in enumerate(cases, 1):
+        clip_path = make_clip(case.clip, clip_dir)
+        result = run_case(case, clip_path, repeats, allocs)
+        results.append(result)
+        if log is not None:
+            extra = ""
+            if "cascade" in result:
+                c = result["cascade"]
+                extra = (
+                    f", fast path {100.0 * c['fast_fraction']:.1f}%, max err {c['max_abs_error']:.4f}, "
+                    f"{c['flipped_frames']} flipped, segments {'match' if c['segments_match'] else 'DIFFER'}"
+                )
+            if "batch_bytes" in result:
+                extra += f", batch buffers {result['batch_bytes'] / 2 ** 20:.1f} MiB"
+            if "allocations" in result:
+                a = result["allocations"]
+                extra += (
+                    f", allocs/frame mean {a['transient_bytes_mean'] / 1024:.1f} KiB / "
+                    f"max {a['transient_bytes_max'] / 1024:.1f} KiB (frame {a['frame_bytes'] / 1024:.0f} KiB)"
+                )
+            log(f"[{i}/{len(cases)}] {case.case_id}: {result['fps']:.1f} fps{extra}")
+    return {"environment": environment(), "repeats": int(repeats), "results": results}
+
+
+def compare_results(base: Dict, new: Dict, tolerance: float = 0.10) -> Dict:
+    """
+    Matches cases by id and reports the fps ratio new/base. A case regresses
+    when it is more than `tolerance` slower, and improves when it is more than
+    `tolerance` faster.
+    """
+    base_by_id = {r["id"]: r for r in base.get("results", [])}
+    new_by_id = {r["id"]: r for r in new.get("results", [])}
+    rows = []
+    for case_id in sorted(set(base_by_id) & set(new_by_id)):
+        b, n = base_by_id[case_id]["fps"], new_by_id[case_id]["fps"]
+        ratio = n / b if b > 0 else float("inf")
+        status = "ok"
+        if ratio < 1.0 - tolerance:
+            status = "regression"
+        elif ratio > 1.0 + tolerance:
+            status = "improvement"
+        rows.append({"id": case_id, "base_fps": b, "new_fps": n, "ratio": ratio, "status": status})
+
+    ratios = [r["ratio"] for r in rows if r["base_fps"] > 0 and r["new_fps"] > 0]
+    return {
+        "tolerance": tolerance,
+        "cases": rows,
+        "regressions": [r["id"] for r in rows if r["status"] == "regression"],
+        "improvements": [r["id"] for r in rows if r["status"] == "improvement"],
+        "only_in_base": sorted(set(base_by_id) - set(new_by_id)),
+        "only_in_new": sorted(set(new_by_id) - set(base_by_id)),
+        "geomean_ratio": float(np.exp(np.mean(np.log(ratios)))) if ratios else None,
+    }
+
+
+def format_comparison(report: Dict) -> List[str]:
+    lines = []
+    for row in report["cases"]:
+        flag = {"regression": "  <-- REGRESSION", "improvement": "  (faster)"}.get(row["status"], "")
+        lines.append(f"{row['id']}: {row['base_fps']:.1f} -> {row['new_fps']:.1f} fps (x{row['ratio']:.2f}){flag}")
+    if report["only_in_base"] or report["only_in_new"]:
+        lines.append(
+            f"Unmatched cases: {len(report['only_in_base'])} only in base, {len(report['only_in_new'])} only in new"
+        )
+    if report["geomean_ratio"] is not None:
+        lines.append(f"Geometric mean speed ratio: x{report['geomean_ratio']:.3f}")
+    lines.append(
+        f"{len(report['regressions'])} regression(s), {len(report['improvements'])} improvement(s) "
+        f"beyond {100.0 * report['tolerance']:.0f}%"
+    )
+    return lines
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark motion-scoring throughput on deterministic synthetic clips."
+    )
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick", help="Axis preset (default: quick)")
+    parser.add_argument("--out", default="bench_motion.json", help="Output JSON path (default: bench_motion.json)")
+    parser.add_argument("--clip_dir", default=None, help="Where synthetic clips are written/reused (default: next to --out)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Clip generation seed")
+    parser.add_argument("--resolutions", default=None, help="Override clip sizes, e.g. 640x360,1920x1080")
+    parser.add_argument("--frames", type=int, default=None, help="Override clip length in frames")
+    parser.add_argument("--patterns", default=None, help=f"Override clip patterns ({','.join(PATTERNS)})")
+    parser.add_argument("--modes", default=None, help="Override motion modes, e.g. detail,global")
+    parser.add_argument("--grids", default=None, help="Override tile grids, e.g. 8x8,16x9")
+    parser.add_argument("--strides", default=None, help="Override sample_every_n values, e.g. 1,2,4")
+    parser.add_argument("--widths", default=None, help="Override max_width values, e.g. 320,640")
+    parser.add_argument("--frame_sources", default="opencv", help="Frame sources to time, e.g. opencv,ffmpeg")
+    parser.add_argument(
+        "--cascade_floors",
+        default=None,
+        help="Also run static-cascade cases at these thumbnail floors, e.g. 0.01,0.02 (reports accuracy)",
+    )
+    parser.add_argument(
+        "--batches",
+        default=None,
+        help="Also run batched-kernel cases at these score_batch_frames values, e.g. 4,16,64",
+    )
+    parser.add_argument(
+        "--allocs",
+        action="store_true",
+        help="Also measure steady-state allocations per frame with tracemalloc (untimed extra pass)",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=None,
+        metavar="FRAMES",
+        help="Benchmark segmentation on a synthetic score series of FRAMES frames instead (e.g. 10000000)",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASE", "NEW"),
+        default=None,
+        help="Compare two result files instead of running; exits 1 on regressions",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed fps drop for --compare (default: 0.10)")
+    parser.add_argument("--report", default=None, help="Optional JSON output of the --compare report")
+
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], "r", encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], "r", encoding="utf-8") as f:
+            new = json.load(f)
+        report = compare_results(base, new, args.tolerance)
+        for line in format_comparison(report):
+            print(line)
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        sys.exit(1 if report["regressions"] else 0)
+
+    if args.segments is not None:
+        results = {"environment": environment(), "repeats": int(args.repeats), "results": []}
+        for as_list in (False, True):
+            result = run_segmentation_case(args.segments, args.repeats, args.seed, as_list)
+            results["results"].append(result)
+            print(f"{result['id']}: {result['segments']} segments, {result['seconds']:.3f}s ({result['fps'] / 1e6:.1f}M frames/s)")
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {len(results['results'])} results -> {args.out}")
+        return
+
+    suite = dict(SUITES[args.suite])
+    if args.resolutions is not None:
+        suite["resolutions"] = [tuple(parse_tile_grid(r)) for r in args.resolutions.split(",") if r.strip()]
+    if args.frames is not None:
+        suite["frames"] = args.frames
+    if args.patterns is not None:
+        suite["patterns"] = [p.strip() for p in args.patterns.split(",") if p.strip()]
+    if args.modes is not None:
+        suite["modes"] = [m.strip().lower() for m in args.modes.split(",") if m.strip()]
+    if args.grids is not None:
+        suite["grids"] = [g.strip() for g in args.grids.split(",") if g.strip()]
+    if args.strides is not None:
+        suite["strides"] = _int_list(args.strides)
+    if args.widths is not None:
+        suite["widths"] = _int_list(args.widths)
+    frame_sources = [s.strip() for s in args.frame_sources.split(",") if s.strip()]
+    static_floors: List[Optional[float]] = [None]
+    if args.cascade_floors is not None:
+        static_floors += [float(v) for v in args.cascade_floors.split(",") if v.strip()]
+    batches = [0] + (_int_list(args.batches) if args.batches is not None else [])
+
+    out_path = Path(args.out)
+    clip_dir = Path(args.clip_dir) if args.clip_dir else out_path.resolve().parent / "bench_clips"
+    cases = build_cases(suite, frame_sources, seed=args.seed, static_floors=static_floors, batches=batches)
+    print(f"Running {len(cases)} case(s), {args.repeats} repeat(s) each; clips in {clip_dir}")
+
+    results = run_suite(cases, clip_dir, repeats=args.repeats, allocs=args.allocs)
+    results["suite"] = dict(
+        suite, name=args.suite, frame_sources=frame_sources, seed=args.seed, static_floors=static_floors,
+        batches=batches,
+    )
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {len(results['results'])} results -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
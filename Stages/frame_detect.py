@@ -1,80 +1,299 @@
-from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from Pipeline.config import UpscaleConfig
 
 import argparse
 import json
 
-from Stages.motion_score import compute_motion_scores
+import numpy as np
 
-@dataclass
-class Segment:
-    start: int
-    end: int
+from Stages.frame_source import RAW_PIX_FMTS
+from Stages.motion_score import describe_score_stats
+from Stages.profiling import Profiler
+from Stages.score_cache import cache_from_config, cached_motion_scores, score_params
+from Stages.score_file import load_score_file, write_score_file
+from Stages.score_kernels import parse_tile_grid
+from Stages.score_sketch import ScoreSketch, auto_enabled, auto_threshold
+from Stages.tile_store import TileStore, compute_tile_store
 
-    @property
-    def length(self) -> int:
-        return self.end - self.start + 1
+# Compact segment storage: one (start, end) int64 pair per segment, inclusive frame indices.
+SEGMENT_DTYPE = np.dtype([("start", "<i8"), ("end", "<i8")])
 
 
-def merge_close_segments(segments: List[Segment], merge_gap_frames: int) -> List[Segment]:
-    """Merge segments that are separated by <= merge_gap_frames."""
-    if not segments:
-        return []
+def make_segments(starts, ends) -> np.recarray:
+    """Structured segment array; fields are readable as seg.start / seg.end."""
+    segments = np.empty(len(starts), dtype=SEGMENT_DTYPE)
+    segments["start"] = starts
+    segments["end"] = ends
+    return segments.view(np.recarray)
 
-    merged = [segments[0]]
 
-    for seg in segments[1:]:
-        last = merged[-1]
-        gap = seg.start - last.end - 1
+def segment_lengths(segments: np.ndarray) -> np.ndarray:
+    return segments["end"] - segments["start"] + 1
 
-        if gap <= merge_gap_frames:
-            last.end = max(last.end, seg.end)
-        else:
-            merged.append(seg)
 
-    return merged
+def merge_close_segments(segments: np.ndarray, merge_gap_frames: int) -> np.recarray:
+    """Merge segments (sorted by start) that are separated by <= merge_gap_frames."""
+    if len(segments) == 0:
+        return make_segments([], [])
+
+    starts = segments["start"]
+    # Running max of ends, so a segment nested in an earlier one never shortens the merge.
+    ends = np.maximum.accumulate(segments["end"])
+    breaks = (starts[1:] - ends[:-1] - 1) > merge_gap_frames
+    first = np.flatnonzero(np.r_[True, breaks])
+    last = np.flatnonzero(np.r_[breaks, True])
+    return make_segments(starts[first], ends[last])
 
 
-def filter_short_segments(segments: List[Segment], min_segment_frames: int) -> List[Segment]:
+def filter_short_segments(segments: np.ndarray, min_segment_frames: int) -> np.recarray:
     """Remove segments shorter than min_segment_frames."""
-    return [s for s in segments if s.length >= min_segment_frames]
+    return segments[segment_lengths(segments) >= min_segment_frames].view(np.recarray)
 
 
-def detect_motion_segments(scores: List[float], cfg: UpscaleConfig) -> List[Segment]:
+def detect_motion_segments(scores, cfg: UpscaleConfig) -> np.recarray:
     """
-    scores: motion score per frame (higher = more motion)
-    returns: segments of frames considered 'motion'
+    scores: motion score per frame (higher = more motion), list or array
+    returns: segments of frames considered 'motion' (see SEGMENT_DTYPE)
+
+    Threshold crossings come from the edges of the boolean motion mask, so no
+    per-frame Python work is done. Scores are compared as float64, which
+    matches the comparison of Python floats.
     """
-    segments: List[Segment] = []
+    values = np.asarray(scores, dtype=np.float64)
+    if values.ndim != 1:
+        values = values.ravel()
 
-    threshold = cfg.sensitivity
-    in_seg = False
-    start = 0
+    mask = np.empty(len(values) + 2, dtype=np.int8)
+    mask[0] = mask[-1] = 0
+    np.greater_equal(values, cfg.sensitivity, out=mask[1:-1].view(np.bool_))
+    edges = np.diff(mask)
+    segments = make_segments(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1)
 
-    for i, s in enumerate(scores):
-        is_motion = s >= threshold
+    segments = merge_close_segments(segments, cfg.merge_gap_frames)
+    segments = filter_short_segments(segments, cfg.min_segment_frames)
 
-        if is_motion and not in_seg:
-            in_seg = True
-            start = i
+    return segments
 
-        elif (not is_motion) and in_seg:
-            in_seg = False
-            segments.append(Segment(start=start, end=i - 1))
 
-    if in_seg:
-        segments.append(Segment(start=start, end=len(scores) - 1))
+class OnlineSegmenter:
+    """
+    Incremental detect_motion_segments: push scores in frame order and get
+    (start, end) segments back as soon as they are final. State is a few
+    integers, so memory does not grow with clip length.
 
-    segments = merge_close_segments(segments, cfg.merge_gap_frames)
-    segments = filter_short_segments(segments, cfg.min_segment_frames)
+    A merged segment is final once more than merge_gap_frames quiet frames
+    follow it, since no later burst can merge into it; finish() flushes the
+    last one. The segments equal detect_motion_segments over the same scores.
+    """
 
-    return segments
+    def __init__(self, cfg: UpscaleConfig, first_frame: int = 0):
+        self.threshold = cfg.sensitivity
+        self.merge_gap_frames = cfg.merge_gap_frames
+        self.min_segment_frames = cfg.min_segment_frames
+        self.index = first_frame
+        self._raw_start: Optional[int] = None  # start of the above-threshold run in progress
+        self._pending: Optional[Tuple[int, int]] = None  # merged segment that may still grow
+
+    def push(self, score: float) -> List[Tuple[int, int]]:
+        i = self.index
+        self.index += 1
+        done: List[Tuple[int, int]] = []
+
+        if score >= self.threshold:
+            if self._raw_start is None:
+                self._raw_start = i
+            return done
+
+        if self._raw_start is not None:
+            self._close_run(i - 1, done)
+        if self._pending is not None and i - self._pending[1] > self.merge_gap_frames:
+            self._emit(done)
+        return done
+
+    def push_many(self, scores) -> List[Tuple[int, int]]:
+        done: List[Tuple[int, int]] = []
+        for score in scores:
+            done.extend(self.push(score))
+        return done
+
+    def finish(self) -> List[Tuple[int, int]]:
+        """Close the run in progress at the last pushed frame and flush everything."""
+        done: List[Tuple[int, int]] = []
+        if self._raw_start is not None:
+            self._close_run(self.index - 1, done)
+        self._emit(done)
+        return done
+
+    def _close_run(self, end: int, done: List[Tuple[int, int]]) -> None:
+        # Same merge rule as merge_close_segments.
+        start = self._raw_start
+        self._raw_start = None
+        if self._pending is not None and start - self._pending[1] - 1 <= self.merge_gap_frames:
+            self._pending = (self._pending[0], max(self._pending[1], end))
+        else:
+            self._emit(done)
+            self._pending = (start, end)
 
+    def _emit(self, done: List[Tuple[int, int]]) -> None:
+        if self._pending is None:
+            return
+        start, end = self._pending
+        self._pending = None
+        if end - start + 1 >= self.min_segment_frames:
+            done.append((start, end))
+
+
+def _closed_scores(values: np.ndarray, merge_gap_frames: int) -> np.ndarray:
+    """
+    Grayscale closing over a flat window of merge_gap_frames + 1 frames, with
+    -inf outside the clip. For every threshold t, `closed >= t` is exactly the
+    motion mask after merge_close_segments: a quiet run is filled iff it is
+    shorter than the window and has motion on both sides.
+    """
+    m = int(merge_gap_frames) + 1
+    n = len(values)
+    if m <= 1 or n == 0:
+        return values.copy()
+    padded = np.concatenate([np.full(m - 1, -np.inf), values, np.full(m - 1, -np.inf)])
+    dilated = padded[: n + m - 1].copy()
+    for k in range(1, m):  # window max, then window min; m is a handful of frames
+        np.maximum(dilated, padded[k:k + n + m - 1], out=dilated)
+    closed = dilated[:n].copy()
+    for k in range(1, m):
+        np.minimum(closed, dilated[k:k + n], out=closed)
+    return closed
+
+
+def _previous_smaller(values: np.ndarray) -> np.ndarray:
+    # Index of the previous strictly smaller value (-1 if none), by vectorized pointer jumping.
+    left = np.arange(-1, len(values) - 1)
+    active = np.arange(1, len(values))
+    while active.size:
+        p = left[active]
+        active = active[values[p] >= values[active]]
+        left[active] = left[left[active]]
+        active = active[left[active] >= 0]
+    return left
+
+
+class SweepIndex:
+    """
+    Answers "which segments at threshold t" for any t without rescanning scores.
+
+    The merge rule is folded into the scores by _closed_scores, so the merged
+    segments at t are the runs of `closed >= t`. Every run that exists at some
+    threshold is stored once as a node: frames [start, end], alive for
+    lo < t <= hi (hi = the run's minimum, lo = the larger neighbour just
+    outside it). The runs at t are the nodes alive at t, and count/frame
+    curves are differences of sorted lo/hi arrays, so a whole curve costs two
+    searchsorted calls. Results equal detect_motion_segments.
+    """
 
-def segments_to_dict(segments: List[Segment]) -> List[dict]:
-    return [{"start": s.start, "end": s.end, "length": s.length} for s in segments]
+    def __init__(self, scores, merge_gap_frames: int = 2, min_segment_frames: int = 4):
+        values = np.asarray(scores, dtype=np.float64).ravel()
+        values = np.where(np.isnan(values), -np.inf, values)  # NaN never reaches a threshold
+        self.frame_count = len(values)
+        self.merge_gap_frames = int(merge_gap_frames)
+        self.min_segment_frames = int(min_segment_frames)
+        self.sorted_scores = np.sort(values)
+
+        closed = _closed_scores(values, self.merge_gap_frames)
+        # Constant stretches (repeated stride-N scores) behave as a single position.
+        starts = np.flatnonzero(np.r_[True, closed[1:] != closed[:-1]]) if len(closed) else np.zeros(0, np.intp)
+        levels = closed[starts]
+        bounds = np.r_[starts, self.frame_count]
+
+        left = _previous_smaller(levels)
+        right = len(levels) - 1 - _previous_smaller(levels[::-1])[::-1]
+        start = bounds[left + 1]
+        end = bounds[right] - 1
+        # Runs too short to ever pass the length filter are dropped up front;
+        # queries may raise min_segment_frames but not lower it below this.
+        keep = np.flatnonzero((end - start + 1 >= max(1, self.min_segment_frames)) & (levels > -np.inf))
+        # Equal levels inside one run describe the same node; keep the first.
+        _, first = np.unique(left[keep] * (len(levels) + 1) + right[keep], return_index=True)
+        keep = keep[first]
+
+        padded = np.r_[-np.inf, levels, -np.inf]
+        self.hi = levels[keep]
+        self.lo = np.maximum(padded[left[keep] + 1], padded[right[keep] + 1])
+        self.start = start[keep]
+        self.end = end[keep]
+        self.length = self.end - self.start + 1
+        self._sorted = self._sort_nodes(np.ones(len(keep), dtype=bool))
+
+    def _sort_nodes(self, qualifies: np.ndarray) -> Tuple[np.ndarray, ...]:
+        lo, hi, length = self.lo[qualifies], self.hi[qualifies], self.length[qualifies]
+        by_lo = np.argsort(lo, kind="stable")
+        by_hi = np.argsort(hi, kind="stable")
+        return (
+            lo[by_lo],
+            hi[by_hi],
+            np.r_[0, np.cumsum(length[by_lo])],
+            np.r_[0, np.cumsum(length[by_hi])],
+        )
+
+    @classmethod
+    def from_config(cls, scores, cfg: UpscaleConfig) -> "SweepIndex":
+        return cls(scores, cfg.merge_gap_frames, cfg.min_segment_frames)
+
+    def _min_len(self, min_segment_frames: Optional[int]) -> int:
+        if min_segment_frames is None:
+            return self.min_segment_frames
+        if int(min_segment_frames) < self.min_segment_frames:
+            raise ValueError(
+                f"min_segment_frames {min_segment_frames} is below the index's {self.min_segment_frames}"
+            )
+        return int(min_segment_frames)
+
+    def segments(self, threshold: float, min_segment_frames: Optional[int] = None) -> np.recarray:
+        """Segments at `threshold` after merge/filter, same as detect_motion_segments."""
+        alive = (self.lo < threshold) & (self.hi >= threshold) & (self.length >= self._min_len(min_segment_frames))
+        order = np.argsort(self.start[alive], kind="stable")
+        return make_segments(self.start[alive][order], self.end[alive][order])
+
+    def curve(self, thresholds, min_segment_frames: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        For each threshold: segment count and frames inside segments (after
+        merge/filter), plus frames at or above the threshold before merging.
+        """
+        t = np.asarray(thresholds, dtype=np.float64)
+        min_len = self._min_len(min_segment_frames)
+        if min_len <= self.min_segment_frames:
+            lo, hi, lo_cum, hi_cum = self._sorted
+        else:
+            lo, hi, lo_cum, hi_cum = self._sort_nodes(self.length >= min_len)
+        n_lo = np.searchsorted(lo, t, side="left")  # nodes born below t
+        n_hi = np.searchsorted(hi, t, side="left")  # nodes already gone at t
+        return {
+            "threshold": t,
+            "segments": n_lo - n_hi,
+            "motion_frames": lo_cum[n_lo] - hi_cum[n_hi],
+            "above_frames": self.frame_count - np.searchsorted(self.sorted_scores, t, side="left"),
+        }
+
+    def breakpoints(self) -> np.ndarray:
+        """Thresholds where the segment set can change (curve steps just above each lo and at each hi)."""
+        return np.unique(np.r_[self.lo[self.lo > -np.inf], self.hi])
+
+
+def sweep_to_dict(curve: Dict[str, np.ndarray]) -> List[dict]:
+    return [
+        {"threshold": t, "segments": n, "motion_frames": f, "above_frames": a}
+        for t, n, f, a in zip(
+            curve["threshold"].tolist(),
+            curve["segments"].tolist(),
+            curve["motion_frames"].tolist(),
+            curve["above_frames"].tolist(),
+        )
+    ]
+
+
+def segments_to_dict(segments: np.ndarray) -> List[dict]:
+    starts = segments["start"].tolist()
+    ends = segments["end"].tolist()
+    return [{"start": s, "end": e, "length": e - s + 1} for s, e in zip(starts, ends)]
 
 
 def main():
@@ -88,7 +307,26 @@ def main():
         default=None,
         help="Comma-separated list of motion scores, e.g. 0.0,0.1,0.3,0.25.",
     )
-    source_group.add_argument("--video", default=None, help="Path to input video file")
+    source_group.add_argument(
+        "--video",
+        default=None,
+        help="Path to input video file, or an image sequence (folder, shot_%%04d.dpx, shot_####.exr, ...)",
+    )
+    source_group.add_argument(
+        "--raw",
+        default=None,
+        help="Headerless raw frames: a file (memory-mapped) or '-' for stdin; needs --raw_size",
+    )
+    source_group.add_argument(
+        "--scores_file",
+        default=None,
+        help="Binary score file written with --scores_format f32/u16 (memory-mapped)",
+    )
+    source_group.add_argument(
+        "--tiles_file",
+        default=None,
+        help="Tile store written with --tiles_out; scores are re-aggregated without decoding",
+    )
     parser.add_argument(
         "--out",
         default="segments.json",
@@ -97,12 +335,81 @@ def main():
     parser.add_argument(
         "--scores_out",
         default=None,
-        help="Optional JSON output of raw scores (fps + scores list)",
+        help="Optional output of raw scores (fps + scores list)",
+    )
+    parser.add_argument(
+        "--scores_format",
+        choices=["json", "f32", "u16"],
+        default="json",
+        help="Format for --scores_out: json, binary float32, or binary uint16-quantized (default: json)",
+    )
+    parser.add_argument(
+        "--tiles_out",
+        default=None,
+        help="Optional float16 tile store of per-frame tile means (always decodes; skips the score cache)",
     )
 
     parser.add_argument("--sensitivity", type=float, default=None, help="Override cfg.sensitivity")
+    parser.add_argument(
+        "--auto_sensitivity",
+        choices=["off", "percent", "split"],
+        default=None,
+        help="Pick the threshold from the score distribution: top --auto_percent of frames, or an Otsu split",
+    )
+    parser.add_argument("--auto_percent", type=float, default=None, help="Override cfg.auto_motion_percent")
+    parser.add_argument("--motion_mode", choices=["detail", "global"], default=None, help="Override cfg.motion_mode")
+    parser.add_argument("--tile_grid", default=None, help="Override cfg.tile_grid, e.g. 8 or 16x9")
+    parser.add_argument("--top_fraction", type=float, default=0.15, help="Detail top-tile fraction (--tiles_file only)")
+    parser.add_argument("--percentile", type=float, default=None, help="Per-frame tile percentile score (--tiles_file only)")
     parser.add_argument("--min_segment_frames", type=int, default=None, help="Override cfg.min_segment_frames")
     parser.add_argument("--merge_gap_frames", type=int, default=None, help="Override cfg.merge_gap_frames")
+    parser.add_argument("--source_in", type=int, default=None, help="First source frame to score (--video only)")
+    parser.add_argument("--source_out", type=int, default=None, help="Last source frame to score, inclusive (--video only)")
+    parser.add_argument("--sample_every_n", type=int, default=None, help="Override cfg.sample_every_n")
+    parser.add_argument("--adaptive", action="store_true", help="Rescore every frame near the threshold after the stride-N pass")
+    parser.add_argument("--adaptive_margin", type=float, default=None, help="Override cfg.adaptive_margin")
+    parser.add_argument("--static_cascade", action="store_true", help="Thumbnail pre-check; clearly static pairs skip the detail kernel")
+    parser.add_argument("--static_floor", type=float, default=None, help="Override cfg.static_floor")
+    parser.add_argument("--frame_source", choices=["opencv", "ffmpeg", "auto"], default=None, help="Override cfg.frame_source")
+    parser.add_argument("--workers", type=int, default=None, help="Override cfg.score_workers (0 = all cores)")
+    parser.add_argument("--chunk_frames", type=int, default=None, help="Override cfg.score_chunk_frames")
+    parser.add_argument("--decode_ahead", type=int, default=None, help="Override cfg.decode_ahead (queued frames)")
+    parser.add_argument(
+        "--roi", default=None, help="Override cfg.score_roi: x,y,w,h in source pixels, 'auto' (crop letterbox) or 'full'"
+    )
+    parser.add_argument("--batch_frames", type=int, default=None, help="Override cfg.score_batch_frames (stacked kernel)")
+    parser.add_argument("--raw_size", default=None, help="Raw frame size WxH (cfg.raw_size)")
+    parser.add_argument(
+        "--raw_pix_fmt",
+        choices=list(RAW_PIX_FMTS),
+        default=None,
+        help="Raw frame layout (cfg.raw_pix_fmt, default gray); only the luma plane is scored",
+    )
+    parser.add_argument("--raw_fps", type=float, default=None, help="Frame rate of raw input (cfg.raw_fps)")
+    parser.add_argument("--sequence_fps", type=float, default=None, help="Override cfg.sequence_fps (image sequences)")
+    parser.add_argument(
+        "--sequence_workers", type=int, default=None, help="Override cfg.sequence_workers (decode threads, 0 = all cores)"
+    )
+    parser.add_argument(
+        "--ring_slots", type=int, default=None, help="Override cfg.score_ring_slots (decoder process + shared-memory ring)"
+    )
+    parser.add_argument("--no_cache", action="store_true", help="Always decode and rescore; skip the score cache")
+    parser.add_argument("--cache_dir", default=None, help="Override cfg.score_cache_dir")
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Also write segment/motion-frame counts over a threshold grid (\"sweep\" in --out)",
+    )
+    parser.add_argument("--sweep_max", type=float, default=1.0, help="Largest --sweep threshold (default: 1.0)")
+    parser.add_argument("--sweep_steps", type=int, default=101, help="Thresholds in the --sweep grid (default: 101)")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        default=None,
+        metavar="PREFIX",
+        help="Time scoring phases; writes PREFIX.json and PREFIX.trace.json (default prefix: profile)",
+    )
 
     args = parser.parse_args()
 
@@ -110,18 +417,114 @@ def main():
 
     if args.sensitivity is not None:
         cfg.sensitivity = args.sensitivity
+    if args.auto_sensitivity is not None:
+        cfg.auto_sensitivity = args.auto_sensitivity
+    if args.auto_percent is not None:
+        cfg.auto_motion_percent = args.auto_percent
+    if args.motion_mode is not None:
+        cfg.motion_mode = args.motion_mode
+    if args.tile_grid is not None:
+        cfg.tile_grid = args.tile_grid
     if args.min_segment_frames is not None:
         cfg.min_segment_frames = args.min_segment_frames
     if args.merge_gap_frames is not None:
         cfg.merge_gap_frames = args.merge_gap_frames
-
+    if args.sample_every_n is not None:
+        cfg.sample_every_n = args.sample_every_n
+    if args.adaptive:
+        cfg.adaptive_sampling = True
+    if args.adaptive_margin is not None:
+        cfg.adaptive_margin = args.adaptive_margin
+    if args.static_cascade:
+        cfg.static_cascade = True
+    if args.static_floor is not None:
+        cfg.static_floor = args.static_floor
+    if args.frame_source is not None:
+        cfg.frame_source = args.frame_source
+    if args.workers is not None:
+        cfg.score_workers = args.workers
+    if args.chunk_frames is not None:
+        cfg.score_chunk_frames = args.chunk_frames
+    if args.decode_ahead is not None:
+        cfg.decode_ahead = args.decode_ahead
+    if args.roi is not None:
+        cfg.score_roi = "" if args.roi.lower() == "full" else args.roi
+    if args.batch_frames is not None:
+        cfg.score_batch_frames = args.batch_frames
+    if args.sequence_fps is not None:
+        cfg.sequence_fps = args.sequence_fps
+    if args.raw_size is not None:
+        cfg.raw_size = args.raw_size
+    if args.raw_pix_fmt is not None:
+        cfg.raw_pix_fmt = args.raw_pix_fmt
+    if args.raw_fps is not None:
+        cfg.raw_fps = args.raw_fps
+    if args.raw and not cfg.raw_size:
+        parser.error("--raw needs --raw_size WxH")
     if args.video:
-        scores, fps = compute_motion_scores(Path(args.video), cfg)
+        cfg.raw_size = ""  # --raw_size only describes --raw input
+    video = args.video or args.raw
+    if args.sequence_workers is not None:
+        cfg.sequence_workers = args.sequence_workers
+    if args.ring_slots is not None:
+        cfg.score_ring_slots = args.ring_slots
+    if args.no_cache:
+        cfg.score_cache = False
+    if args.cache_dir is not None:
+        cfg.score_cache_dir = args.cache_dir
+
+    frame_range = None
+    if args.source_in is not None or args.source_out is not None:
+        frame_range = (args.source_in or 0, args.source_out)
+
+    profiler = Profiler() if args.profile else None
+    sketch = ScoreSketch() if auto_enabled(cfg) else None
+    score_settings = {}
+    if video and args.tiles_out:
+        score_settings = score_params(cfg, 640, frame_range)
+        scores, fps, store = compute_tile_store(Path(video), cfg, frame_range=frame_range, profiler=profiler)
+        store.save(Path(args.tiles_out))
+        print(f"Wrote {store.frame_count}x{store.grid[0]}x{store.grid[1]} tile store -> {args.tiles_out}")
+    elif video:
+        score_settings = score_params(cfg, 640, frame_range)
+        score_stats = {}
+        pipe = bool(cfg.raw_size) and not Path(video).is_file()
+        cache = None if pipe else cache_from_config(cfg)  # a pipe cannot be fingerprinted
+        scores, fps = cached_motion_scores(
+            Path(video), cfg, cache, stats=score_stats, frame_range=frame_range, profiler=profiler,
+            sketch=sketch,
+        )
+        for line in describe_score_stats(score_stats):
+            print(line)
+        if cache is not None:
+            print(cache.summary())
+    elif args.scores_file:
+        scores, fps, header = load_score_file(Path(args.scores_file))
+        score_settings = header.get("settings", {})
+    elif args.tiles_file:
+        store = TileStore.load(Path(args.tiles_file))
+        tile_grid = args.tile_grid if args.tile_grid is not None else store.grid
+        scores = store.scores(
+            cfg.motion_mode, grid=tile_grid, top_fraction=args.top_fraction, percentile=args.percentile
+        )
+        fps = store.fps
+        score_settings = dict(store.settings, motion_mode=cfg.motion_mode, tile_grid=list(parse_tile_grid(tile_grid)))
     else:
         scores = [float(x.strip()) for x in args.scores.split(",") if x.strip() != ""]
         fps = 0.0
 
-    segments = detect_motion_segments(scores, cfg)
+    auto_info = None
+    if sketch is not None:
+        if sketch.count == 0:  # sources that are loaded whole rather than scored here
+            sketch.update(scores)
+        cfg.sensitivity, auto_info = auto_threshold(sketch, cfg)
+        print(f"Auto sensitivity ({auto_info['method']}): threshold {cfg.sensitivity:.4f}")
+
+    if profiler is not None:
+        with profiler.phase("segment"):
+            segments = detect_motion_segments(scores, cfg)
+    else:
+        segments = detect_motion_segments(scores, cfg)
     frame_count = len(scores)
 
     payload = {
@@ -135,14 +538,32 @@ def main():
         "segments": segments_to_dict(segments),
     }
 
+    if auto_info is not None:
+        payload["settings"]["auto_sensitivity"] = auto_info
+
+    if args.sweep:
+        index = SweepIndex.from_config(scores, cfg)
+        thresholds = np.round(np.linspace(0.0, args.sweep_max, max(2, args.sweep_steps)), 6)
+        payload["sweep"] = sweep_to_dict(index.curve(thresholds))
+
     with open(args.out, "w", encoding="utf-8") as f:
         json.dump(payload, f, indent=2)
 
-    if args.scores_out:
-        scores_payload = {"fps": fps, "scores": scores}
+    if args.scores_out and args.scores_format != "json":
+        write_score_file(Path(args.scores_out), scores, fps, fmt=args.scores_format, settings=score_settings)
+    elif args.scores_out:
+        scores_list = scores.tolist() if isinstance(scores, np.ndarray) else scores
+        scores_payload = {"fps": fps, "scores": scores_list}
         with open(args.scores_out, "w", encoding="utf-8") as f:
             json.dump(scores_payload, f, indent=2)
 
+    if profiler is not None:
+        profiler.finish()
+        for line in profiler.describe():
+            print(line)
+        summary_path, trace_path = profiler.write(args.profile)
+        print(f"Wrote profile -> {summary_path}, {trace_path}")
+
     print(f"Wrote {len(segments)} segments -> {args.out}")
 
 
@@ -0,0 +1,240 @@
+# Stages/frame_ring.py
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+POLL_S = 0.1  # how often blocked processes check for shutdown
+JOIN_TIMEOUT_S = 5.0
+
+
+class FrameRing:
+    """
+    `slots` gray frames of one shape in a multiprocessing.shared_memory block.
+    The creating process owns (and unlinks) the block; other processes attach
+    by name and read or write frames in place, so frames never cross a pipe.
+    """
+
+    def __init__(self, slots: int, shape: Tuple[int, int], name: Optional[str] = None):
+        self.slots = int(slots)
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.owner = name is None
+        size = self.slots * self.shape[0] * self.shape[1]
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.frames: Optional[np.ndarray] = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def spec(self) -> Tuple[int, Tuple[int, int], str]:
+        # Picklable (slots, shape, name) to attach from another process.
+        return self.slots, self.shape, self.shm.name
+
+    def slot(self, index: int) -> np.ndarray:
+        return self.frames[index % self.slots]
+
+    def close(self) -> None:
+        if self.frames is None:
+            return
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a view is still referenced; the mapping goes away with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+def _report_error(events, who: str) -> None:
+    events.put(("error", who, traceback.format_exc()))
+
+
+def _decoder_main(decode, job, spec, free, events, stop) -> None:
+    """
+    Decoder process: writes frame j into slot j % slots once the coordinator
+    has retired frame j - slots, and announces ("frame", j, grabbed).
+    `decode(job, buffers)` is a generator that fills buffers[0] with the first
+    frame, then buffers[1], buffers[2], ... round-robin, yielding each frame's
+    grabbed count after writing it; its return value is passed back as-is.
+    """
+    ring = FrameRing(*spec[:2], name=spec[2])
+    buffers = frames = None
+    waited = 0.0
+    try:
+        buffers = [ring.slot(i) for i in range(ring.slots)]
+        frames = decode(job, buffers)
+        index = 0
+        while True:
+            t0 = time.perf_counter()
+            while not free.acquire(timeout=POLL_S):
+                if stop.is_set():
+                    return
+            waited += time.perf_counter() - t0
+            try:
+                grabbed = next(frames)
+            except StopIteration as done:
+                events.put(("end", index, done.value, waited))
+                return
+            events.put(("frame", index, grabbed))
+            index += 1
+    except BaseException:
+        _report_error(events, "decoder")
+    finally:
+        buffers = frames = None
+        ring.close()
+
+
+def _scorer_main(score, job, spec, tasks, events) -> None:
+    """
+    Scorer process: for each (task, first, grabbed) runs
+    score(job, prev, [(grabbed[0], frame first), ...]) on ring views, where
+    prev is frame first - 1, and returns only the (small) result.
+    """
+    ring = FrameRing(*spec[:2], name=spec[2])
+    frames = None
+    try:
+        while True:
+            item = tasks.get()
+            if item is None:
+                return
+            task, first, grabbed = item
+            frames = [(g, ring.slot(first + i)) for i, g in enumerate(grabbed)]
+            result = score(job, ring.slot(first - 1), frames)
+            events.put(("done", task, result))
+    except BaseException:
+        _report_error(events, "scorer")
+    finally:
+        frames = None
+        ring.close()
+
+
+def iter_ring(
+    decode: Callable,
+    score: Callable,
+    job,
+    shape: Tuple[int, int],
+    slots: int,
+    scorers: int,
+    span: int,
+    summary: Optional[Dict] = None,
+) -> Iterator:
+    """
+    Decode in one process and score in `scorers` others, sharing frames
+    through a FrameRing of `slots` frames. Frames are handed out in spans of
+    up to `span` consecutive frames (each span also reads the frame before
+    it), and the score(...) results are yielded in frame order whatever
+    order the scorers finish in.
+
+    A frame's slot is only reused once every span reading it has been
+    yielded, so scorers never see a frame change under them. An exception
+    or crash in any process is raised here as RuntimeError; closing the
+    generator stops and joins every process and unlinks the ring.
+
+    `summary` receives the ring layout, frame count, the decoder's wait for
+    free slots, the coordinator's wait for results and decode(...)'s
+    return value under "decoder".
+    """
+    slots = max(2, int(slots))
+    span = max(1, min(int(span), slots - 1))  # a span and its previous frame must fit
+    ctx = mp.get_context()
+    ring = FrameRing(slots, shape)
+    free = ctx.Semaphore(slots)
+    tasks = ctx.Queue()
+    events = ctx.Queue()
+    stop = ctx.Event()
+
+    decoder = ctx.Process(
+        target=_decoder_main, args=(decode, job, ring.spec, free, events, stop), name="ring-decoder", daemon=True
+    )
+    workers = [
+        ctx.Process(target=_scorer_main, args=(score, job, ring.spec, tasks, events), name=f"ring-scorer-{i}", daemon=True)
+        for i in range(max(1, int(scorers)))
+    ]
+    processes = [decoder] + workers
+    for process in processes:
+        process.start()
+
+    ready: List[int] = []  # grabbed counts of decoded frames not yet handed out
+    next_frame = 1  # frame 0 is only ever the previous frame
+    spans: List[int] = []  # frames per span, by task id
+    results: Dict[int, object] = {}
+    yielded = 0
+    decoded: Optional[int] = None
+    waited = 0.0
+
+    def dispatch() -> None:
+        nonlocal next_frame
+        count = len(ready)
+        tasks.put((len(spans), next_frame, ready[:count]))
+        spans.append(count)
+        next_frame += count
+        del ready[:count]
+
+    try:
+        while decoded is None or yielded < len(spans):
+            while yielded in results:
+                result = results.pop(yielded)
+                for _ in range(spans[yielded]):
+                    free.release()  # retire the span's previous frame and all but its last
+                yielded += 1
+                yield result
+            if decoded is not None and yielded == len(spans):
+                break
+
+            t0 = time.perf_counter()
+            try:
+                event = events.get(timeout=POLL_S)
+            except queue.Empty:
+                waited += time.perf_counter() - t0
+                for process in processes:
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError(f"Frame ring {process.name} exited with code {process.exitcode}")
+                continue
+            waited += time.perf_counter() - t0
+
+            kind = event[0]
+            if kind == "frame":
+                if event[1] > 0:
+                    ready.append(event[2])
+                if len(ready) >= span:
+                    dispatch()
+            elif kind == "done":
+                results[event[1]] = event[2]
+            elif kind == "end":
+                if ready:
+                    dispatch()
+                decoded = event[1]
+                if summary is not None:
+                    summary.update({"decoder": event[2], "decoder_wait_s": event[3]})
+            else:
+                raise RuntimeError(f"Frame ring {event[1]} failed:\n{event[2]}")
+    finally:
+        stop.set()
+        for _ in workers:
+            tasks.put(None)
+        deadline = time.perf_counter() + JOIN_TIMEOUT_S
+        for process in processes:
+            while process.is_alive() and time.perf_counter() < deadline:
+                try:
+                    events.get(timeout=POLL_S)  # keep the pipe drained so exiting writers can flush
+                except queue.Empty:
+                    pass
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        ring.close()
+        if summary is not None:
+            summary.update(
+                {
+                    "slots": slots,
+                    "span": span,
+                    "scorers": len(workers),
+                    "frames": decoded or 0,
+                    "wait_s": waited,
+                }
+            )
@@ -0,0 +1,661 @@
+# Stages/frame_source.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import cv2
+
+from Stages.image_sequence import is_image_sequence, read_image, resolve_sequence
+
+
+BACKENDS = ("opencv", "ffmpeg", "auto")
+ROI_SAMPLES = 8  # frames sampled across the clip (or range) to find letterbox bars
+
+Roi = Tuple[int, int, int, int]  # (x, y, w, h) in source pixels
+
+
+def scaled_size(width: int, height: int, max_width: int, source_width: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Size of a width x height frame (or ROI) after the max_width downscale used
+    by every backend. The factor comes from `source_width`, the full frame the
+    ROI was cut from (default: `width`), so a crop keeps the full-frame scale.
+    """
+    full = source_width or width
+    if max_width and full > max_width:
+        scale = max_width / float(full)
+        if width == full:
+            return max_width, int(height * scale)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+    return width, height
+
+
+def parse_roi(value: Union[str, Sequence[int], None]) -> Union[Roi, str, None]:
+    """
+    Scoring region: None/"" = full frame, "auto" = detect letterbox bars,
+    or an explicit "x,y,w,h" rectangle (also "WxH+X+Y") in source pixels.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (tuple, list)):
+        parts = [int(v) for v in value]
+    else:
+        s = str(value).strip().lower().replace(" ", "")
+        if s in ("", "none", "full"):
+            return None
+        if s == "auto":
+            return "auto"
+        if "x" in s and "+" in s:
+            size, x, y = s.split("+")[:3]
+            w, h = size.split("x", 1)
+            parts = [int(x), int(y), int(w), int(h)]
+        else:
+            parts = [int(v) for v in s.split(",")]
+    if len(parts) != 4 or parts[2] <= 0 or parts[3] <= 0 or parts[0] < 0 or parts[1] < 0:
+        raise ValueError(f"Invalid ROI: {value!r} (expected x,y,w,h with w, h > 0, or 'auto')")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def clip_roi(roi: Optional[Roi], width: int, height: int) -> Optional[Roi]:
+    """`roi` clamped to a width x height frame; None when it covers the whole frame."""
+    if roi is None or width <= 0 or height <= 0:
+        return None
+    x, y = min(roi[0], width - 1), min(roi[1], height - 1)
+    w, h = min(roi[2], width - x), min(roi[3], height - y)
+    if (x, y, w, h) == (0, 0, width, height):
+        return None
+    return x, y, w, h
+
+
+def source_frame_size(video_path: Path) -> Tuple[int, int]:
+    """(width, height) of the source frames, before any crop or downscale."""
+    if is_image_sequence(video_path):
+        files = resolve_sequence(video_path)
+        if not files:
+            raise FileNotFoundError(f"No image sequence frames found: {video_path}")
+        image = read_image(files[0])
+        return image.shape[1], image.shape[0]
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {video_path}")
+    size = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    cap.release()
+    return size
+
+
+def _full_frames(video_path: Path, picks: Callable[[int], Sequence[int]]) -> Iterator[np.ndarray]:
+    # Full-size frames at the indices picks(frame_count) returns; unreadable ones are skipped.
+    if is_image_sequence(video_path):
+        files = resolve_sequence(video_path)
+        for index in picks(len(files)):
+            yield read_image(files[index])  # random access, no seek cost
+        return
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {video_path}")
+    try:
+        for index in picks(int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame = cap.read()
+            if ok:
+                yield frame
+    finally:
+        cap.release()
+
+
+def detect_letterbox(
+    video_path: Path,
+    black_level: int = 24,
+    samples: int = ROI_SAMPLES,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+) -> Optional[Roi]:
+    """
+    Active picture area of `video_path`: the bounding box of rows and columns
+    whose brightest pixel, over `samples` frames spread across the clip (or
+    frame_range), is above `black_level`. Bars that light up in any sampled
+    frame are kept, so dark scenes do not shrink the area. None when no bars
+    are found (or every sample is black).
+    """
+
+    def picks(count: int) -> np.ndarray:
+        first = max(0, int(frame_range[0])) if frame_range is not None else 0
+        last = count - 1
+        if frame_range is not None and frame_range[1] is not None:
+            last = min(last, int(frame_range[1])) if count > 0 else int(frame_range[1])
+        return np.unique(np.linspace(first, max(first, last), max(1, samples)).astype(int))
+
+    brightest: Optional[np.ndarray] = None
+    for frame in _full_frames(video_path, picks):
+        peak = frame if frame.ndim == 2 else frame.max(axis=2)  # bars are dark in every channel
+        brightest = peak.copy() if brightest is None else np.maximum(brightest, peak, out=brightest)
+    if brightest is None:
+        return None
+
+    active = brightest > black_level
+    rows = np.flatnonzero(active.any(axis=1))
+    cols = np.flatnonzero(active.any(axis=0))
+    if rows.size == 0:
+        return None
+    height, width = brightest.shape
+    roi = (int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1))
+    return clip_roi(roi, width, height)
+
+
+def resolve_roi(
+    video_path: Path,
+    value: Union[str, Sequence[int], None],
+    black_level: int = 24,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+) -> Optional[Roi]:
+    """parse_roi(value) made concrete for `video_path`: None = score the full frame."""
+    roi = parse_roi(value)
+    if roi == "auto":
+        return detect_letterbox(video_path, black_level, frame_range=frame_range)
+    if roi is None:
+        return None
+    return clip_roi(roi, *source_frame_size(video_path))
+
+
+def preprocess(
+    frame_bgr: np.ndarray,
+    max_width: int = 640,
+    out: Optional[np.ndarray] = None,
+    scratch: Optional[np.ndarray] = None,
+    roi: Optional[Roi] = None,
+) -> np.ndarray:
+    """
+    Grayscale + optional downscale for speed.
+    `out` receives the result and `scratch` the full-size gray image (dst=
+    outputs); OpenCV reuses them when their size matches, so passing the
+    previous results back in avoids allocating a frame per call.
+    `roi` crops (as a view, before any conversion) to that (x, y, w, h).
+    A 2-D frame is taken as gray already (luma-only stills).
+    """
+    source_width = frame_bgr.shape[1]
+    if roi is not None:
+        x, y, w, h = roi
+        frame_bgr = frame_bgr[y:y + h, x:x + w]
+    h, w = frame_bgr.shape[:2]
+    size = scaled_size(w, h, max_width, source_width)
+    if frame_bgr.ndim == 2:
+        if size != (w, h):
+            return cv2.resize(frame_bgr, size, dst=out, interpolation=cv2.INTER_AREA)
+        if out is not None and out.shape == frame_bgr.shape:
+            np.copyto(out, frame_bgr)
+            return out
+        return frame_bgr.copy()
+    if size == (w, h):
+        return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY, dst=out)
+    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY, dst=scratch)
+    return cv2.resize(gray, size, dst=out, interpolation=cv2.INTER_AREA)
+
+
+class OpenCVFrameSource:
+    """
+    cv2.VideoCapture decode to BGR, then gray + INTER_AREA downscale in Python.
+    grab/retrieve mirror VideoCapture, so skipped frames are never converted.
+    The BGR and full-size gray images are decoded into buffers kept on the
+    source, and retrieve(out=...) writes the result into the caller's buffer.
+    With a `roi`, only that part of each decoded frame is converted and scaled.
+    """
+
+    name = "opencv"
+
+    def __init__(self, video_path: Path, max_width: int = 640, roi: Optional[Roi] = None):
+        self.video_path = Path(video_path)
+        self.max_width = max_width
+        self.roi = roi
+        self.cap = cv2.VideoCapture(str(video_path))
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Could not open video: {video_path}")
+        self.fps = float(self.cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self._bgr: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+
+    def seek(self, frame_index: int) -> bool:
+        # Frame-accurate seek, falling back to grabbing forward when the backend lands elsewhere.
+        if frame_index <= 0:
+            return True
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        if int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+            return True
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(frame_index):
+            if not self.cap.grab():
+                return False
+        return True
+
+    def grab(self) -> bool:
+        return bool(self.cap.grab())
+
+    def retrieve_bgr(self) -> Optional[np.ndarray]:
+        """Decoded BGR frame, in a buffer that the next call overwrites."""
+        ret, frame = self.cap.retrieve(self._bgr)
+        if not ret:
+            return None
+        self._bgr = frame
+        return frame
+
+    def convert(self, frame_bgr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """preprocess() through the source's full-size gray buffer."""
+        shape = frame_bgr.shape[:2] if self.roi is None else (self.roi[3], self.roi[2])
+        if self._gray is None or self._gray.shape != shape:
+            self._gray = np.empty(shape, dtype=np.uint8)
+        return preprocess(frame_bgr, max_width=self.max_width, out=out, scratch=self._gray, roi=self.roi)
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        frame = self.retrieve_bgr()
+        return None if frame is None else self.convert(frame, out)
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        return self.retrieve(out) if self.grab() else None
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+def _stream_start_offset(video_path: Path, ffmpeg: str) -> float:
+    # Video stream start relative to the container start (what an input -ss counts
+    # from), via the ffprobe next to `ffmpeg`; 0.0 when it cannot be read.
+    name = "ffprobe.exe" if ffmpeg.lower().endswith(".exe") else "ffprobe"
+    sibling = Path(ffmpeg).with_name(name)
+    ffprobe = str(sibling) if sibling.is_file() else shutil.which("ffprobe")
+    if not ffprobe:
+        return 0.0
+    cmd = [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=start_time:format=start_time", "-of", "json", str(video_path),
+    ]
+    try:
+        info = json.loads(subprocess.run(cmd, capture_output=True, check=True, timeout=30).stdout or b"{}")
+        stream = float(info["streams"][0]["start_time"])
+        container = float(info.get("format", {}).get("start_time", stream))
+    except (OSError, subprocess.SubprocessError, ValueError, KeyError, IndexError, TypeError):
+        return 0.0
+    return max(0.0, stream - container)
+
+
+class FFmpegFrameSource:
+    """
+    ffmpeg subprocess that emits raw 8-bit `gray` frames already scaled to the
+    target width (swscale area filter), so only luma at analysis size ever
+    crosses the pipe and no BGR frame is built. Scores are close to, but not
+    bit-identical with, the OpenCV path (different scaler and luma weights).
+    Seeking restarts ffmpeg with an input-side -ss half a frame ahead of the
+    target (after the video stream's start time), frame-accurate for constant
+    frame rate sources. A `roi` is cropped by ffmpeg ahead of the scaler.
+    """
+
+    name = "ffmpeg"
+
+    def __init__(self, video_path: Path, max_width: int = 640, ffmpeg: str = "ffmpeg", roi: Optional[Roi] = None):
+        self.video_path = Path(video_path)
+        self.max_width = max_width
+        self.roi = roi
+        self.ffmpeg = shutil.which(ffmpeg) or ffmpeg
+
+        # Container metadata only; nothing is decoded here.
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Could not open video: {video_path}")
+        self.fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        cap.release()
+
+        source_width = width
+        if roi is not None:
+            width, height = roi[2], roi[3]
+        self.width, self.height = scaled_size(width, height, max_width, source_width)
+        self.frame_bytes = self.width * self.height
+        self._buf = bytearray(self.frame_bytes)
+        self._proc: Optional[subprocess.Popen] = None
+        self._offset: Optional[float] = None  # probed on the first seek
+        self._start(0)
+
+    def _start(self, frame_index: int) -> None:
+        self.release()
+        cmd = [self.ffmpeg, "-v", "error", "-nostdin"]
+        if frame_index > 0:
+            # Half a frame early (at NTSC rates index / fps can round past the frame's
+            # timestamp), plus the video stream's start; the accurate seek drops the rest.
+            if self._offset is None:
+                self._offset = _stream_start_offset(self.video_path, self.ffmpeg)
+            cmd += ["-ss", f"{(frame_index - 0.5) / (self.fps or 30.0) + self._offset:.6f}"]
+        cmd += [
+            "-i", str(self.video_path),
+            "-map", "0:v:0",
+            "-vf", self._filters(),
+            "-f", "rawvideo",
+            "-pix_fmt", "gray",
+            "-",
+        ]
+        self._proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=self.frame_bytes * 4)
+
+    def _filters(self) -> str:
+        scale = f"scale={self.width}:{self.height}:flags=area,format=gray"
+        if self.roi is None:
+            return scale
+        x, y, w, h = self.roi
+        return f"crop={w}:{h}:{x}:{y}:exact=1,{scale}"
+
+    def seek(self, frame_index: int) -> bool:
+        self._start(max(0, frame_index))
+        return True
+
+    def grab(self) -> bool:
+        if self._proc is None or self._proc.stdout is None:
+            return False
+        view = memoryview(self._buf)
+        got = 0
+        while got < self.frame_bytes:
+            n = self._proc.stdout.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        # Copy out of the read buffer; the caller keeps this frame as `prev`.
+        frame = np.frombuffer(self._buf, dtype=np.uint8).reshape(self.height, self.width)
+        if out is not None and out.shape == frame.shape and out.dtype == frame.dtype:
+            np.copyto(out, frame)
+            return out
+        return frame.copy()
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        return self.retrieve(out) if self.grab() else None
+
+    def release(self) -> None:
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()  # before closing the pipe, so ffmpeg does not report EPIPE
+        if self._proc.stdout is not None:
+            self._proc.stdout.close()
+        self._proc.wait()
+        self._proc = None
+
+
+@dataclass(frozen=True)
+class SequenceOptions:
+    fps: float = 24.0  # image files carry no frame rate
+    workers: int = 0  # decode threads, 0 = all cores
+    read_ahead: int = 8  # frames decoded past the one being scored
+
+
+class ImageSequenceSource:
+    """
+    Numbered stills (DPX, EXR, PNG, TIFF, ...; see Stages.image_sequence) as
+    a frame source. Every frame is its own file, so frames are read, decoded
+    and preprocessed on a thread pool (file reads, imdecode, cvtColor and
+    resize release the GIL) up to `read_ahead` frames ahead, following the
+    stride between retrieves; retrieve() hands them out in frame order.
+    grab() only moves the position, so skipped frames are never read. Each
+    frame is decoded on its own, so scores do not depend on the worker count.
+    """
+
+    name = "sequence"
+
+    def __init__(
+        self,
+        path: Path,
+        max_width: int = 640,
+        roi: Optional[Roi] = None,
+        options: Optional[SequenceOptions] = None,
+    ):
+        options = options or SequenceOptions()
+        self.video_path = Path(path)
+        self.files = resolve_sequence(path)
+        if not self.files:
+            raise FileNotFoundError(f"No image sequence frames found: {path}")
+        self.max_width = max_width
+        self.roi = roi
+        self.fps = float(options.fps)
+        self.frame_count = len(self.files)
+        self.read_ahead = max(0, int(options.read_ahead))
+        workers = int(options.workers) if options.workers > 0 else (os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sequence-decode")
+        self._pending: Dict[int, Future] = {}
+        self._pos = -1  # last grabbed frame
+        self._last: Optional[int] = None  # last retrieved frame
+        self._stride = 1
+
+    def _load(self, index: int) -> np.ndarray:
+        return preprocess(read_image(self.files[index]), max_width=self.max_width, roi=self.roi)
+
+    def _drop_before(self, index: int) -> None:
+        for stale in [i for i in self._pending if i < index]:
+            self._pending.pop(stale).cancel()
+
+    def seek(self, frame_index: int) -> bool:
+        frame_index = max(0, frame_index)
+        self._drop_before(frame_index)
+        self._pos = frame_index - 1
+        self._last = None
+        return frame_index == 0 or frame_index < self.frame_count
+
+    def grab(self) -> bool:
+        if self._pos + 1 >= self.frame_count:
+            return False
+        self._pos += 1
+        return True
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        index = self._pos
+        if index < 0:
+            return None
+        if self._last is not None and index > self._last:
+            self._stride = index - self._last
+        self._last = index
+        self._drop_before(index)
+        future = self._pending.pop(index, None) or self._pool.submit(self._load, index)
+
+        ahead = index + self._stride
+        while len(self._pending) < self.read_ahead and ahead < self.frame_count:
+            if ahead not in self._pending:
+                self._pending[ahead] = self._pool.submit(self._load, ahead)
+            ahead += self._stride
+
+        frame = future.result()
+        if out is not None and out.shape == frame.shape:
+            np.copyto(out, frame)
+            return out
+        return frame
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        return self.retrieve(out) if self.grab() else None
+
+    def release(self) -> None:
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+
+RAW_PIX_FMTS = ("gray", "yuv420p", "yuv422p", "yuv444p", "nv12", "nv21")  # 8-bit, luma plane first
+
+
+@dataclass(frozen=True)
+class RawFormat:
+    width: int
+    height: int
+    pix_fmt: str = "gray"
+    fps: float = 24.0  # raw frames carry no frame rate
+
+    def __post_init__(self):
+        if self.pix_fmt not in RAW_PIX_FMTS:
+            raise ValueError(f"Unknown raw pixel format: {self.pix_fmt} (expected one of {', '.join(RAW_PIX_FMTS)})")
+
+    @property
+    def frame_bytes(self) -> int:
+        luma = self.width * self.height
+        cw, ch = (self.width + 1) // 2, (self.height + 1) // 2
+        chroma = {
+            "gray": 0,
+            "yuv420p": 2 * cw * ch,
+            "nv12": 2 * cw * ch,
+            "nv21": 2 * cw * ch,
+            "yuv422p": 2 * cw * self.height,
+            "yuv444p": 2 * luma,
+        }
+        return luma + chroma[self.pix_fmt]
+
+
+def parse_raw_size(value: str) -> Tuple[int, int]:
+    """"WxH" -> (W, H)."""
+    try:
+        w, h = (int(v) for v in str(value).lower().split("x", 1))
+    except ValueError:
+        raise ValueError(f"Invalid raw frame size: {value!r} (expected WxH)") from None
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Invalid raw frame size: {value!r} (expected WxH)")
+    return w, h
+
+
+class RawFrameSource:
+    """
+    Headerless 8-bit frames (RAW_PIX_FMTS) from a file or a pipe ("-" =
+    stdin). Only the luma plane, which every format stores first, is scored:
+      - files are memory-mapped and each frame's luma is a view into the map
+      - pipes are read with readinto into `slots` reused frame buffers, and a
+        retrieved frame's luma is a view of its buffer, valid until `slots`
+        - 1 further frames have been retrieved
+    So the luma plane is never copied (an ROI is a view too); only a
+    max_width downscale writes a new, smaller image into the caller's `out`.
+    Pipes read forward only: seek() skips ahead and cannot go back.
+    """
+
+    name = "raw"
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fmt: RawFormat,
+        max_width: int = 640,
+        roi: Optional[Roi] = None,
+        slots: int = 4,
+    ):
+        self.fmt = fmt
+        self.frame_bytes = fmt.frame_bytes
+        self.max_width = max_width
+        self.roi = roi
+        self.fps = float(fmt.fps)
+        self._index = -1  # last grabbed frame
+        self._map: Optional[np.memmap] = None
+        self._stream = None
+        path = str(path)
+        if path != "-" and Path(path).is_file():
+            count = Path(path).stat().st_size // self.frame_bytes
+            if count:
+                self._map = np.memmap(path, dtype=np.uint8, mode="r", shape=(count, self.frame_bytes))
+            self.frame_count = count
+            self.seekable = True
+        else:
+            self._stream = sys.stdin.buffer if path == "-" else open(path, "rb", buffering=0)
+            self._owns_stream = path != "-"
+            self._buffers = [bytearray(self.frame_bytes) for _ in range(max(2, slots))]
+            self._slot = 0
+            self.frame_count = 0  # unknown until EOF
+            self.seekable = False
+
+    def _read_frame(self) -> bool:
+        view = memoryview(self._buffers[self._slot])
+        got = 0
+        while got < self.frame_bytes:
+            n = self._stream.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def seek(self, frame_index: int) -> bool:
+        frame_index = max(0, frame_index)
+        if self._map is not None or self._stream is None:
+            self._index = frame_index - 1
+            return frame_index == 0 or frame_index < self.frame_count
+        while self._index + 1 < frame_index:  # pipes only move forward
+            if not self.grab():
+                return False
+        return self._index + 1 == frame_index
+
+    def grab(self) -> bool:
+        if self._stream is not None:
+            if not self._read_frame():  # skipped frames land in the same slot
+                return False
+        elif self._index + 1 >= self.frame_count:
+            return False
+        self._index += 1
+        return True
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        if self._index < 0:
+            return None
+        w, h = self.fmt.width, self.fmt.height
+        if self._stream is not None:
+            frame = np.frombuffer(self._buffers[self._slot], dtype=np.uint8, count=w * h)
+            self._slot = (self._slot + 1) % len(self._buffers)  # keep this frame; the next lands elsewhere
+        else:
+            frame = self._map[self._index, :w * h]
+        luma = frame.reshape(h, w)
+        if self.roi is not None:
+            x, y, rw, rh = self.roi
+            luma = luma[y:y + rh, x:x + rw]
+        size = scaled_size(luma.shape[1], luma.shape[0], self.max_width, w)
+        if size == (luma.shape[1], luma.shape[0]):
+            return luma
+        return cv2.resize(luma, size, dst=out, interpolation=cv2.INTER_AREA)
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        return self.retrieve(out) if self.grab() else None
+
+    def release(self) -> None:
+        self._map = None
+        if self._stream is not None and self._owns_stream:
+            self._stream.close()
+        self._stream = None
+
+
+def resolve_backend(backend: str, ffmpeg: str = "ffmpeg") -> str:
+    backend = str(backend or "opencv").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown frame source: {backend} (expected one of {', '.join(BACKENDS)})")
+    if backend == "auto":
+        return "ffmpeg" if shutil.which(ffmpeg) else "opencv"
+    return backend
+
+
+def open_frame_source(
+    video_path: Path,
+    backend: str = "opencv",
+    max_width: int = 640,
+    ffmpeg: str = "ffmpeg",
+    roi: Optional[Roi] = None,
+    sequence: Optional[SequenceOptions] = None,
+    raw: Optional[RawFormat] = None,
+    slots: int = 4,
+):
+    """
+    Open `video_path` with the named backend ("opencv", "ffmpeg" or "auto"),
+    cropped to `roi` if given. Image sequences (folders and patterns, see
+    Stages.image_sequence) always open as an ImageSequenceSource, and with
+    `raw` the path ("-" = stdin) is read as headerless frames by a
+    RawFrameSource keeping `slots` frames alive when it is a pipe.
+    """
+    if raw is not None:
+        return RawFrameSource(video_path, raw, max_width=max_width, roi=roi, slots=slots)
+    if is_image_sequence(video_path):
+        return ImageSequenceSource(video_path, max_width=max_width, roi=roi, options=sequence)
+    if resolve_backend(backend, ffmpeg) == "ffmpeg":
+        return FFmpegFrameSource(video_path, max_width=max_width, ffmpeg=ffmpeg, roi=roi)
+    return OpenCVFrameSource(video_path, max_width=max_width, roi=roi)
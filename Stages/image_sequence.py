@@ -0,0 +1,176 @@
+# Stages/image_sequence.py
+from __future__ import annotations
+
+import glob
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")  # read when the first EXR is decoded
+
+import numpy as np
+import cv2
+
+
+SEQUENCE_EXTENSIONS = (".dpx", ".exr", ".png", ".tif", ".tiff", ".jpg", ".jpeg", ".bmp")
+
+_NUMBERED = re.compile(r"^(.*?)(\d+)$")  # stem = prefix + frame number
+_PRINTF = re.compile(r"%0?(\d*)d")
+_HASHES = re.compile(r"#+|@+")
+_BRACKET = re.compile(r"\[(\d+)-(\d+)\]")  # Resolve's "name_[1001-1240].dpx"
+
+
+def _is_image(path: Union[str, Path]) -> bool:
+    return Path(path).suffix.lower() in SEQUENCE_EXTENSIONS
+
+
+def _has_pattern(name: str) -> bool:
+    return bool(_PRINTF.search(name) or _HASHES.search(name) or _BRACKET.search(name) or any(c in name for c in "*?"))
+
+
+def is_image_sequence(path: Union[str, Path]) -> bool:
+    """
+    True for a folder of numbered images, a pattern ("shot_%04d.dpx",
+    "shot_####.exr", "shot_[1001-1240].dpx", "shot_*.png") or one numbered
+    image standing for its whole sequence.
+    """
+    p = Path(path)
+    if p.is_dir():
+        return True
+    if not _is_image(p):
+        return False
+    return _has_pattern(p.name) or bool(_NUMBERED.match(p.stem))
+
+
+def _frame_number(path: Path) -> Tuple[int, str]:
+    m = _NUMBERED.match(path.stem)
+    return (int(m.group(2)), path.name) if m else (-1, path.name)
+
+
+def _numbered_siblings(folder: Path, prefix: str, suffix: str, first: int = 0, last: int = -1) -> List[Path]:
+    numbered = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$", re.IGNORECASE)
+    frames = []
+    for entry in os.scandir(folder):
+        m = numbered.match(entry.name)
+        if m and entry.is_file() and (last < 0 or first <= int(m.group(1)) <= last):
+            frames.append((int(m.group(1)), Path(entry.path)))
+    return [path for _number, path in sorted(frames)]
+
+
+def resolve_sequence(path: Union[str, Path]) -> List[Path]:
+    """Frame files of the sequence `path` names (see is_image_sequence), in frame-number order."""
+    p = Path(path)
+    if p.is_dir():
+        groups: Dict[Tuple[str, str], List[Path]] = {}
+        for entry in os.scandir(p):
+            child = Path(entry.path)
+            m = _NUMBERED.match(child.stem)
+            if m and _is_image(child) and entry.is_file():
+                groups.setdefault((m.group(1), child.suffix.lower()), []).append(child)
+        if not groups:
+            return []
+        largest = max(groups.values(), key=len)  # one folder, one sequence; stray stills are ignored
+        return sorted(largest, key=_frame_number)
+
+    folder, name = p.parent, p.name
+    for marker in (_PRINTF, _HASHES, _BRACKET):
+        m = marker.search(name)
+        if m:
+            first, last = (int(m.group(1)), int(m.group(2))) if marker is _BRACKET else (0, -1)
+            return _numbered_siblings(folder, name[:m.start()], name[m.end():], first, last)
+    if any(c in name for c in "*?"):
+        return sorted((Path(f) for f in glob.glob(str(p)) if _is_image(f)), key=_frame_number)
+    m = _NUMBERED.match(p.stem)
+    if m:
+        return _numbered_siblings(folder, m.group(1), p.suffix)
+    return [p] if p.is_file() else []
+
+
+def _dpx_header(data: np.ndarray) -> Dict:
+    magic = bytes(data[:4])
+    if magic == b"SDPX":
+        endian = ">"
+    elif magic == b"XPDS":
+        endian = "<"
+    else:
+        raise ValueError("Not a DPX file")
+    u32 = np.dtype(endian + "u4")
+    u16 = np.dtype(endian + "u2")
+
+    def field(offset: int, dtype: np.dtype) -> int:
+        return int(np.frombuffer(data, dtype=dtype, count=1, offset=offset)[0])
+
+    eol = field(812, u32)
+    return {
+        "endian": endian,
+        "offset": field(808, u32) or field(4, u32),  # element data offset, else image data offset
+        "width": field(772, u32),
+        "height": field(776, u32),
+        "descriptor": int(data[800]),
+        "bits": int(data[803]),
+        "packing": field(804, u16),
+        "encoding": field(806, u16),
+        "eol_padding": 0 if eol == 0xFFFFFFFF else eol,
+    }
+
+
+def read_dpx(path: Union[str, Path]) -> np.ndarray:
+    """
+    First image element of an uncompressed DPX file as 8-bit BGR (RGB/RGBA
+    descriptors) or gray (luma descriptor). Covers 8- and 16-bit samples
+    and 10/12-bit samples filled into 32/16-bit words (packing 1 or 2),
+    which is what cameras, scanners and ffmpeg write.
+    """
+    data = np.fromfile(str(path), dtype=np.uint8)
+    h = _dpx_header(data)
+    channels = {50: 3, 51: 4, 6: 1}.get(h["descriptor"])
+    if channels is None or h["encoding"] != 0:
+        raise ValueError(f"Unsupported DPX layout (descriptor {h['descriptor']}, encoding {h['encoding']}): {path}")
+    width, height, bits, packing = h["width"], h["height"], h["bits"], h["packing"]
+    samples = width * channels
+
+    if bits == 8:
+        row_bytes = samples
+        rows = data[h["offset"]:]
+        values = _rows(rows, height, row_bytes + h["eol_padding"], row_bytes).reshape(height, samples)
+    elif bits == 16 or (bits == 12 and packing in (1, 2)):
+        words = _rows(data[h["offset"]:], height, samples * 2 + h["eol_padding"], samples * 2)
+        values = words.view(h["endian"] + "u2").reshape(height, samples)
+        if bits == 12:
+            values = values >> 4 if packing == 1 else values & 0x0FFF
+        values = (values >> (bits - 8)).astype(np.uint8)
+    elif bits == 10 and packing in (1, 2):
+        per_row = (samples + 2) // 3  # three samples per 32-bit word, rows end on a word
+        words = _rows(data[h["offset"]:], height, per_row * 4 + h["eol_padding"], per_row * 4)
+        words = words.view(h["endian"] + "u4").reshape(height, per_row)
+        shifts = (22, 12, 2) if packing == 1 else (20, 10, 0)
+        values = np.stack([(words >> s) & 0x3FF for s in shifts], axis=2).reshape(height, per_row * 3)[:, :samples]
+        values = (values >> 2).astype(np.uint8)
+    else:
+        raise ValueError(f"Unsupported DPX bit depth {bits} with packing {packing}: {path}")
+
+    image = np.ascontiguousarray(values).reshape(height, width, channels)
+    if channels == 1:
+        return image[:, :, 0]
+    return cv2.cvtColor(image, cv2.COLOR_RGBA2BGR if channels == 4 else cv2.COLOR_RGB2BGR)
+
+
+def _rows(data: np.ndarray, height: int, stride: int, row_bytes: int) -> np.ndarray:
+    # `height` rows of `row_bytes` bytes, `stride` bytes apart (end-of-line padding dropped).
+    if data.size < (height - 1) * stride + row_bytes:
+        raise ValueError("Truncated DPX image data")
+    if stride == row_bytes:
+        return data[:height * row_bytes].copy()
+    return np.lib.stride_tricks.as_strided(data, (height, row_bytes), (stride, 1)).copy()
+
+
+def read_image(path: Union[str, Path]) -> np.ndarray:
+    """One still as 8-bit BGR or gray: DPX via read_dpx, everything else via cv2.imread."""
+    if Path(path).suffix.lower() == ".dpx":
+        return read_dpx(path)
+    image = cv2.imread(str(path), cv2.IMREAD_ANYCOLOR)  # 16-bit and float inputs come back as 8-bit
+    if image is None:
+        hint = " (OpenCV was built without OpenEXR)" if Path(path).suffix.lower() == ".exr" else ""
+        raise ValueError(f"Could not decode image{hint}: {path}")
+    return image
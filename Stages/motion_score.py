@@ -1,136 +1,796 @@
 # Stages/motion_score.py
 from __future__ import annotations
 
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import List, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
-import cv2
 
 from Pipeline.config import UpscaleConfig
+from Stages.frame_ring import iter_ring
+from Stages.frame_source import (
+    RawFormat,
+    Roi,
+    SequenceOptions,
+    clip_roi,
+    open_frame_source,
+    parse_raw_size,
+    parse_roi,
+    resolve_roi,
+)
+from Stages.profiling import ProfiledSource, Profiler
+from Stages.score_kernels import Cascade, iter_samples, parse_tile_grid
+from Stages.score_sketch import ScoreSketch, auto_enabled, auto_threshold
 
 
-def _parse_tile_grid(tile_grid: Union[int, tuple, list, str]) -> Tuple[int, int]:
-    # Accept 8, (8,8), "8x8", "8,8"
-    if isinstance(tile_grid, int):
-        return max(1, tile_grid), max(1, tile_grid)
-    if isinstance(tile_grid, (tuple, list)) and len(tile_grid) == 2:
-        return max(1, int(tile_grid[0])), max(1, int(tile_grid[1]))
-    if isinstance(tile_grid, str):
-        s = tile_grid.lower().replace(" ", "")
-        if "x" in s:
-            a, b = s.split("x", 1)
-            return max(1, int(a)), max(1, int(b))
-        if "," in s:
-            a, b = s.split(",", 1)
-            return max(1, int(a)), max(1, int(b))
-        v = int(s)
-        return max(1, v), max(1, v)
-    return 8, 8
-
-
-def _preprocess(frame_bgr: np.ndarray, max_width: int = 640) -> np.ndarray:
-    """Grayscale + optional downscale for speed."""
-    gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
-    if max_width and gray.shape[1] > max_width:
-        h, w = gray.shape[:2]
-        scale = max_width / float(w)
-        gray = cv2.resize(gray, (max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
-    return gray
-
-
-def score_global(prev_gray: np.ndarray, curr_gray: np.ndarray) -> float:
-    """Whole-frame motion score in [0, ~1]."""
-    diff = cv2.absdiff(prev_gray, curr_gray)
-    diff = cv2.GaussianBlur(diff, (5, 5), 0)
-    return float(diff.mean()) / 255.0
-
-
-def score_detail(prev_gray: np.ndarray, curr_gray: np.ndarray, tile_grid) -> float:
-    """
-    Tile-based score: compute mean diff per tile, then average of the top 15% tiles.
-    Good for small localized motion (hair/blinks).
-    """
-    diff = cv2.absdiff(prev_gray, curr_gray)
-    diff = cv2.GaussianBlur(diff, (5, 5), 0)
-
-    gx, gy = _parse_tile_grid(tile_grid)
-    h, w = diff.shape[:2]
-    tw, th = max(1, w // gx), max(1, h // gy)
-
-    vals = []
-    for ty in range(gy):
-        y0 = ty * th
-        y1 = (ty + 1) * th if ty < gy - 1 else h
-        for tx in range(gx):
-            x0 = tx * tw
-            x1 = (tx + 1) * tw if tx < gx - 1 else w
-            tile = diff[y0:y1, x0:x1]
-            vals.append(float(tile.mean()) / 255.0)
-
-    v = np.array(vals, dtype=np.float32)
-    k = max(1, int(np.ceil(len(v) * 0.15)))   # top 15%
-    topk = np.partition(v, -k)[-k:]
-    return float(topk.mean())
+RING_SPAN = 8  # frames per FrameRing scoring task unless batching sets the span
+
+
+class ScoreBuffer:
+    """
+    Growable float64 score array. Capacity doubles when full, so appending a
+    sample's repeated score is a slice fill, not a list allocation.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self._data = np.empty(max(16, int(capacity)), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, size: int) -> None:
+        if size > len(self._data):
+            data = np.empty(max(size, 2 * len(self._data)), dtype=np.float64)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+
+    def append(self, score: float, count: int = 1) -> None:
+        end = self._size + count
+        self._reserve(end)
+        self._data[self._size:end] = score
+        self._size = end
+
+    def extend(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        end = self._size + len(values)
+        self._reserve(end)
+        self._data[self._size:end] = values
+        self._size = end
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def view(self, start: int = 0) -> np.ndarray:
+        """Scores [start:] without copying; valid until the next append."""
+        return self._data[start:self._size]
+
+
+def _sampled_frames(
+    source,
+    n: int,
+    limit: Optional[int] = None,
+    slots: int = 2,
+    buffers: Optional[List[np.ndarray]] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (grabbed, gray) for every Nth frame until EOF, or until `limit`
+    frames are covered. `grabbed` is how many source frames the sample stands for.
+
+    Frames are retrieved round-robin into `slots` reused buffers, so a frame
+    stays valid until `slots` - 1 more have been yielded: 2 covers the
+    scorer's prev/curr pair, decode-ahead needs its queue depth on top.
+    Given `buffers`, frames are written into those (in order) instead.
+    """
+    ring: List[Optional[np.ndarray]] = list(buffers) if buffers else [None] * max(2, slots)
+    slot = 0
+    covered = 0
+    while limit is None or covered < limit:
+        grabbed = 0
+        want = n if limit is None else min(n, limit - covered)
+
+        # Grab n frames quickly, decode only the last one
+        for _ in range(want):
+            ok = source.grab()
+            if not ok:
+                break
+            grabbed += 1
+
+        if grabbed == 0:
+            break
+
+        gray = source.retrieve(ring[slot])
+        if gray is None:
+            break
+        if buffers and gray is not ring[slot]:
+            gray = np.copyto(ring[slot], gray) or ring[slot]
+        ring[slot] = gray
+        slot = (slot + 1) % len(ring)
+
+        covered += grabbed
+        yield grabbed, gray
+
+
+def _decode_ahead(
+    frames: Iterator[Tuple[int, np.ndarray]],
+    depth: int,
+    stats: Optional[Dict] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Run `frames` on a decoder thread that keeps up to `depth` preprocessed
+    frames queued. grab/retrieve/cvtColor/resize release the GIL, so decoding
+    overlaps with scoring on the calling thread.
+
+    Fills `stats` with queue-depth figures: a scorer that often finds the queue
+    empty is decode-bound, a decoder that often finds it full is score-bound.
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    end = object()
+    counters = {"producer_blocked": 0, "producer_wait_s": 0.0}
+
+    def put(item) -> bool:
+        if q.full():
+            counters["producer_blocked"] += 1
+        t0 = time.perf_counter()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                counters["producer_wait_s"] += time.perf_counter() - t0
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in frames:
+                if not put(item):
+                    return
+        except BaseException as exc:  # re-raised on the scoring thread
+            put(exc)
+        put(end)
+
+    worker = threading.Thread(target=produce, name="decode-ahead", daemon=True)
+    worker.start()
+
+    received = 0
+    starved = 0
+    depth_sum = 0
+    depth_max = 0
+    consumer_wait = 0.0
+    try:
+        while True:
+            qsize = q.qsize()
+            depth_sum += qsize
+            depth_max = max(depth_max, qsize)
+            if qsize == 0:
+                starved += 1
+            t0 = time.perf_counter()
+            item = q.get()
+            t1 = time.perf_counter()
+            consumer_wait += t1 - t0
+            if profiler is not None:
+                profiler.add("queue_wait", t0, t1)
+            if item is end:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            received += 1
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+        if stats is not None:
+            polls = max(1, received + 1)
+            stats.update(
+                {
+                    "queue_size": max(1, depth),
+                    "frames": received,
+                    "mean_queue_depth": depth_sum / polls,
+                    "max_queue_depth": depth_max,
+                    "consumer_starved": starved,
+                    "producer_blocked": counters["producer_blocked"],
+                    "consumer_wait_s": consumer_wait,
+                    "producer_wait_s": counters["producer_wait_s"],
+                    "bound": "decode" if consumer_wait >= counters["producer_wait_s"] else "score",
+                }
+            )
+
+
+def format_decode_stats(stats: Dict) -> str:
+    return (
+        f"Decode-ahead: {stats.get('bound', '?')}-bound, "
+        f"queue depth mean {stats.get('mean_queue_depth', 0.0):.2f} / max {stats.get('max_queue_depth', 0)} "
+        f"of {stats.get('queue_size', 0)}, "
+        f"scorer waited {stats.get('consumer_wait_s', 0.0):.2f}s ({stats.get('consumer_starved', 0)} empty), "
+        f"decoder waited {stats.get('producer_wait_s', 0.0):.2f}s ({stats.get('producer_blocked', 0)} full)"
+    )
+
+
+def _score_frames(
+    source,
+    prev: np.ndarray,
+    mode: str,
+    grid: Tuple[int, int],
+    n: int,
+    limit: Optional[int] = None,
+    decode_ahead: int = 0,
+    stats: Optional[Dict] = None,
+    tiles: Optional[List[np.ndarray]] = None,
+    profiler: Optional[Profiler] = None,
+    cascade: Optional[Cascade] = None,
+    batch: int = 0,
+) -> np.ndarray:
+    """Score frames after `prev` until EOF, or until `limit` frames are covered."""
+    scores = ScoreBuffer(limit if limit is not None else max(0, source.frame_count))
+    samples = _iter_frames(source, prev, mode, grid, n, limit, decode_ahead, stats, tiles, profiler, cascade, batch)
+    for score, grabbed in samples:
+        scores.append(score, grabbed)
+    return scores.view()
+
+
+def _iter_frames(
+    source,
+    prev: np.ndarray,
+    mode: str,
+    grid: Tuple[int, int],
+    n: int,
+    limit: Optional[int] = None,
+    decode_ahead: int = 0,
+    stats: Optional[Dict] = None,
+    tiles: Optional[List[np.ndarray]] = None,
+    profiler: Optional[Profiler] = None,
+    cascade: Optional[Cascade] = None,
+    batch: int = 0,
+) -> Iterator[Tuple[float, int]]:
+    """Generator form of _score_frames: (per-frame score, grabbed) per sampled frame."""
+    # A decode-ahead queue holds up to `decode_ahead` frames besides the scorer's pair and the one in flight.
+    frames = _sampled_frames(source, n, limit, slots=decode_ahead + 3 if decode_ahead > 0 else 2)
+    if decode_ahead > 0:
+        frames = _decode_ahead(frames, decode_ahead, stats, profiler)
+    return iter_samples(prev, frames, mode, grid, tiles, profiler, cascade, batch)
+
+
+@dataclass
+class _ChunkJob:
+    video_path: str
+    start: int
+    end: Optional[int]
+    mode: str
+    grid: Tuple[int, int]
+    n: int
+    max_width: int
+    backend: str = "opencv"
+    ffmpeg: str = "ffmpeg"
+    decode_ahead: int = 0
+    keep_tiles: bool = False
+    profile: bool = False
+    static_floor: Optional[float] = None  # None = no static cascade
+    batch: int = 0  # >1 = stacked batch kernel
+    roi: Optional[Roi] = None  # (x, y, w, h) crop in source pixels, None = full frame
+    sequence: Optional[SequenceOptions] = None  # image-sequence decode settings
+    raw: Optional[RawFormat] = None  # headerless raw frames instead of a container
+
+
+ChunkResult = Tuple[np.ndarray, Optional[np.ndarray], Optional[Dict], Tuple[int, int]]
+
+
+def _score_chunk(job: _ChunkJob) -> ChunkResult:
+    """
+    Worker entry point: score frames (start, end] of one chunk.
+    Frame `start` is decoded again as the previous frame, so consecutive
+    chunks overlap by one sampled frame and no boundary diff is lost.
+    Returns (scores, tiles or None, Profiler.to_dict() or None,
+    (fast-path samples, samples) of the static cascade).
+    """
+    profiler = Profiler() if job.profile else None
+    cascade = Cascade(job.static_floor) if job.static_floor is not None else None
+    source = open_frame_source(job.video_path, job.backend, job.max_width, job.ffmpeg, job.roi, job.sequence, job.raw)
+    if profiler is not None:
+        source = ProfiledSource(source, profiler)
+    try:
+        if not source.seek(job.start):
+            return np.empty(0), None, None, (0, 0)
+        prev = source.read()
+        if prev is None:
+            return np.empty(0), None, None, (0, 0)
+        limit = None if job.end is None else job.end - job.start
+        tiles: Optional[List[np.ndarray]] = [] if job.keep_tiles else None
+        scores = _score_frames(
+            source, prev, job.mode, job.grid, job.n, limit, job.decode_ahead, tiles=tiles, profiler=profiler,
+            cascade=cascade, batch=job.batch,
+        )
+        counts = (cascade.fast, cascade.samples) if cascade is not None else (0, 0)
+        return scores, (np.stack(tiles) if tiles else None), (profiler.to_dict() if profiler else None), counts
+    finally:
+        source.release()
+
+
+def _decode_ring(job: _ChunkJob, buffers: List[np.ndarray]) -> Iterator[int]:
+    """
+    FrameRing decoder (see Stages.frame_ring): writes frame `job.start` into
+    buffers[0] and the sampled frames after it into buffers[1], buffers[2], ...
+    round-robin, yielding each one's grabbed count. Returns the decode profile.
+    """
+    profiler = Profiler() if job.profile else None
+    source = open_frame_source(job.video_path, job.backend, job.max_width, job.ffmpeg, job.roi, job.sequence, job.raw)
+    if profiler is not None:
+        source = ProfiledSource(source, profiler)
+    try:
+        first = source.read(buffers[0]) if source.seek(job.start) else None
+        if first is None:
+            return None
+        if first is not buffers[0]:
+            np.copyto(buffers[0], first)  # sources may hand back a view (raw frames)
+        yield 1
+        limit = None if job.end is None else job.end - job.start
+        for grabbed, _gray in _sampled_frames(source, job.n, limit, buffers=buffers[1:] + buffers[:1]):
+            yield grabbed
+    finally:
+        source.release()
+    return profiler.to_dict() if profiler is not None else None
+
+
+def _score_ring_span(job: _ChunkJob, prev: np.ndarray, frames: List[Tuple[int, np.ndarray]]) -> ChunkResult:
+    """FrameRing scorer: scores one span of (grabbed, gray) frames after `prev`, like _score_chunk."""
+    profiler = Profiler() if job.profile else None
+    cascade = Cascade(job.static_floor) if job.static_floor is not None else None
+    tiles: Optional[List[np.ndarray]] = [] if job.keep_tiles else None
+    scores = ScoreBuffer(sum(grabbed for grabbed, _gray in frames))
+    for score, grabbed in iter_samples(prev, iter(frames), job.mode, job.grid, tiles, profiler, cascade, job.batch):
+        scores.append(score, grabbed)
+    counts = (cascade.fast, cascade.samples) if cascade is not None else (0, 0)
+    return scores.view(), (np.stack(tiles) if tiles else None), (profiler.to_dict() if profiler else None), counts
+
+
+def _chunk_bounds(
+    first: int,
+    stop: int,
+    chunk_frames: int,
+    n: int,
+    last_end: Optional[int] = None,
+) -> List[Tuple[int, Optional[int]]]:
+    # Chunk edges sit at first + multiples of n so every chunk samples the same frames as the serial pass.
+    size = max(n, (max(1, chunk_frames) + n - 1) // n * n)
+    bounds: List[Tuple[int, Optional[int]]] = []
+    start = first
+    while start + size < stop:
+        bounds.append((start, start + size))
+        start += size
+    bounds.append((start, last_end))  # None = run to EOF; frame counts can be off
+    return bounds
+
+
+@dataclass
+class ScoringRun:
+    """An opened scoring pass (see start_scoring_run), consumed by iter_score_batches."""
+
+    source: object
+    prev: np.ndarray
+    fps: float
+    range_start: int
+    limit: Optional[int]
+    bounds: List[Tuple[int, Optional[int]]]
+    template: _ChunkJob
+    workers: int
+    ring_slots: int = 0
+    seekable: bool = True  # False for pipes: no chunks, no refinement windows
+
+
+def start_scoring_run(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    max_width: int = 640,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    keep_tiles: bool = False,
+    profiler: Optional[Profiler] = None,
+) -> ScoringRun:
+    """
+    Opens the source, decodes the first previous frame and plans the chunks.
+    The source stays open until iter_score_batches over the run finishes.
+    """
+    ffmpeg = str(getattr(cfg, "ffmpeg_path", "ffmpeg") or "ffmpeg")
+    t_roi = time.perf_counter()
+    roi = roi_from_config(cfg, video_path, frame_range)
+    t_open = time.perf_counter()
+    if profiler is not None and getattr(cfg, "score_roi", ""):
+        profiler.add("roi", t_roi, t_open)
+    sequence = sequence_options_from_config(cfg)
+    raw = raw_format_from_config(cfg)
+    decode_ahead = max(0, int(getattr(cfg, "decode_ahead", 0)))
+    slots = decode_ahead + 3 if decode_ahead > 0 else 2  # frames a raw pipe keeps alive, as in _iter_frames
+    source = open_frame_source(
+        video_path, getattr(cfg, "frame_source", "opencv"), max_width, ffmpeg, roi, sequence, raw, slots
+    )
+    if profiler is not None:
+        profiler.add("open", t_open, time.perf_counter())
+        source = ProfiledSource(source, profiler)
+
+    fps = source.fps
+    if fps <= 0:
+        fps = 30.0  # fallback
+
+    n = max(1, int(getattr(cfg, "sample_every_n", 1)))
+    mode = str(getattr(cfg, "motion_mode", "detail")).lower()
+    grid = parse_tile_grid(getattr(cfg, "tile_grid", (8, 8)))
+
+    workers = int(getattr(cfg, "score_workers", 1))
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    chunk_frames = int(getattr(cfg, "score_chunk_frames", 1800))
+    static_floor = static_floor_from_config(cfg) if not keep_tiles else None
+    batch = max(0, int(getattr(cfg, "score_batch_frames", 0)))
+    ring_slots = max(0, int(getattr(cfg, "score_ring_slots", 0)))
+    seekable = getattr(source, "seekable", True)
+    if not seekable:
+        workers, ring_slots = 1, 0  # a pipe cannot be reopened by other processes
+    frame_count = source.frame_count
+
+    range_start, range_end = 0, None
+    if frame_range is not None:
+        range_start = max(0, int(frame_range[0]))
+        if frame_range[1] is not None:
+            range_end = max(range_start, int(frame_range[1]))
+    base = range_start - 1 if range_start > 0 else 0  # decoded as the previous frame only
+
+    if not source.seek(base):
+        source.release()
+        raise RuntimeError(f"Could not seek to frame {base}: {video_path}")
+    prev = source.read()
+    if prev is None:
+        source.release()
+        raise RuntimeError(f"Could not read frame {base}: {video_path}")
+
+    limit = None if range_end is None else range_end - base
+    stop = frame_count if range_end is None else range_end
+    bounds = _chunk_bounds(base, stop, chunk_frames, n, range_end)
+    template = _ChunkJob(
+        str(video_path), base, range_end, mode, grid, n, max_width,
+        backend=source.name, ffmpeg=ffmpeg, decode_ahead=decode_ahead, keep_tiles=keep_tiles,
+        profile=profiler is not None, static_floor=static_floor, batch=batch, roi=roi,
+        sequence=sequence, raw=raw,
+    )
+    return ScoringRun(source, prev, fps, range_start, limit, bounds, template, workers, ring_slots, seekable)
+
+
+def _pool_chunks(run: ScoringRun) -> Iterator[ChunkResult]:
+    # One seeking decoder per chunk, scored in worker processes; results in chunk order.
+    jobs = [replace(run.template, start=start, end=end) for start, end in run.bounds]
+    pool = ProcessPoolExecutor(max_workers=min(run.workers, len(jobs)))
+    try:
+        yield from pool.map(_score_chunk, jobs)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _ring_chunks(
+    run: ScoringRun,
+    stats: Optional[Dict] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[ChunkResult]:
+    # One sequential decoder process feeding run.workers scorers through a shared-memory FrameRing.
+    job = run.template
+    span = job.batch if job.batch > 1 else RING_SPAN
+    span = max(1, min(span, (run.ring_slots - 1) // max(1, run.workers)))  # keep every scorer fed
+    summary: Dict = {}
+    try:
+        yield from iter_ring(
+            _decode_ring, _score_ring_span, job, run.prev.shape[:2], run.ring_slots, run.workers, span, summary
+        )
+    finally:
+        if profiler is not None:
+            profiler.merge(summary.get("decoder"))
+        if stats is not None:
+            stats.update({f"ring_{key}": value for key, value in summary.items() if key != "decoder"})
+
+
+def iter_score_batches(
+    run: ScoringRun,
+    out: ScoreBuffer,
+    stats: Optional[Dict] = None,
+    tiles: Optional[List[np.ndarray]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[int]:
+    """
+    Appends per-frame scores to `out` in frame order and yields the index in
+    `out` where each batch starts: one batch per sampled frame on the serial
+    path, one per chunk (in chunk order) on the parallel path and one per span
+    on the frame-ring path. The source is released when the generator
+    finishes or is closed.
+    """
+    job = run.template
+    cascade = Cascade(job.static_floor) if job.static_floor is not None else None
+    if job.roi is not None and stats is not None:
+        stats["roi"] = list(job.roi)
+    try:
+        if run.range_start == 0:
+            if tiles is not None:
+                tiles.append(np.zeros((job.grid[1], job.grid[0]), dtype=np.float16))
+            start = len(out)
+            out.append(0.0)  # frame 0 has no previous frame
+            yield start
+
+        if run.ring_slots > 0 or (run.workers > 1 and len(run.bounds) > 1):
+            run.source.release()
+            chunks = _ring_chunks(run, stats, profiler) if run.ring_slots > 0 else _pool_chunks(run)
+            try:
+                for chunk, chunk_tiles, chunk_profile, counts in chunks:
+                    if tiles is not None and chunk_tiles is not None:
+                        tiles.extend(chunk_tiles)
+                    if profiler is not None:
+                        profiler.merge(chunk_profile)
+                    if cascade is not None:
+                        cascade.fast += counts[0]
+                        cascade.samples += counts[1]
+                    start = len(out)
+                    out.extend(chunk)
+                    yield start
+            finally:
+                chunks.close()
+            return
+
+        samples = _iter_frames(
+            run.source, run.prev, job.mode, job.grid, job.n, run.limit, job.decode_ahead, stats, tiles, profiler,
+            cascade, job.batch,
+        )
+        for score, grabbed in samples:
+            start = len(out)
+            out.append(score, grabbed)
+            yield start
+    finally:
+        run.source.release()
+        if cascade is not None and stats is not None:
+            _add_cascade_stats(stats, cascade.fast, cascade.samples)
+
+
+def _add_cascade_stats(stats: Dict, fast: int, samples: int) -> None:
+    stats["cascade_fast"] = stats.get("cascade_fast", 0) + fast
+    stats["cascade_samples"] = stats.get("cascade_samples", 0) + samples
+
+
+def static_floor_from_config(cfg: UpscaleConfig) -> Optional[float]:
+    """Thumbnail floor of the static cascade, or None when cfg.static_cascade is off."""
+    if not getattr(cfg, "static_cascade", False):
+        return None
+    return max(0.0, float(getattr(cfg, "static_floor", 0.02)))
+
+
+def sequence_options_from_config(cfg: UpscaleConfig) -> SequenceOptions:
+    """Image-sequence source settings (only used when the input is a sequence)."""
+    return SequenceOptions(
+        fps=float(getattr(cfg, "sequence_fps", 24.0)),
+        workers=int(getattr(cfg, "sequence_workers", 0)),
+        read_ahead=int(getattr(cfg, "sequence_read_ahead", 8)),
+    )
+
+
+def roi_from_config(
+    cfg: UpscaleConfig,
+    video_path: Path,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+) -> Optional[Roi]:
+    """Scoring crop for cfg.score_roi (None = full frame); "auto" samples `video_path` for letterbox bars."""
+    value = getattr(cfg, "score_roi", "")
+    if not value:
+        return None
+    raw = raw_format_from_config(cfg)
+    if raw is not None:
+        roi = parse_roi(value)
+        if roi == "auto":
+            raise ValueError("score_roi='auto' needs a video or image-sequence input; give x,y,w,h for raw frames")
+        return clip_roi(roi, raw.width, raw.height)
+    return resolve_roi(video_path, value, int(getattr(cfg, "roi_black_level", 24)), frame_range)
+
+
+def raw_format_from_config(cfg: UpscaleConfig) -> Optional[RawFormat]:
+    """Declared raw frame format (cfg.raw_size / raw_pix_fmt / raw_fps), or None for container input."""
+    size = getattr(cfg, "raw_size", "")
+    if not size:
+        return None
+    width, height = parse_raw_size(size)
+    return RawFormat(width, height, str(getattr(cfg, "raw_pix_fmt", "gray")).lower(), float(getattr(cfg, "raw_fps", 24.0)))
 
 
 def compute_motion_scores(
     video_path: Path,
     cfg: UpscaleConfig,
     *,
-    max_width: int = 640
-) -> Tuple[List[float], float]:
+    max_width: int = 640,
+    stats: Optional[Dict] = None,
+    tiles: Optional[List[np.ndarray]] = None,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+    sketch: Optional[ScoreSketch] = None,
+) -> Tuple[np.ndarray, float]:
     """
-    Returns (scores_per_frame, fps).
+    Returns (scores_per_frame, fps); scores are a float64 array.
 
     Uses cfg.sample_every_n:
       - only *scores* every Nth frame (faster)
       - repeats that score for the skipped frames
       - divides by N so scores stay closer to per-frame scale
+
+    frame_range=(in, out) scores only source frames in..out (inclusive, out=None = EOF).
+    The other cfg scoring options are listed in the README; workers, the frame
+    ring, decode-ahead and batching leave the scores unchanged. `stats`,
+    `tiles`, `profiler` and `sketch` are optional outputs filled during the run.
     """
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        raise FileNotFoundError(f"Could not open video: {video_path}")
+    run = start_scoring_run(video_path, cfg, max_width, frame_range, tiles is not None, profiler)
+    template, n, range_start, workers = run.template, run.template.n, run.range_start, run.workers
+    fps = run.fps
 
-    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0)
-    if fps <= 0:
-        fps = 30.0  # fallback
+    expected = run.limit if run.limit is not None else run.source.frame_count - range_start
+    buffer = ScoreBuffer(expected + 1)
+    for start in iter_score_batches(run, buffer, stats, tiles, profiler):
+        if sketch is not None:
+            sketch.update(buffer.view(start))
+    scores = buffer.view()
 
+    if n > 1 and getattr(cfg, "adaptive_sampling", False) and run.seekable:
+        threshold = float(getattr(cfg, "sensitivity", 0.20))
+        if sketch is not None and auto_enabled(cfg):
+            threshold, _info = auto_threshold(sketch, cfg)
+        margin = float(getattr(cfg, "adaptive_margin", 0.5))
+        windows = _refine_windows(scores, n, threshold, margin, first=1 if range_start == 0 else 0)
+        jobs = [
+            replace(template, start=range_start + start - 1, end=range_start + end, n=1)
+            for start, end in windows
+        ]
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                refined = list(pool.map(_score_chunk, jobs))
+        else:
+            refined = [_score_chunk(job) for job in jobs]
+        refined_frames = 0
+        for (start, _end), (chunk, chunk_tiles, chunk_profile, counts) in zip(windows, refined):
+            if sketch is not None:
+                sketch.update(scores[start:start + len(chunk)], weight=-1)
+                sketch.update(chunk)
+            scores[start:start + len(chunk)] = chunk
+            if tiles is not None and chunk_tiles is not None:
+                tiles[start:start + len(chunk_tiles)] = list(chunk_tiles)
+            if profiler is not None:
+                profiler.merge(chunk_profile)
+            if stats is not None and template.static_floor is not None:
+                _add_cascade_stats(stats, *counts)
+            refined_frames += len(chunk)
+        if stats is not None:
+            stats["refine_windows"] = len(windows)
+            stats["refined_frames"] = refined_frames
+            stats["total_frames"] = len(scores)
+
+    if profiler is not None:
+        profiler.frames += len(scores)
+    return scores, fps
+
+
+def stream_motion_scores(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    *,
+    max_width: int = 640,
+    stats: Optional[Dict] = None,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+    sketch: Optional[ScoreSketch] = None,
+) -> Tuple[Iterator[float], float]:
+    """
+    Returns (scores, fps) like compute_motion_scores, but `scores` is a
+    generator that yields each frame's score as soon as it is known (per
+    sample on the serial path, per chunk in order on the parallel path).
+    Values are identical to compute_motion_scores.
+
+    The source is opened here, so open/seek errors raise immediately; close
+    the generator to stop decoding early. Adaptive refinement needs the whole
+    coarse pass, so with cfg.adaptive_sampling (N > 1) the scores are computed
+    first and then yielded.
+
+    A `sketch` receives each batch before its scores are yielded, so it is
+    complete once the generator is exhausted.
+    """
     n = max(1, int(getattr(cfg, "sample_every_n", 1)))
-    mode = str(getattr(cfg, "motion_mode", "detail")).lower()
-    tile_grid = getattr(cfg, "tile_grid", (8, 8))
+    if n > 1 and getattr(cfg, "adaptive_sampling", False):
+        scores, fps = compute_motion_scores(
+            video_path, cfg, max_width=max_width, stats=stats, frame_range=frame_range, profiler=profiler,
+            sketch=sketch,
+        )
+        return iter(scores), fps
 
-    ret, first = cap.read()
-    if not ret:
-        raise RuntimeError(f"Could not read first frame: {video_path}")
+    run = start_scoring_run(video_path, cfg, max_width, frame_range, False, profiler)
+    return _iter_scores(run, stats, profiler, sketch), run.fps
 
-    prev = _preprocess(first, max_width=max_width)
-    scores: List[float] = [0.0]  # frame 0 has no previous frame
 
-    while True:
-        grabbed = 0
+def _iter_scores(
+    run: ScoringRun,
+    stats: Optional[Dict],
+    profiler: Optional[Profiler],
+    sketch: Optional[ScoreSketch] = None,
+) -> Iterator[float]:
+    count = 0
+    buffer = ScoreBuffer(256)  # one batch at a time
+    for start in iter_score_batches(run, buffer, stats, None, profiler):
+        batch = buffer.view(start)
+        count += len(batch)
+        if sketch is not None:
+            sketch.update(batch)
+        yield from batch.tolist()
+        buffer.clear()
+    if profiler is not None:
+        profiler.frames += count
 
-        # Grab n frames quickly, decode only the last one
-        for _ in range(n):
-            ok = cap.grab()
-            if not ok:
-                break
-            grabbed += 1
 
-        if grabbed == 0:
-            break
+def _refine_windows(
+    scores: Sequence[float],
+    n: int,
+    threshold: float,
+    margin: float,
+    first: int = 1,
+) -> List[Tuple[int, int]]:
+    """
+    Inclusive score-index ranges worth rescoring at full rate after a stride-n
+    pass whose first sample starts at scores[first].
 
-        ret2, frame = cap.retrieve()
-        if not ret2:
-            break
+    Works on each sample's undivided score (the diff across its n frames):
+    dividing by n smears a short burst far below the threshold, while the
+    undivided value stays high whenever something moved inside the window.
+    Samples at or above threshold - margin * threshold, or whose value jumps
+    by more than that band from the previous sample, are flagged, plus one
+    sample either side. Static stretches stay at the coarse rate.
+    """
+    values = np.asarray(scores[first::n], dtype=np.float64) * n  # one value per sample
+    if values.size == 0:
+        return []
+    band = margin * threshold
+    flagged = (values >= threshold - band) | (np.abs(np.diff(values, prepend=values[0])) > band)
+    dilated = flagged.copy()
+    dilated[1:] |= flagged[:-1]
+    dilated[:-1] |= flagged[1:]
 
-        curr = _preprocess(frame, max_width=max_width)
+    idx = np.flatnonzero(dilated)
+    if idx.size == 0:
+        return []
+    last = len(scores) - 1
+    breaks = np.flatnonzero(np.diff(idx) > 1)
+    return [
+        (first + int(a) * n, min(last, first + (int(b) + 1) * n - 1))
+        for a, b in zip(np.r_[idx[0], idx[breaks + 1]], np.r_[idx[breaks], idx[-1]])
+    ]
 
-        raw = score_global(prev, curr) if mode == "global" else score_detail(prev, curr, tile_grid)
-        score = raw / grabbed
-        scores.extend([score] * grabbed)
 
-        prev = curr
+def describe_score_stats(stats: Dict) -> List[str]:
+    """Human-readable lines for whatever `stats` the scoring run filled in."""
+    lines = []
+    if "roi" in stats:
+        x, y, w, h = stats["roi"]
+        lines.append(f"Scoring ROI: {w}x{h} at ({x}, {y})")
+    if "bound" in stats:
+        lines.append(format_decode_stats(stats))
+    if "ring_slots" in stats:
+        lines.append(
+            f"Frame ring: {stats.get('ring_frames', 0)} frames through {stats['ring_slots']} shared slots, "
+            f"{stats.get('ring_scorers', 0)} scorer(s) on {stats.get('ring_span', 0)}-frame spans; "
+            f"decoder waited {stats.get('ring_decoder_wait_s', 0.0):.2f}s for free slots, "
+            f"results waited {stats.get('ring_wait_s', 0.0):.2f}s"
+        )
+    if "cascade_samples" in stats:
+        total = max(1, int(stats["cascade_samples"]))
+        lines.append(
+            f"Static cascade: {stats['cascade_fast']} of {stats['cascade_samples']} samples "
+            f"({100.0 * stats['cascade_fast'] / total:.1f}%) took the thumbnail fast path"
+        )
+    if "refined_frames" in stats:
+        total = max(1, int(stats.get("total_frames", 0)))
+        lines.append(
+            f"Adaptive sampling: rescored {stats['refined_frames']} of {total} frames "
+            f"({100.0 * stats['refined_frames'] / total:.1f}%) in {stats.get('refine_windows', 0)} windows"
+        )
+    return lines
 
-    cap.release()
-    return scores, fps
@@ -0,0 +1,243 @@
+# Stages/profiling.py
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+MAX_TRACE_EVENTS = 200_000  # per profiler; totals keep counting after the trace is full
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None where it cannot be read."""
+    if sys.platform.startswith("win"):
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _Counters(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(_Counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return int(counters.PeakWorkingSetSize)
+        except Exception:
+            return None
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024  # macOS reports bytes, Linux KiB
+
+
+class Profiler:
+    """
+    Accumulates wall time and call counts per named phase, plus a bounded list
+    of Chrome trace events (chrome://tracing, Perfetto).
+
+    Hot loops call `add(name, t0, t1)` with perf_counter() values they took
+    themselves; the scorer only takes those timestamps when a profiler is
+    passed, so a disabled profile costs one `is None` check per frame.
+    Phases are recorded from whichever thread runs them (the decode-ahead
+    thread records grab/retrieve/preprocess).
+    """
+
+    def __init__(self, max_events: int = MAX_TRACE_EVENTS):
+        self.max_events = int(max_events)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.frames = 0
+        self.totals: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.events: List[Dict] = []
+        self.dropped_events = 0
+        self.peak_rss: Optional[int] = None
+        self.worker_peak_rss: Dict[int, int] = {}
+        self.thread_names: Dict[tuple, str] = {}
+
+    def add(self, name: str, t0: float, t1: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + (t1 - t0)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if len(self.events) < self.max_events:
+            thread = threading.current_thread()
+            key = (os.getpid(), thread.ident)
+            if key not in self.thread_names:
+                self.thread_names[key] = thread.name
+            self.events.append(
+                {"name": name, "ph": "X", "ts": t0 * 1e6, "dur": (t1 - t0) * 1e6, "pid": key[0], "tid": key[1]}
+            )
+        else:
+            self.dropped_events += 1
+
+    def phase(self, name: str) -> "_Phase":
+        """Context-manager form of add(), for code outside the per-frame loop."""
+        return _Phase(self, name)
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+        self.peak_rss = peak_rss_bytes()
+
+    def to_dict(self) -> Dict:
+        """Picklable state, used to ship a worker's profile back to the parent process."""
+        return {
+            "totals": self.totals,
+            "calls": self.calls,
+            "events": self.events,
+            "dropped_events": self.dropped_events,
+            "thread_names": [[pid, tid, name] for (pid, tid), name in self.thread_names.items()],
+            "pid": os.getpid(),
+            "peak_rss": peak_rss_bytes(),
+        }
+
+    def merge(self, data: Optional[Dict]) -> None:
+        """Fold in a worker's to_dict(); its phase time is summed across processes."""
+        if not data:
+            return
+        for name, seconds in data["totals"].items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + data["calls"].get(name, 0)
+        room = max(0, self.max_events - len(self.events))
+        self.events.extend(data["events"][:room])
+        self.dropped_events += data.get("dropped_events", 0) + max(0, len(data["events"]) - room)
+        for pid, tid, name in data.get("thread_names", []):
+            self.thread_names.setdefault((pid, tid), name)
+        if data.get("peak_rss"):
+            pid = int(data["pid"])
+            self.worker_peak_rss[pid] = max(self.worker_peak_rss.get(pid, 0), int(data["peak_rss"]))
+
+    def summary(self) -> Dict:
+        wall = (self.finished or time.perf_counter()) - self.started
+        phase_total = sum(self.totals.values())
+        phases = {}
+        for name in sorted(self.totals, key=self.totals.get, reverse=True):
+            seconds = self.totals[name]
+            calls = self.calls.get(name, 0)
+            phases[name] = {
+                "seconds": seconds,
+                "calls": calls,
+                "mean_ms": 1000.0 * seconds / calls if calls else 0.0,
+                "share": seconds / phase_total if phase_total > 0 else 0.0,
+            }
+        peak = self.peak_rss if self.peak_rss is not None else peak_rss_bytes()
+        return {
+            "wall_s": wall,
+            "frames": self.frames,
+            "fps": self.frames / wall if wall > 0 else 0.0,
+            "peak_rss_mb": peak / 2 ** 20 if peak else None,
+            "worker_peak_rss_mb": {str(pid): v / 2 ** 20 for pid, v in self.worker_peak_rss.items()} or None,
+            "phases": phases,
+            "trace_events": len(self.events),
+            "dropped_trace_events": self.dropped_events,
+        }
+
+    def describe(self) -> List[str]:
+        s = self.summary()
+        peak = f", peak RSS {s['peak_rss_mb']:.0f} MiB" if s["peak_rss_mb"] else ""
+        lines = [f"Profile: {s['frames']} frames in {s['wall_s']:.2f}s ({s['fps']:.1f} fps){peak}"]
+        for name, p in s["phases"].items():
+            lines.append(
+                f"  {name:<12} {p['seconds']:8.3f}s {100.0 * p['share']:5.1f}%  "
+                f"{p['calls']:>8} calls  {p['mean_ms']:.3f} ms/call"
+            )
+        return lines
+
+    def write(self, prefix: str) -> List[Path]:
+        """Writes <prefix>.json (summary) and <prefix>.trace.json (Chrome trace); returns the paths."""
+        summary_path = Path(f"{prefix}.json")
+        trace_path = Path(f"{prefix}.trace.json")
+        with summary_path.open("w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+        base = min((e["ts"] for e in self.events), default=0.0)
+        events = [dict(e, ts=e["ts"] - base) for e in self.events]
+        for (pid, tid), name in self.thread_names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        with trace_path.open("w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return [summary_path, trace_path]
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "t0")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> "_Phase":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.add(self.name, self.t0, time.perf_counter())
+
+
+class ProfiledSource:
+    """
+    Frame source wrapper that times grab and retrieve. For the OpenCV source
+    retrieve is split into the decoder's retrieve and the cvtColor/resize
+    preprocess; the ffmpeg source already delivers gray frames.
+    """
+
+    def __init__(self, source, profiler: Profiler):
+        self.source = source
+        self.profiler = profiler
+        self.name = source.name
+        self.fps = source.fps
+        self.frame_count = source.frame_count
+
+    def seek(self, frame_index: int) -> bool:
+        with self.profiler.phase("seek"):
+            return self.source.seek(frame_index)
+
+    def grab(self) -> bool:
+        t0 = time.perf_counter()
+        ok = self.source.grab()
+        self.profiler.add("grab", t0, time.perf_counter())
+        return ok
+
+    def retrieve(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        if not hasattr(self.source, "retrieve_bgr"):
+            t0 = time.perf_counter()
+            frame = self.source.retrieve(out)
+            self.profiler.add("retrieve", t0, time.perf_counter())
+            return frame
+
+        t0 = time.perf_counter()
+        frame = self.source.retrieve_bgr()
+        t1 = time.perf_counter()
+        self.profiler.add("retrieve", t0, t1)
+        if frame is None:
+            return None
+        gray = self.source.convert(frame, out)
+        self.profiler.add("preprocess", t1, time.perf_counter())
+        return gray
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        return self.retrieve(out) if self.grab() else None
+
+    def release(self) -> None:
+        self.source.release()
@@ -2,16 +2,29 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 from Pipeline.config import UpscaleConfig
-from Stages.frame_detect import detect_motion_segments, segments_to_dict
-from Stages.motion_score import compute_motion_scores
+from Stages.frame_detect import OnlineSegmenter, SweepIndex, detect_motion_segments, sweep_to_dict
+from Stages.frame_source import source_frame_size
+from Stages.motion_score import compute_motion_scores, describe_score_stats
+from Stages.profiling import Profiler
+from Stages.resolve_items import is_retimed, source_range
+from Stages.score_cache import cache_from_config, cached_score_stream, lookup_scores
+from Stages.score_sketch import ScoreSketch, auto_enabled, auto_threshold
 
 
 MARKER_PREFIX = "[DSU]"
 DEFAULT_COLOR = "Blue"
+SWEEP_STEPS = 101  # matches the panel's 0-100 sensitivity slider
 
 
 def _load_segments(path: Path) -> Dict:
@@ -19,19 +32,99 @@ def _load_segments(path: Path) -> Dict:
         return json.load(f)
 
 
-def _compute_segments_from_video(video_path: Path, cfg: UpscaleConfig) -> Dict:
-    scores, fps = compute_motion_scores(video_path, cfg)
-    segments = detect_motion_segments(scores, cfg)
-    return {
-        "settings": {
-            "sensitivity": cfg.sensitivity,
-            "min_segment_frames": cfg.min_segment_frames,
-            "merge_gap_frames": cfg.merge_gap_frames,
-        },
+def _stream_markers_from_video(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    target,
+    color: str,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profile: Optional[str] = None,
+    sweep_out: Optional[str] = None,
+) -> Tuple[int, int, int, int]:
+    """
+    Scores the video and adds each segment's marker as soon as the online
+    segmenter finalizes it, so markers appear while scoring is still running.
+    Old [DSU] markers are cleared right before the first new one; a run that
+    finds no motion leaves them in place. Returns (frames, segments, removed, added).
+
+    With `sweep_out`, the scores are also kept (8 bytes per frame) and a
+    threshold sweep over the panel slider's 0.00-1.00 grid is written there.
+
+    With cfg.auto_sensitivity the threshold is only known once every score is
+    in, so the scores are kept and segmented (and marked) after scoring;
+    cfg.sensitivity is set to the picked threshold.
+    """
+    score_stats: Dict = {}
+    cache = cache_from_config(cfg)
+    profiler = Profiler() if profile else None
+    sketch = ScoreSketch() if auto_enabled(cfg) else None
+    scores, fps = cached_score_stream(
+        video_path, cfg, cache, stats=score_stats, frame_range=frame_range, profiler=profiler, sketch=sketch
+    )
+    segmenter = OnlineSegmenter(cfg)
+    kept = array("d") if sweep_out or sketch is not None else None
+    auto_info = None
+    removed = None
+    added = 0
+    found = 0
+
+    def place(done) -> None:
+        nonlocal removed, added, found
+        for start, end in done:
+            if removed is None:
+                removed = _clear_dsu_markers(target)
+            if _add_segment_marker(target, found, start, end, color):
+                added += 1
+            found += 1
+            print(f"Marker {found}: frames {start}-{end}", flush=True)
+
+    if sketch is not None:
+        kept.extend(scores)
+        cfg.sensitivity, auto_info = auto_threshold(sketch, cfg)
+        print(f"Auto sensitivity ({auto_info['method']}): threshold {cfg.sensitivity:.4f}", flush=True)
+        segmenter = OnlineSegmenter(cfg)
+        place(segmenter.push_many(kept))
+    else:
+        for score in scores:
+            if kept is not None:
+                kept.append(score)
+            done = segmenter.push(score)
+            if done:
+                place(done)
+    place(segmenter.finish())
+    if sweep_out:
+        _write_sweep(Path(sweep_out), kept, cfg, fps, auto_info)
+
+    for line in describe_score_stats(score_stats):
+        print(line)
+    if cache is not None:
+        print(cache.summary())
+    if profiler is not None:
+        profiler.finish()
+        for line in profiler.describe():
+            print(line)
+        summary_path, trace_path = profiler.write(profile)
+        print(f"Wrote profile -> {summary_path}, {trace_path}")
+    return segmenter.index, found, removed or 0, added
+
+
+def _write_sweep(path: Path, scores, cfg: UpscaleConfig, fps: float, auto_info: Optional[Dict] = None) -> None:
+    index = SweepIndex.from_config(np.frombuffer(scores, dtype=np.float64), cfg)
+    settings = {
+        "sensitivity": cfg.sensitivity,
+        "min_segment_frames": cfg.min_segment_frames,
+        "merge_gap_frames": cfg.merge_gap_frames,
+    }
+    if auto_info is not None:
+        settings["auto_sensitivity"] = auto_info
+    payload = {
+        "settings": settings,
         "fps": fps,
-        "frame_count": len(scores),
-        "segments": segments_to_dict(segments),
+        "frame_count": index.frame_count,
+        "sweep": sweep_to_dict(index.curve(np.round(np.arange(SWEEP_STEPS) / (SWEEP_STEPS - 1.0), 6))),
     }
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
 
 
 def _get_resolve():
@@ -72,20 +165,260 @@ def _clear_dsu_markers(target) -> int:
     return removed
 
 
+def _add_segment_marker(target, idx: int, start: int, end: int, color: str) -> bool:
+    label = f"{MARKER_PREFIX} seg {idx:03d}: {start}-{end}"
+    note = f"len {end - start + 1} frames"
+    return bool(target.AddMarker(start, color, label, note, end - start + 1, ""))
+
+
 def _add_segment_markers(target, segments, color: str) -> int:
     added = 0
     for idx, seg in enumerate(segments):
         start = int(seg["start"])
         end = int(seg["end"])
-        length = int(seg.get("length", end - start + 1))
-        label = f"{MARKER_PREFIX} seg {idx:03d}: {start}-{end}"
-        note = f"len {length} frames"
-        ok = target.AddMarker(start, color, label, note, length, "")
-        if ok:
+        if _add_segment_marker(target, idx, start, end, color):
             added += 1
     return added
 
 
+@dataclass
+class _TimelineItem:
+    track: int
+    item: object
+    path: str
+    frames: Optional[Tuple[int, int]]  # used source frames (inclusive), None = unknown, whole file
+
+
+@dataclass
+class _SourceJob:
+    path: str
+    frame_range: Tuple[int, Optional[int]]
+    items: List[_TimelineItem] = field(default_factory=list)
+
+    @property
+    def size(self) -> float:
+        start, end = self.frame_range
+        return float("inf") if end is None else end - start + 1
+
+
+def _parse_tracks(value: str, count: int) -> List[int]:
+    """"all", "2" or "1,3-4" -> the 1-based video track indices that exist, in order."""
+    value = str(value or "all").strip().lower()
+    if value == "all":
+        return list(range(1, count + 1))
+    tracks = set()
+    for part in value.split(","):
+        first, _, last = part.strip().partition("-")
+        try:
+            lo = int(first)
+            hi = int(last) if last else lo
+        except ValueError:
+            raise ValueError(f"Invalid track list: {value!r} (expected 'all' or e.g. 1,3-4)") from None
+        tracks.update(range(lo, hi + 1))
+    return sorted(t for t in tracks if 1 <= t <= count)
+
+
+def _item_path(item) -> str:
+    # Source file of a timeline item; "" for titles, generators and compound clips.
+    mpi = item.GetMediaPoolItem() if hasattr(item, "GetMediaPoolItem") else None
+    if not mpi:
+        return ""
+    props = mpi.GetClipProperty() or {}
+    return str(props.get("File Path", "") or "") if isinstance(props, dict) else ""
+
+
+def _timeline_items(timeline, tracks: List[int]) -> Tuple[List[_TimelineItem], int]:
+    """Items with a source file on `tracks`, and how many others (no source file, retimed) were skipped."""
+    found: List[_TimelineItem] = []
+    skipped = 0
+    for track in tracks:
+        for item in timeline.GetItemListInTrack("video", track) or []:
+            path = _item_path(item)
+            if not path:
+                skipped += 1
+                continue
+            if is_retimed(item):
+                # Its timeline frames are not source frames; scores would land on the wrong frames.
+                print(f"Skipping retimed clip {Path(path).name} on V{track}: speed changes are not supported.")
+                skipped += 1
+                continue
+            found.append(_TimelineItem(track, item, path, source_range(item)))
+    return found, skipped
+
+
+def _source_jobs(items: List[_TimelineItem], gap_frames: int) -> List[_SourceJob]:
+    """
+    One scoring job per used range of each source file. Items sharing a file
+    share its jobs, and ranges less than `gap_frames` apart are joined, since
+    decoding a short gap is cheaper than a second open and seek. An item whose
+    range is unknown makes its file one whole-file job.
+    """
+    by_path: Dict[str, List[_TimelineItem]] = {}
+    for it in items:
+        by_path.setdefault(it.path, []).append(it)
+    jobs: List[_SourceJob] = []
+    for path, group in by_path.items():
+        if any(it.frames is None for it in group):
+            jobs.append(_SourceJob(path, (0, None), group))
+            continue
+        current: Optional[_SourceJob] = None
+        for it in sorted(group, key=lambda it: it.frames):
+            start, end = it.frames
+            if current is not None and start <= current.frame_range[1] + gap_frames + 1:
+                current.frame_range = (current.frame_range[0], max(current.frame_range[1], end))
+                current.items.append(it)
+            else:
+                current = _SourceJob(path, (start, end), [it])
+                jobs.append(current)
+    return jobs
+
+
+def _score_source(
+    path: str, cfg: UpscaleConfig, frame_range: Tuple[int, Optional[int]]
+) -> Tuple[np.ndarray, float, float]:
+    # Pool worker: (scores, fps, seconds) for one source range.
+    t0 = time.perf_counter()
+    scores, fps = compute_motion_scores(Path(path), cfg, frame_range=frame_range)
+    return scores, fps, time.perf_counter() - t0
+
+
+def _iter_scored_sources(
+    jobs: List[_SourceJob],
+    cfg: UpscaleConfig,
+    workers: int,
+) -> Iterator[Tuple[_SourceJob, Optional[np.ndarray], float, float]]:
+    """
+    Yields (job, scores, fps, seconds) as each job finishes: score cache hits
+    first, then the rest largest-first (frames x source pixels) on `workers`
+    processes, so one long or high-resolution source never starts last and
+    holds up the whole run. Each process scores
+    its job serially (score_workers and the frame ring apply with one worker).
+    A source that fails to decode is reported and yields scores=None.
+    Cache lookups and writes stay in this process.
+    """
+    cache = cache_from_config(cfg)
+    pending: List[Tuple[_SourceJob, Optional[str]]] = []
+    for job in jobs:
+        key, hit = None, None
+        if cache is not None:
+            try:
+                key, hit = lookup_scores(cache, Path(job.path), cfg, frame_range=job.frame_range)
+            except OSError:
+                pass  # offline media; scoring reports it
+        if hit is not None:
+            yield job, hit[0], hit[1], 0.0
+        else:
+            pending.append((job, key))
+    pixels: Dict[str, int] = {}
+    for job, _key in pending:
+        if job.path not in pixels:
+            try:
+                width, height = source_frame_size(Path(job.path))
+                pixels[job.path] = max(1, width * height)
+            except (OSError, ValueError):
+                pixels[job.path] = 1  # unreadable; it will fail fast when scored
+    pending.sort(key=lambda p: p[0].size * pixels[p[0].path], reverse=True)
+
+    def finished(job: _SourceJob, key: Optional[str], result) -> Tuple:
+        scores, fps, seconds = result
+        if cache is not None and key is not None:
+            cache.put(key, scores, fps, source=job.path)
+        return job, scores, fps, seconds
+
+    if min(workers, len(pending)) <= 1:
+        for job, key in pending:
+            try:
+                result = _score_source(job.path, cfg, job.frame_range)
+            except Exception as exc:
+                print(f"Could not score {job.path}: {exc}", flush=True)
+                yield job, None, 0.0, 0.0
+                continue
+            yield finished(job, key, result)
+        return
+
+    inner = replace(cfg, score_workers=1, score_ring_slots=0)
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+    try:
+        futures = {pool.submit(_score_source, job.path, inner, job.frame_range): (job, key) for job, key in pending}
+        for future in as_completed(futures):
+            job, key = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                print(f"Could not score {job.path}: {exc}", flush=True)
+                yield job, None, 0.0, 0.0
+                continue
+            yield finished(job, key, result)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _item_segments(job: _SourceJob, scores: np.ndarray, it: _TimelineItem, cfg: UpscaleConfig):
+    # Segments of one item, in frames from the item's first used source frame.
+    first = it.frames[0] if it.frames is not None else 0
+    last = it.frames[1] if it.frames is not None else len(scores) + job.frame_range[0] - 1
+    values = scores[first - job.frame_range[0]:last - job.frame_range[0] + 1]
+    if auto_enabled(cfg):
+        sketch = ScoreSketch()
+        sketch.update(values)
+        cfg = replace(cfg, sensitivity=auto_threshold(sketch, cfg)[0])  # per item, like a single-clip Detect
+    return detect_motion_segments(values, cfg)
+
+
+def _mark_timeline(timeline, cfg: UpscaleConfig, tracks: str, color: str, workers: int) -> None:
+    """
+    Timeline-wide Detect: scores the used source ranges of every item on
+    `tracks` once per source (see _source_jobs / _iter_scored_sources) and
+    marks each item as soon as its source is scored. Markers are placed in
+    this process, since the Resolve handle cannot cross into workers.
+    """
+    t0 = time.perf_counter()
+    count = int(timeline.GetTrackCount("video") or 0) if hasattr(timeline, "GetTrackCount") else 1
+    track_list = _parse_tracks(tracks, count)
+    items, skipped = _timeline_items(timeline, track_list)
+    if not items:
+        print(f"No clips with source files on video track(s) {track_list}. Nothing to mark.")
+        return
+    jobs = _source_jobs(items, max(0, int(cfg.timeline_gap_frames)))
+    sources = len({job.path for job in jobs})
+    used = sum(it.frames[1] - it.frames[0] + 1 for it in items if it.frames is not None)
+    print(
+        f"Timeline: {len(items)} clip(s) on video track(s) {track_list} ({skipped} without a source file or retimed skipped); "
+        f"{sources} source(s), {len(jobs)} range(s) to score, {workers} worker(s).",
+        flush=True,
+    )
+
+    scored = marked = added = removed = failed = 0
+    for job, scores, fps, seconds in _iter_scored_sources(jobs, cfg, workers):
+        if scores is None:
+            failed += len(job.items)
+            continue
+        scored += len(scores)
+        end = job.frame_range[0] + len(scores) - 1
+        where = "cache" if seconds == 0.0 else f"{seconds:.1f}s, {len(scores) / max(seconds, 1e-9):.0f} fps"
+        print(
+            f"Scored {Path(job.path).name} frames {job.frame_range[0]}-{end} ({where}); "
+            f"marking {len(job.items)} clip(s).",
+            flush=True,
+        )
+        for it in job.items:
+            segments = _item_segments(job, scores, it, cfg)
+            if len(segments) == 0:
+                continue  # like single-clip Detect, a clip with no motion keeps its old markers
+            removed += _clear_dsu_markers(it.item)
+            added += _add_segment_markers(it.item, segments, color)
+            marked += 1
+
+    elapsed = time.perf_counter() - t0
+    print(f"Scored {scored} source frames for {used} used timeline frames in {elapsed:.1f}s.")
+    if failed:
+        print(f"{failed} clip(s) left unmarked: their source could not be scored.")
+    print(
+        f"Target: timeline clips. Marked {marked}/{len(items)} clip(s). "
+        f"Removed {removed} old markers. Added {added} markers."
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Place [DSU] motion markers in Resolve from segments.json or a video."
@@ -98,7 +431,23 @@ def main():
     parser.add_argument(
         "--video",
         default=None,
-        help="Optional video path. If provided, compute segments directly.",
+        help="Optional video path (or image sequence folder/pattern). If provided, compute segments directly.",
+    )
+    parser.add_argument(
+        "--timeline",
+        action="store_true",
+        help="Mark every clip on --tracks instead of the selected one, scoring each source once",
+    )
+    parser.add_argument(
+        "--tracks",
+        default="all",
+        help="With --timeline: video tracks to mark, 'all' or e.g. 1,3-4 (default: all)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="With --timeline: override cfg.timeline_jobs (sources scored at once, 0 = all cores)",
     )
     parser.add_argument(
         "--color",
@@ -111,30 +460,218 @@ def main():
         default=None,
         help="Override cfg.sensitivity when computing from --video",
     )
+    parser.add_argument(
+        "--auto_sensitivity",
+        choices=["off", "percent", "split"],
+        default=None,
+        help="With --video, pick the threshold from the score distribution (overrides --sensitivity)",
+    )
+    parser.add_argument(
+        "--auto_percent",
+        type=float,
+        default=None,
+        help="Override cfg.auto_motion_percent (share of frames marked in percent mode)",
+    )
+    parser.add_argument(
+        "--sample_every_n",
+        type=int,
+        default=None,
+        help="Override cfg.sample_every_n",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Rescore every frame near the threshold after the stride-N pass",
+    )
+    parser.add_argument(
+        "--static_cascade",
+        action="store_true",
+        help="Thumbnail pre-check; clearly static pairs skip the detail kernel",
+    )
+    parser.add_argument(
+        "--frame_source",
+        choices=["opencv", "ffmpeg", "auto"],
+        default=None,
+        help="Override cfg.frame_source",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Override cfg.score_workers (0 = all cores)",
+    )
+    parser.add_argument(
+        "--chunk_frames",
+        type=int,
+        default=None,
+        help="Override cfg.score_chunk_frames",
+    )
+    parser.add_argument(
+        "--decode_ahead",
+        type=int,
+        default=None,
+        help="Override cfg.decode_ahead (queued frames)",
+    )
+    parser.add_argument(
+        "--roi",
+        default=None,
+        help="Override cfg.score_roi: x,y,w,h in source pixels, 'auto' (crop letterbox) or 'full'",
+    )
+    parser.add_argument(
+        "--sequence_fps",
+        type=float,
+        default=None,
+        help="Override cfg.sequence_fps (image sequences)",
+    )
+    parser.add_argument(
+        "--sequence_workers",
+        type=int,
+        default=None,
+        help="Override cfg.sequence_workers (decode threads, 0 = all cores)",
+    )
+    parser.add_argument(
+        "--batch_frames",
+        type=int,
+        default=None,
+        help="Override cfg.score_batch_frames (stacked kernel)",
+    )
+    parser.add_argument(
+        "--ring_slots",
+        type=int,
+        default=None,
+        help="Override cfg.score_ring_slots (decoder process + shared-memory ring)",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Always decode and rescore; skip the score cache",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help="Override cfg.score_cache_dir",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile",
+        default=None,
+        metavar="PREFIX",
+        help="Time scoring phases; writes PREFIX.json and PREFIX.trace.json (default prefix: profile)",
+    )
+    parser.add_argument(
+        "--sweep_out",
+        default=None,
+        help="With --video, also write a threshold sweep (segments per slider position) to this JSON path",
+    )
+    parser.add_argument(
+        "--source_in",
+        type=int,
+        default=None,
+        help="First source frame to score (default: from the selected clip)",
+    )
+    parser.add_argument(
+        "--source_out",
+        type=int,
+        default=None,
+        help="Last source frame to score, inclusive (default: from the selected clip)",
+    )
+    parser.add_argument(
+        "--full_source",
+        action="store_true",
+        help="Score the whole source file instead of the clip's used range",
+    )
     args = parser.parse_args()
 
     cfg = UpscaleConfig()
     if args.sensitivity is not None:
         cfg.sensitivity = args.sensitivity
+    if args.auto_sensitivity is not None:
+        cfg.auto_sensitivity = args.auto_sensitivity
+    if args.auto_percent is not None:
+        cfg.auto_motion_percent = args.auto_percent
+    if args.sample_every_n is not None:
+        cfg.sample_every_n = args.sample_every_n
+    if args.adaptive:
+        cfg.adaptive_sampling = True
+    if args.static_cascade:
+        cfg.static_cascade = True
+    if args.frame_source is not None:
+        cfg.frame_source = args.frame_source
+    if args.workers is not None:
+        cfg.score_workers = args.workers
+    if args.chunk_frames is not None:
+        cfg.score_chunk_frames = args.chunk_frames
+    if args.decode_ahead is not None:
+        cfg.decode_ahead = args.decode_ahead
+    if args.roi is not None:
+        cfg.score_roi = "" if args.roi.lower() == "full" else args.roi
+    if args.batch_frames is not None:
+        cfg.score_batch_frames = args.batch_frames
+    if args.sequence_fps is not None:
+        cfg.sequence_fps = args.sequence_fps
+    if args.sequence_workers is not None:
+        cfg.sequence_workers = args.sequence_workers
+    if args.ring_slots is not None:
+        cfg.score_ring_slots = args.ring_slots
+    if args.no_cache:
+        cfg.score_cache = False
+    if args.cache_dir is not None:
+        cfg.score_cache_dir = args.cache_dir
+    if args.jobs is not None:
+        cfg.timeline_jobs = args.jobs
+    if args.timeline and (args.video or args.sweep_out or args.profile):
+        parser.error("--timeline reads each clip's source from Resolve; drop --video/--sweep_out/--profile")
+
+    def current_timeline():
+        resolve = _get_resolve()
+        project = resolve.GetProjectManager().GetCurrentProject()
+        if project is None:
+            raise RuntimeError("No active project.")
+        timeline = project.GetCurrentTimeline()
+        if timeline is None:
+            raise RuntimeError("No active timeline.")
+        return timeline
+
+    def connect():
+        return _pick_target(current_timeline())
+
+    if args.timeline:
+        workers = int(cfg.timeline_jobs)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        _mark_timeline(current_timeline(), cfg, args.tracks, args.color, workers)
+        return
+
     if args.video:
-        payload = _compute_segments_from_video(Path(args.video), cfg)
-    else:
-        payload = _load_segments(Path(args.segments))
+        # Markers on a clip are relative to its start, so score only the source range it uses.
+        target, target_type = connect()
+        if target_type == "clip" and is_retimed(target):
+            print("The selected clip is retimed; its markers cannot be placed from source scores. Nothing to mark.")
+            return
+        frame_range = None
+        if args.source_in is not None or args.source_out is not None:
+            frame_range = (args.source_in or 0, args.source_out)
+        elif not args.full_source and target_type == "clip":
+            frame_range = source_range(target)
+        if frame_range:
+            print(f"Scoring source frames {frame_range[0]}-{'EOF' if frame_range[1] is None else frame_range[1]}.")
+        frames, found, removed, added = _stream_markers_from_video(
+            Path(args.video), cfg, target, args.color, frame_range, profile=args.profile, sweep_out=args.sweep_out
+        )
+        if not found:
+            print(f"No segments found in {frames} frames. Nothing to mark.")
+            return
+        print(f"Target: {target_type}. Removed {removed} old markers. Added {added} markers.")
+        return
 
+    payload = _load_segments(Path(args.segments))
     segments = payload.get("segments", [])
     if not segments:
         print("No segments found. Nothing to mark.")
         return
 
-    resolve = _get_resolve()
-    project = resolve.GetProjectManager().GetCurrentProject()
-    if project is None:
-        raise RuntimeError("No active project.")
-    timeline = project.GetCurrentTimeline()
-    if timeline is None:
-        raise RuntimeError("No active timeline.")
-
-    target, target_type = _pick_target(timeline)
+    target, target_type = connect()
     removed = _clear_dsu_markers(target)
     added = _add_segment_markers(target, segments, args.color)
 
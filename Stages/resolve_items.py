@@ -0,0 +1,49 @@
+# Stages/resolve_items.py
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+
+def is_retimed(item) -> bool:
+    """
+    True when a timeline item plays its source at a speed other than 100%,
+    i.e. its source span differs from its timeline duration. Needs
+    GetSourceStartFrame/GetSourceEndFrame (Resolve 19+); on older versions a
+    retime cannot be seen and the item counts as 100% speed. A speed ramp that
+    keeps the overall length is not detected either.
+    """
+    if not (hasattr(item, "GetSourceStartFrame") and hasattr(item, "GetSourceEndFrame")):
+        return False
+    try:
+        span = int(item.GetSourceEndFrame()) - int(item.GetSourceStartFrame())
+        duration = int(item.GetDuration())
+    except Exception:
+        return False
+    return abs(span - duration) > 1  # the end frame is inclusive or exclusive depending on the version
+
+
+def source_range(item) -> Optional[Tuple[int, int]]:
+    """
+    Source frames used by a timeline item (inclusive); None if the API does not
+    expose them. Reads the timeline duration as a count of source frames, so it
+    only holds at 100% speed: callers skip items where is_retimed() is true.
+    """
+    try:
+        duration = int(item.GetDuration())
+    except Exception:
+        return None
+    if duration < 1:
+        return None
+    if hasattr(item, "GetLeftOffset"):
+        try:
+            start = int(item.GetLeftOffset())
+            return start, start + duration - 1
+        except Exception:
+            pass
+    if hasattr(item, "GetSourceStartFrame"):
+        try:
+            start = int(item.GetSourceStartFrame())
+            return start, start + duration - 1
+        except Exception:
+            pass
+    return None
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import argparse
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from Pipeline.config import UpscaleConfig
 from Stages.frame_detect import detect_motion_segments
-from Stages.motion_score import compute_motion_scores
+from Stages.resolve_items import is_retimed, source_range
+from Stages.score_cache import cache_from_config, cached_motion_scores
 
 
 MARKER_PREFIX = "[DSU]"
@@ -54,13 +55,20 @@ def _ranges_from_markers(marker_dict, base_tl_start: int) -> List[Tuple[int, int
     return ranges
 
 
-def _ranges_from_video(path, cfg: UpscaleConfig, clip_start: int) -> List[Tuple[int, int]]:
-    scores, _fps = compute_motion_scores(path, cfg)
+def _ranges_from_video(
+    path,
+    cfg: UpscaleConfig,
+    clip_start: int,
+    frame_range: Optional[Tuple[int, int]] = None,
+) -> List[Tuple[int, int]]:
+    cache = cache_from_config(cfg)
+    scores, _fps = cached_motion_scores(path, cfg, cache, frame_range=frame_range)
+    if cache is not None:
+        print(cache.summary())
     segments = detect_motion_segments(scores, cfg)
-    ranges = []
-    for seg in segments:
-        ranges.append((clip_start + seg.start, clip_start + seg.end))
-    return ranges
+    starts = (segments["start"] + clip_start).tolist()
+    ends = (segments["end"] + clip_start).tolist()
+    return list(zip(starts, ends))
 
 
 def _get_video_items(timeline, track_index: int):
@@ -115,11 +123,14 @@ def main():
     if not ranges and hasattr(timeline, "GetMarkers"):
         ranges = _ranges_from_markers(timeline.GetMarkers(), 0)
 
-    if not ranges and args.video:
+    if not ranges and args.video and selected and is_retimed(selected):
+        print("The selected clip is retimed; skipping recompute from video (scores would land on the wrong frames).")
+    elif not ranges and args.video:
         cfg = UpscaleConfig()
         if args.sensitivity is not None:
             cfg.sensitivity = args.sensitivity
-        ranges = _ranges_from_video(args.video, cfg, clip_start)
+        frame_range = source_range(selected) if selected else None
+        ranges = _ranges_from_video(args.video, cfg, clip_start, frame_range)
 
     if not ranges:
         print("No [DSU] markers found and no recompute ranges available.")
@@ -0,0 +1,361 @@
+# Stages/score_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from array import array
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+from Stages.frame_source import parse_roi, resolve_backend
+from Stages.image_sequence import is_image_sequence, resolve_sequence
+from Stages.motion_score import compute_motion_scores, static_floor_from_config, stream_motion_scores
+from Stages.profiling import Profiler
+from Stages.score_kernels import parse_tile_grid
+from Stages.score_sketch import ScoreSketch, auto_enabled
+
+
+SCORER_VERSION = 1  # bump when score values change for the same inputs
+FINGERPRINT_BLOCK = 1024 * 1024
+INDEX_NAME = "index.json"
+LOCK_NAME = "index.lock"
+LOCK_STALE_SECONDS = 30.0  # a lock older than this was left by a crashed process
+
+
+def default_cache_dir() -> Path:
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA")
+        if base:
+            return Path(base) / "Eternal2x" / "score_cache"
+    elif sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "Eternal2x" / "score_cache"
+    base = os.environ.get("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "eternal2x" / "score_cache"
+
+
+def file_fingerprint(path: Path) -> str:
+    """
+    Content fingerprint: file size plus 1 MiB samples from the head, middle and
+    tail. Cheap on multi-GB camera originals and stable across copies/renames.
+    Image sequences hash their frame count and every frame's size, plus the
+    fingerprints of the first, middle and last frame.
+    """
+    if is_image_sequence(path):
+        return _sequence_fingerprint(path)
+    return _content_fingerprint(path)
+
+
+def _content_fingerprint(path: Path) -> str:
+    size = path.stat().st_size
+    h = hashlib.sha256()
+    h.update(str(size).encode("ascii"))
+    offsets = sorted({0, max(0, size // 2 - FINGERPRINT_BLOCK // 2), max(0, size - FINGERPRINT_BLOCK)})
+    with path.open("rb") as f:
+        for offset in offsets:
+            f.seek(offset)
+            h.update(f.read(FINGERPRINT_BLOCK))
+    return h.hexdigest()
+
+
+def _sequence_fingerprint(path: Path) -> str:
+    files = resolve_sequence(path)
+    if not files:
+        raise FileNotFoundError(f"No image sequence frames found: {path}")
+    h = hashlib.sha256()
+    h.update(f"sequence:{len(files)}".encode("ascii"))
+    h.update(np.array([f.stat().st_size for f in files], dtype=np.int64).tobytes())
+    for f in sorted({files[0], files[len(files) // 2], files[-1]}, key=files.index):
+        h.update(_content_fingerprint(f).encode("ascii"))  # a numbered frame would count as a sequence itself
+    return h.hexdigest()
+
+
+def score_params(cfg: UpscaleConfig, max_width: int, frame_range: Optional[Tuple[int, Optional[int]]] = None) -> Dict:
+    gx, gy = parse_tile_grid(getattr(cfg, "tile_grid", (8, 8)))
+    n = max(1, int(getattr(cfg, "sample_every_n", 1)))
+    params = {
+        "scorer_version": SCORER_VERSION,
+        "motion_mode": str(getattr(cfg, "motion_mode", "detail")).lower(),
+        "tile_grid": [gx, gy],
+        "sample_every_n": n,
+        "max_width": int(max_width),
+        "frame_source": resolve_backend(
+            getattr(cfg, "frame_source", "opencv"), str(getattr(cfg, "ffmpeg_path", "ffmpeg") or "ffmpeg")
+        ),
+    }
+    static_floor = static_floor_from_config(cfg)
+    if static_floor is not None:
+        params["static_floor"] = static_floor
+    if getattr(cfg, "raw_size", ""):
+        params["raw"] = [
+            str(cfg.raw_size).lower(), str(getattr(cfg, "raw_pix_fmt", "gray")).lower(), float(getattr(cfg, "raw_fps", 24.0))
+        ]
+    roi = parse_roi(getattr(cfg, "score_roi", ""))
+    if roi == "auto":
+        # Detected from the file itself, so the spec is enough to key on.
+        params["roi"] = ["auto", int(getattr(cfg, "roi_black_level", 24))]
+    elif roi is not None:
+        params["roi"] = list(roi)
+    if n > 1 and getattr(cfg, "adaptive_sampling", False):
+        # Refinement windows depend on the threshold, so adaptive scores are per sensitivity
+        # (or per auto-sensitivity setting, whose threshold comes from the coarse pass).
+        if auto_enabled(cfg):
+            threshold = [str(cfg.auto_sensitivity).lower(), float(getattr(cfg, "auto_motion_percent", 10.0))]
+        else:
+            threshold = float(cfg.sensitivity)
+        params["adaptive"] = [threshold, float(getattr(cfg, "adaptive_margin", 0.5))]
+    if frame_range is not None:
+        params["frame_range"] = list(frame_range)
+    return params
+
+
+def cache_key(fingerprint: str, params: Dict) -> str:
+    blob = json.dumps({"file": fingerprint, "params": params}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+class ScoreCache:
+    """
+    Directory of per-frame score arrays (.npy, float64) plus index.json with
+    fps, size and last-use time per entry. Least recently used entries are
+    evicted once the total exceeds max_bytes. Every read-modify-write of the
+    index holds index.lock, so concurrent processes do not drop each other's
+    entries.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_NAME
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # O_CREAT | O_EXCL lock file: atomic on every platform, unlike fcntl/msvcrt locks.
+        self.root.mkdir(parents=True, exist_ok=True)
+        lock = self.root / LOCK_NAME
+        while True:
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - lock.stat().st_mtime > LOCK_STALE_SECONDS:
+                        lock.unlink(missing_ok=True)
+                        continue
+                except OSError:
+                    continue  # released between the open and the stat
+                time.sleep(0.01)
+        try:
+            os.close(fd)
+            yield
+        finally:
+            lock.unlink(missing_ok=True)
+
+    def _load_index(self) -> Dict:
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        data.setdefault("entries", {})
+        data.setdefault("hits", 0)
+        data.setdefault("misses", 0)
+        return data
+
+    def _save_index(self, index: Dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, self.index_path)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / f"{key}.npy"
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, float]]:
+        with self._locked():
+            index = self._load_index()
+            entry = index["entries"].get(key)
+            scores = None
+            if entry is not None:
+                try:
+                    scores = np.load(self._entry_path(key))
+                except (OSError, ValueError):
+                    scores = None
+            if scores is None:
+                index["entries"].pop(key, None)
+                self.misses += 1
+                index["misses"] += 1
+                self._save_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self.hits += 1
+            index["hits"] += 1
+            self._save_index(index)
+        return scores, float(entry.get("fps", 0.0))
+
+    def put(self, key: str, scores: Sequence[float], fps: float, source: str = "") -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.save(f, np.asarray(scores, dtype=np.float64))
+        os.replace(tmp, path)
+
+        with self._locked():
+            index = self._load_index()
+            index["entries"][key] = {
+                "fps": fps,
+                "frames": len(scores),
+                "bytes": path.stat().st_size,
+                "last_used": time.time(),
+                "source": source,
+            }
+            self._evict(index, keep=key)
+            self._save_index(index)
+
+    def _evict(self, index: Dict, keep: str = "") -> None:
+        entries = index["entries"]
+        total = sum(int(e.get("bytes", 0)) for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("last_used", 0.0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= int(entries[key].get("bytes", 0))
+            del entries[key]
+            self._entry_path(key).unlink(missing_ok=True)
+            self.evicted += 1
+
+    def summary(self) -> str:
+        index = self._load_index()
+        entries = index["entries"]
+        used = sum(int(e.get("bytes", 0)) for e in entries.values())
+        return (
+            f"Score cache: {self.hits} hit(s), {self.misses} miss(es), {self.evicted} evicted this run; "
+            f"{len(entries)} entries, {used / 2 ** 20:.1f}/{self.max_bytes / 2 ** 20:.0f} MiB; "
+            f"lifetime {index['hits']} hits / {index['misses']} misses ({self.root})"
+        )
+
+
+def cache_from_config(cfg: UpscaleConfig) -> Optional[ScoreCache]:
+    if not getattr(cfg, "score_cache", True):
+        return None
+    root = getattr(cfg, "score_cache_dir", "") or None
+    max_mb = int(getattr(cfg, "score_cache_mb", 256))
+    return ScoreCache(Path(root) if root else None, max_bytes=max_mb * 1024 * 1024)
+
+
+def cached_motion_scores(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    cache: Optional[ScoreCache],
+    *,
+    max_width: int = 640,
+    stats: Optional[Dict] = None,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+    sketch: Optional[ScoreSketch] = None,
+) -> Tuple[np.ndarray, float]:
+    """compute_motion_scores, served from `cache` when the clip and scoring params were seen before."""
+    if cache is None:
+        return compute_motion_scores(
+            video_path, cfg, max_width=max_width, stats=stats, frame_range=frame_range, profiler=profiler,
+            sketch=sketch,
+        )
+
+    key, hit = lookup_scores(cache, video_path, cfg, max_width=max_width, frame_range=frame_range, profiler=profiler)
+    if hit is not None:
+        if sketch is not None:
+            sketch.update(hit[0])
+        return hit
+
+    scores, fps = compute_motion_scores(
+        video_path, cfg, max_width=max_width, stats=stats, frame_range=frame_range, profiler=profiler,
+        sketch=sketch,
+    )
+    cache.put(key, scores, fps, source=str(video_path))
+    return scores, fps
+
+
+def lookup_scores(
+    cache: ScoreCache,
+    video_path: Path,
+    cfg: UpscaleConfig,
+    *,
+    max_width: int = 640,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Tuple[str, Optional[Tuple[np.ndarray, float]]]:
+    """
+    Cache key and stored (scores, fps) for scoring `video_path` with these
+    settings; the hit is None on a miss. Pass the key to cache.put once the
+    scores are computed. Raises OSError when the input cannot be read.
+    """
+    t0 = time.perf_counter()
+    params = score_params(cfg, max_width, frame_range)
+    if is_image_sequence(video_path):
+        params["sequence_fps"] = float(getattr(cfg, "sequence_fps", 24.0))  # cached alongside the scores
+    key = cache_key(file_fingerprint(Path(video_path)), params)
+    hit = cache.get(key)
+    if profiler is not None:
+        profiler.add("cache_lookup", t0, time.perf_counter())
+        if hit is not None:
+            profiler.frames += len(hit[0])
+    return key, hit
+
+
+def cached_score_stream(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    cache: Optional[ScoreCache],
+    *,
+    max_width: int = 640,
+    stats: Optional[Dict] = None,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+    sketch: Optional[ScoreSketch] = None,
+) -> Tuple[Iterator[float], float]:
+    """
+    stream_motion_scores with the cache: a hit yields the stored scores, a
+    miss is stored once the stream has been consumed to the end.
+    """
+    if cache is None:
+        return stream_motion_scores(
+            video_path, cfg, max_width=max_width, stats=stats, frame_range=frame_range, profiler=profiler,
+            sketch=sketch,
+        )
+
+    key, hit = lookup_scores(cache, video_path, cfg, max_width=max_width, frame_range=frame_range, profiler=profiler)
+    if hit is not None:
+        if sketch is not None:
+            sketch.update(hit[0])
+        return iter(hit[0].tolist()), hit[1]
+
+    scores, fps = stream_motion_scores(
+        video_path, cfg, max_width=max_width, stats=stats, frame_range=frame_range, profiler=profiler,
+        sketch=sketch,
+    )
+    return _put_when_done(scores, cache, key, fps, str(video_path)), fps
+
+
+def _put_when_done(scores: Iterator[float], cache: ScoreCache, key: str, fps: float, source: str) -> Iterator[float]:
+    seen = array("d")  # 8 bytes per frame, only what the cache entry needs
+    for score in scores:
+        seen.append(score)
+        yield score
+    cache.put(key, seen, fps, source=source)
@@ -0,0 +1,108 @@
+# Stages/score_file.py
+from __future__ import annotations
+
+import json
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Layout (little-endian):
+#   magic   4s   b"E2XS"
+#   version u16
+#   dtype   u16  0 = float32, 1 = uint16 quantized (value = q * scale), 2 = float16
+#   hlen    u32  length of the UTF-8 JSON header that follows
+#   header  JSON {"fps", "frame_count", "scale", "settings", optional "shape"}
+#   padding to a 64-byte boundary, then the values (C order)
+MAGIC = b"E2XS"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sHHI")
+ALIGN = 64
+
+DTYPES = {"f32": (0, np.dtype("<f4")), "u16": (1, np.dtype("<u2")), "f16": (2, np.dtype("<f2"))}
+CODES = {code: (name, dtype) for name, (code, dtype) in DTYPES.items()}
+
+
+def write_score_file(
+    path: Path,
+    scores: Sequence[float],
+    fps: float,
+    *,
+    fmt: str = "f32",
+    settings: Optional[Dict] = None,
+    extra: Optional[Dict] = None,
+) -> None:
+    """
+    Write scores as float32/float16, or as uint16 quantized to the series max
+    (step = max / 65535). Arrays with more than one axis keep their shape;
+    the first axis is frames. `extra` keys are added to the header.
+    """
+    if fmt not in DTYPES:
+        raise ValueError(f"Unknown score format: {fmt} (expected one of {', '.join(DTYPES)})")
+    code, dtype = DTYPES[fmt]
+    values = np.asarray(scores)
+
+    scale = 1.0
+    if fmt == "u16":
+        values = values.astype(np.float64)
+        peak = float(values.max()) if values.size else 0.0
+        scale = peak / 65535.0 if peak > 0 else 1.0
+        data = np.clip(np.rint(values / scale), 0, 65535).astype(dtype)
+    else:
+        data = np.ascontiguousarray(values, dtype=dtype)
+
+    meta = {
+        "fps": float(fps),
+        "frame_count": int(data.shape[0]) if data.ndim else 0,
+        "scale": scale,
+        "settings": settings or {},
+    }
+    if data.ndim > 1:
+        meta["shape"] = list(data.shape)
+    meta.update(extra or {})
+    header = json.dumps(meta).encode("utf-8")
+    offset = PREAMBLE.size + len(header)
+    padding = b"\0" * (-offset % ALIGN)
+
+    with Path(path).open("wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, code, len(header)))
+        f.write(header)
+        f.write(padding)
+        f.write(data.tobytes())
+
+
+def read_score_header(path: Path) -> Tuple[Dict, int, np.dtype]:
+    """Returns (header, data_offset, dtype) without touching the score data."""
+    with Path(path).open("rb") as f:
+        magic, version, code, hlen = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not an Eternal2x score file: {path}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported score file version {version}: {path}")
+        if code not in CODES:
+            raise ValueError(f"Unknown score dtype code {code}: {path}")
+        header = json.loads(f.read(hlen).decode("utf-8"))
+    offset = PREAMBLE.size + hlen
+    offset += -offset % ALIGN
+    header["format"] = CODES[code][0]
+    return header, offset, CODES[code][1]
+
+
+def load_score_file(path: Path) -> Tuple[np.ndarray, float, Dict]:
+    """
+    Returns (scores, fps, header). float32/float16 files come back as a
+    read-only numpy.memmap, so nothing is read until the values are used;
+    uint16 files are dequantized in one vectorized pass.
+    """
+    header, offset, dtype = read_score_header(path)
+    count = int(header.get("frame_count", 0))
+    shape = tuple(int(v) for v in header.get("shape", [count]))
+    if count == 0:
+        return np.zeros(shape, dtype=np.float32), float(header.get("fps", 0.0)), header
+
+    data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+    if header["format"] == "u16":
+        data = data.astype(np.float32) * np.float32(header.get("scale", 1.0))
+    return data, float(header.get("fps", 0.0)), header
@@ -0,0 +1,413 @@
+# Stages/score_kernels.py
+from __future__ import annotations
+
+import time
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import cv2
+
+from Stages.profiling import Profiler
+
+
+def parse_tile_grid(tile_grid: Union[int, tuple, list, str]) -> Tuple[int, int]:
+    """(gx, gy) from 8, (8, 8), "8x8" or "8,8"."""
+    if isinstance(tile_grid, int):
+        return max(1, tile_grid), max(1, tile_grid)
+    if isinstance(tile_grid, (tuple, list)) and len(tile_grid) == 2:
+        return max(1, int(tile_grid[0])), max(1, int(tile_grid[1]))
+    if isinstance(tile_grid, str):
+        s = tile_grid.lower().replace(" ", "")
+        if "x" in s:
+            a, b = s.split("x", 1)
+            return max(1, int(a)), max(1, int(b))
+        if "," in s:
+            a, b = s.split(",", 1)
+            return max(1, int(a)), max(1, int(b))
+        v = int(s)
+        return max(1, v), max(1, v)
+    return 8, 8
+
+
+def _blurred_diff(prev_gray: np.ndarray, curr_gray: np.ndarray) -> np.ndarray:
+    diff = cv2.absdiff(prev_gray, curr_gray)
+    return cv2.GaussianBlur(diff, (5, 5), 0)
+
+
+def score_global(prev_gray: np.ndarray, curr_gray: np.ndarray) -> float:
+    """Whole-frame motion score in [0, ~1]."""
+    return float(_blurred_diff(prev_gray, curr_gray).mean()) / 255.0
+
+
+CASCADE_THUMB = (32, 18)  # thumbnail (w, h) for the static pre-check
+
+
+class Cascade:
+    """
+    Two-tier static check: each frame is also shrunk to a CASCADE_THUMB
+    thumbnail (INTER_AREA, i.e. block means), and a pair whose thumbnail score
+    stays under `floor` is scored from the thumbnails alone, skipping the
+    full-size absdiff, blur and tile pass. Block means cancel sensor noise, so
+    static footage stays under the floor; a global thumbnail score never
+    exceeds the full one, a detail score can by a little (no tile averaging).
+    """
+
+    __slots__ = ("floor", "fast", "samples", "diff")
+
+    def __init__(self, floor: float):
+        self.floor = float(floor)
+        self.fast = 0
+        self.samples = 0
+        self.diff: Optional[np.ndarray] = None
+
+    @staticmethod
+    def thumb(gray: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        return cv2.resize(gray, CASCADE_THUMB, dst=out, interpolation=cv2.INTER_AREA)
+
+    def score(self, prev_thumb: np.ndarray, curr_thumb: np.ndarray, mode: str) -> float:
+        self.diff = cv2.absdiff(prev_thumb, curr_thumb, dst=self.diff)
+        raw = float(self.diff.mean()) if mode == "global" else _top_fraction_mean(self.diff)
+        return raw / 255.0
+
+
+def _image_mean(image: np.ndarray) -> float:
+    # Same value as float(image.mean()) (the integer sum is exact in float64), without numpy's reduction buffer.
+    return cv2.sumElems(image)[0] / image.size
+
+
+class _Scratch:
+    """Diff, blur and summed-area buffers reused for every frame pair of a run (dst= outputs)."""
+
+    __slots__ = ("diff", "blurred", "sat")
+
+    def __init__(self):
+        self.diff: Optional[np.ndarray] = None
+        self.blurred: Optional[np.ndarray] = None
+        self.sat: Optional[np.ndarray] = None
+
+    def blurred_diff(self, prev_gray: np.ndarray, curr_gray: np.ndarray) -> np.ndarray:
+        self.diff = cv2.absdiff(prev_gray, curr_gray, dst=self.diff)
+        self.blurred = cv2.GaussianBlur(self.diff, (5, 5), 0, dst=self.blurred)
+        return self.blurred
+
+    def tile_means(self, diff: np.ndarray, gx: int, gy: int) -> np.ndarray:
+        h, w = diff.shape[:2]
+        dtype = np.int32 if h * w * 255 < 2 ** 31 else np.float64
+        if self.sat is None or self.sat.shape != (h + 1, w + 1) or self.sat.dtype != dtype:
+            self.sat = np.empty((h + 1, w + 1), dtype=dtype)
+        return tile_means(diff, gx, gy, sat=self.sat)
+
+
+def tile_edges(length: int, count: int) -> np.ndarray:
+    """Tile boundaries along one axis; the last tile absorbs the remainder."""
+    step = max(1, length // count)
+    edges = np.arange(count + 1, dtype=np.intp) * step
+    edges[-1] = length
+    return edges
+
+
+def tile_means(diff: np.ndarray, gx: int, gy: int, sat: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Mean of each tile of `diff` as a (gy, gx) float32 matrix in [0, 1].
+    `sat` is an optional (h + 1, w + 1) buffer for the summed-area table.
+
+    One summed-area table replaces the per-tile Python loop. Tile sums are
+    exact integers, so each mean matches `tile.mean()` to float rounding
+    (abs error < 1e-7 after the /255 scale). Tile layout is the same as
+    before: w // gx by h // gy, with the last row/column taking the ragged
+    remainder.
+    """
+    h, w = diff.shape[:2]
+    if gx > w or gy > h:
+        return _tile_means_loop(diff, gx, gy)
+
+    xs = tile_edges(w, gx)
+    ys = tile_edges(h, gy)
+    # int32 sums are exact up to ~8.4M pixels of uint8; wider frames use float64.
+    depth = cv2.CV_32S if h * w * 255 < 2 ** 31 else cv2.CV_64F
+    sat = cv2.integral(diff, sum=sat, sdepth=depth)
+    corners = sat[np.ix_(ys, xs)].astype(np.float64)
+    sums = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+    areas = np.outer(np.diff(ys), np.diff(xs))
+    return (sums / areas / 255.0).astype(np.float32)
+
+
+def _tile_means_loop(diff: np.ndarray, gx: int, gy: int) -> np.ndarray:
+    # Reference path, kept for grids finer than the frame (empty tiles).
+    h, w = diff.shape[:2]
+    tw, th = max(1, w // gx), max(1, h // gy)
+
+    vals = []
+    for ty in range(gy):
+        y0 = ty * th
+        y1 = (ty + 1) * th if ty < gy - 1 else h
+        for tx in range(gx):
+            x0 = tx * tw
+            x1 = (tx + 1) * tw if tx < gx - 1 else w
+            tile = diff[y0:y1, x0:x1]
+            vals.append(float(tile.mean()) / 255.0)
+    return np.array(vals, dtype=np.float32).reshape(gy, gx)
+
+
+def _top_fraction_mean(values: np.ndarray, fraction: float = 0.15) -> float:
+    v = values.ravel()
+    k = max(1, int(np.ceil(len(v) * fraction)))
+    topk = np.partition(v, -k)[-k:]
+    return float(topk.mean())
+
+
+def _top_fraction_means(values: np.ndarray, fraction: float = 0.15) -> np.ndarray:
+    # _top_fraction_mean of each row of a (batch, n) matrix; row-wise partition/mean give the same values.
+    k = max(1, int(np.ceil(values.shape[1] * fraction)))
+    return np.partition(values, -k, axis=1)[:, -k:].mean(axis=1)
+
+
+def _detail_from_grid(prev_gray: np.ndarray, curr_gray: np.ndarray, gx: int, gy: int) -> float:
+    return _top_fraction_mean(tile_means(_blurred_diff(prev_gray, curr_gray), gx, gy))
+
+
+def score_detail(prev_gray: np.ndarray, curr_gray: np.ndarray, tile_grid) -> float:
+    """
+    Tile-based score: compute mean diff per tile, then average of the top 15% tiles.
+    Good for small localized motion (hair/blinks).
+    """
+    gx, gy = parse_tile_grid(tile_grid)
+    return _detail_from_grid(prev_gray, curr_gray, gx, gy)
+
+
+def iter_samples(
+    prev: np.ndarray,
+    frames: Iterator[Tuple[int, np.ndarray]],
+    mode: str,
+    grid: Tuple[int, int],
+    tiles: Optional[List[np.ndarray]] = None,
+    profiler: Optional[Profiler] = None,
+    cascade: Optional[Cascade] = None,
+    batch: int = 0,
+) -> Iterator[Tuple[float, int]]:
+    """
+    Score each sampled frame against the previous one and yield (score, grabbed):
+    the score is split over the `grabbed` frames the sample covers.
+    When `tiles` is a list, the per-frame (gy, gx) tile means are appended to it as float16.
+    With `cascade` (ignored when tiles are kept), clearly static pairs are scored from thumbnails.
+    With `batch` > 1, detail scores (and kept tiles) are computed in stacks of that many frames
+    (see _iter_samples_batched); plain global scores need no tile pass and stay per pair.
+    """
+    if cascade is not None and tiles is None:
+        yield from _iter_samples_cascade(prev, frames, mode, grid, cascade, profiler)
+        return
+    if batch > 1 and (mode != "global" or tiles is not None) and _batchable(prev.shape[:2], grid):
+        yield from _iter_samples_batched(prev, frames, mode, grid, batch, tiles, profiler)
+        return
+    if profiler is not None:
+        yield from _iter_samples_profiled(prev, frames, mode, grid, tiles, profiler)
+        return
+    gx, gy = grid
+    scratch = _Scratch()
+
+    for grabbed, curr in frames:
+        diff = scratch.blurred_diff(prev, curr)
+        if mode == "global" and tiles is None:
+            raw = _image_mean(diff) / 255.0
+        else:
+            means = scratch.tile_means(diff, gx, gy)
+            raw = _image_mean(diff) / 255.0 if mode == "global" else _top_fraction_mean(means)
+            if tiles is not None:
+                tiles.extend([(means / grabbed).astype(np.float16)] * grabbed)
+        yield raw / grabbed, grabbed
+
+        prev = curr
+
+
+def _iter_samples_profiled(
+    prev: np.ndarray,
+    frames: Iterator[Tuple[int, np.ndarray]],
+    mode: str,
+    grid: Tuple[int, int],
+    tiles: Optional[List[np.ndarray]],
+    profiler: Profiler,
+) -> Iterator[Tuple[float, int]]:
+    # Same arithmetic as iter_samples, split into timed diff (absdiff + blur) and aggregate phases.
+    gx, gy = grid
+    clock = time.perf_counter
+    scratch = _Scratch()
+
+    for grabbed, curr in frames:
+        t0 = clock()
+        diff = scratch.blurred_diff(prev, curr)
+        t1 = clock()
+        if mode == "global" and tiles is None:
+            raw = _image_mean(diff) / 255.0
+        else:
+            means = scratch.tile_means(diff, gx, gy)
+            raw = _image_mean(diff) / 255.0 if mode == "global" else _top_fraction_mean(means)
+            if tiles is not None:
+                tiles.extend([(means / grabbed).astype(np.float16)] * grabbed)
+        profiler.add("diff", t0, t1)
+        profiler.add("aggregate", t1, clock())
+        yield raw / grabbed, grabbed
+
+        prev = curr
+
+
+def _batchable(shape: Tuple[int, int], grid: Tuple[int, int]) -> bool:
+    # The stacked blur needs 2 reflected rows per frame; grids finer than the frame use the loop path.
+    h, w = shape
+    return h >= 4 and w >= 1 and grid[0] <= w and grid[1] <= h
+
+
+class FrameStack:
+    """
+    Reused buffers for _iter_samples_batched: a (batch + 1, H + 4, W) frame
+    stack where each frame carries 2 rows of reflect-101 padding above and
+    below, the blurred diff stack (blurred in place) and its summed-area table.
+    Padding the frames pads their diffs too, so one GaussianBlur over the
+    whole stack reproduces each frame's own border handling.
+    """
+
+    def __init__(self, batch: int, h: int, w: int, grid: Tuple[int, int]):
+        self.batch, self.h, self.w = batch, h, w
+        self.frames = np.empty((batch + 1, h + 4, w), dtype=np.uint8)
+        self.diff = np.empty((batch * (h + 4), w), dtype=np.uint8)
+        # int32 sums are exact while the whole stack stays under 2**31; larger stacks use float64.
+        self.depth = cv2.CV_32S if batch * (h + 4) * w * 255 < 2 ** 31 else cv2.CV_64F
+        dtype = np.int32 if self.depth == cv2.CV_32S else np.float64
+        self.sat = np.empty((batch * (h + 4) + 1, w + 1), dtype=dtype)
+        self.xs = tile_edges(w, grid[0])
+        self.ys = tile_edges(h, grid[1])
+        self.areas = np.outer(np.diff(self.ys), np.diff(self.xs))
+        self.tops = np.arange(batch)[:, None] * (h + 4) + 2  # SAT row of each frame's first row
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames.nbytes + self.diff.nbytes + self.sat.nbytes
+
+    def put(self, i: int, gray: np.ndarray) -> None:
+        h = self.h
+        frame = self.frames[i]
+        frame[2:h + 2] = gray
+        frame[0], frame[1] = frame[4], frame[3]  # rows -2, -1 reflect to 2, 1
+        frame[h + 2], frame[h + 3] = frame[h], frame[h - 1]  # rows h, h+1 reflect to h-2, h-3
+
+    def blur(self, k: int) -> np.ndarray:
+        """Blurred diffs of frames[0..k] as one (k * (h + 4), w) image."""
+        rows = k * (self.h + 4)
+        prev = self.frames[:k].reshape(rows, self.w)
+        curr = self.frames[1:k + 1].reshape(rows, self.w)
+        diff = cv2.absdiff(prev, curr, dst=self.diff[:rows])
+        return cv2.GaussianBlur(diff, (5, 5), 0, dst=diff)
+
+    def sums(self, blurred: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(k, gy, gx) tile sums and (k,) frame sums of the blurred stack, as exact float64 integers."""
+        sat = cv2.integral(blurred, sum=self.sat[:k * (self.h + 4) + 1], sdepth=self.depth)
+        rows = self.tops[:k] + self.ys[None, :]
+        corners = sat[rows[:, :, None], self.xs[None, None, :]].astype(np.float64)
+        tiles = corners[:, 1:, 1:] - corners[:, :-1, 1:] - corners[:, 1:, :-1] + corners[:, :-1, :-1]
+        top, bottom = self.tops[:k, 0], self.tops[:k, 0] + self.h
+        totals = sat[bottom, self.w].astype(np.float64) - sat[top, self.w].astype(np.float64)
+        return tiles, totals
+
+
+def _iter_samples_batched(
+    prev: np.ndarray,
+    frames: Iterator[Tuple[int, np.ndarray]],
+    mode: str,
+    grid: Tuple[int, int],
+    batch: int,
+    tiles: Optional[List[np.ndarray]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[Tuple[float, int]]:
+    """
+    iter_samples over stacks of `batch` frames. Frames are copied into a
+    contiguous stack whose first slot carries the last frame of the previous
+    batch; then one absdiff, one GaussianBlur and one integral cover the whole
+    stack, and tile means and top-fraction means are array operations across
+    it. Each frame carries its own reflected border rows, so the stacked blur
+    never mixes neighbouring frames and scores equal iter_samples exactly.
+    """
+    gx, gy = grid
+    h, w = prev.shape[:2]
+    stack = FrameStack(batch, h, w, grid)
+    stack.put(0, prev)
+    grabbed = np.zeros(batch, dtype=np.int64)
+    clock = time.perf_counter
+    frames = iter(frames)
+
+    exhausted = False
+    while not exhausted:
+        k = 0
+        for count, curr in frames:
+            stack.put(k + 1, curr)
+            grabbed[k] = count
+            k += 1
+            if k == batch:
+                break
+        else:
+            exhausted = True
+        if k == 0:
+            break
+
+        t0 = clock()
+        blurred = stack.blur(k)
+        t1 = clock()
+        sums, totals = stack.sums(blurred, k)
+        means = (sums / stack.areas / 255.0).astype(np.float32)
+        if mode == "global":
+            raw = totals / (h * w) / 255.0
+        else:
+            raw = _top_fraction_means(means.reshape(k, gy * gx))
+        if profiler is not None:
+            profiler.add("diff", t0, t1)
+            profiler.add("aggregate", t1, clock())
+
+        for i in range(k):
+            g = int(grabbed[i])
+            if tiles is not None:
+                tiles.extend([(means[i] / g).astype(np.float16)] * g)
+            yield float(raw[i]) / g, g
+        stack.frames[0] = stack.frames[k]
+
+
+def _iter_samples_cascade(
+    prev: np.ndarray,
+    frames: Iterator[Tuple[int, np.ndarray]],
+    mode: str,
+    grid: Tuple[int, int],
+    cascade: Cascade,
+    profiler: Optional[Profiler] = None,
+) -> Iterator[Tuple[float, int]]:
+    # Pairs above the floor get exactly the iter_samples score; the rest keep the thumbnail score.
+    gx, gy = grid
+    clock = time.perf_counter
+    scratch = _Scratch()
+    prev_thumb = cascade.thumb(prev)
+    curr_thumb: Optional[np.ndarray] = None
+
+    for grabbed, curr in frames:
+        t0 = clock()
+        curr_thumb = cascade.thumb(curr, out=curr_thumb)
+        raw = cascade.score(prev_thumb, curr_thumb, mode)
+        t1 = clock()
+        cascade.samples += 1
+        if raw < cascade.floor:
+            cascade.fast += 1
+            if profiler is not None:
+                profiler.add("thumb", t0, t1)
+        elif mode == "global":
+            raw = _image_mean(scratch.blurred_diff(prev, curr)) / 255.0
+            if profiler is not None:
+                profiler.add("thumb", t0, t1)
+                profiler.add("diff", t1, clock())
+        else:
+            diff = scratch.blurred_diff(prev, curr)
+            t2 = clock()
+            raw = _top_fraction_mean(scratch.tile_means(diff, gx, gy))
+            if profiler is not None:
+                profiler.add("thumb", t0, t1)
+                profiler.add("diff", t1, t2)
+                profiler.add("aggregate", t2, clock())
+        yield raw / grabbed, grabbed
+
+        prev = curr
+        prev_thumb, curr_thumb = curr_thumb, prev_thumb  # ping-pong
+
@@ -0,0 +1,124 @@
+# Stages/score_sketch.py
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+
+
+DEFAULT_BINS = 16384  # bin width ~6e-5 in score units
+AUTO_MODES = ("off", "percent", "split")
+
+
+class ScoreSketch:
+    """
+    Streaming quantile sketch for motion scores: a fixed-bin histogram over
+    [0, 1] with one overflow bin. Memory is constant, updates are one
+    vectorized bincount per batch, and two sketches with the same bins merge
+    by adding counts (so per-chunk sketches combine exactly). Quantiles are
+    exact to one bin width.
+    """
+
+    def __init__(self, bins: int = DEFAULT_BINS):
+        self.bins = int(bins)
+        self.counts = np.zeros(self.bins + 1, dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def _bin_index(self, values) -> np.ndarray:
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[~np.isnan(v)]
+        return np.clip(np.floor(v * self.bins), 0, self.bins).astype(np.intp)
+
+    def update(self, values, weight: int = 1) -> None:
+        """Add a batch of scores; weight=-1 removes values added earlier."""
+        idx = self._bin_index(values)
+        if idx.size:
+            self.counts += weight * np.bincount(idx, minlength=self.bins + 1)
+
+    def merge(self, other: "ScoreSketch") -> "ScoreSketch":
+        if other.bins != self.bins:
+            raise ValueError(f"Cannot merge sketches with {self.bins} and {other.bins} bins")
+        self.counts += other.counts
+        return self
+
+    def edge(self, b: int) -> float:
+        return min(1.0, b / float(self.bins))
+
+    def top_fraction_threshold(self, fraction: float) -> float:
+        """Highest bin edge t that still has at least `fraction` of the scores >= t (at least one score)."""
+        total = self.count
+        if total == 0:
+            return 1.0
+        at_or_above = np.cumsum(self.counts[::-1])[::-1]  # scores >= edge(b)
+        need = max(1.0, float(fraction) * total)
+        b = int(np.flatnonzero(at_or_above >= need)[-1])
+        return self.edge(b)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (upper edge of the bin that reaches q)."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        b = int(np.searchsorted(np.cumsum(self.counts), max(1.0, float(q) * total)))
+        return self.edge(b + 1)
+
+    def split_threshold(self) -> Optional[float]:
+        """
+        Otsu split: the bin edge that maximizes between-class variance of the
+        score histogram, i.e. the natural cut between the still floor and the
+        motion mode. None when all scores fall in one bin.
+        """
+        counts = self.counts.astype(np.float64)
+        total = counts.sum()
+        if total == 0 or np.count_nonzero(counts) < 2:
+            return None
+        centers = (np.arange(self.bins + 1) + 0.5) / self.bins
+        w0 = np.cumsum(counts)[:-1]  # below edge b + 1
+        m0 = np.cumsum(counts * centers)[:-1]
+        w1 = total - w0
+        mean = m0[-1] + counts[-1] * centers[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            between = (mean * w0 - m0 * total) ** 2 / (w0 * w1)
+        between[(w0 == 0) | (w1 == 0)] = -1.0
+        return self.edge(int(np.argmax(between)) + 1)
+
+
+def auto_threshold(sketch: ScoreSketch, cfg: UpscaleConfig) -> Tuple[float, Dict]:
+    """
+    Threshold for cfg.auto_sensitivity, from `sketch` alone:
+      - "percent": the top cfg.auto_motion_percent of frames are motion
+      - "split":   Otsu split between the still and motion parts of the distribution
+    Falls back to cfg.sensitivity when the sketch is empty or degenerate.
+    Returns (threshold, info) where info is recorded in the output settings.
+    """
+    mode = str(getattr(cfg, "auto_sensitivity", "off") or "off").lower()
+    if mode not in AUTO_MODES:
+        raise ValueError(f"Unknown auto_sensitivity: {mode} (expected one of {', '.join(AUTO_MODES)})")
+    info: Dict = {"method": mode, "frames": sketch.count, "fallback": False}
+
+    threshold: Optional[float] = None
+    if sketch.count and mode == "percent":
+        percent = float(getattr(cfg, "auto_motion_percent", 10.0))
+        info["motion_percent"] = percent
+        threshold = sketch.top_fraction_threshold(percent / 100.0)
+    elif sketch.count and mode == "split":
+        threshold = sketch.split_threshold()
+
+    if threshold is None:
+        threshold = float(cfg.sensitivity)
+        info["fallback"] = True
+    # Never let the all-still floor (score 0) count as motion.
+    threshold = max(threshold, 1.0 / sketch.bins)
+    info["threshold"] = threshold
+    info["median"] = sketch.quantile(0.5)
+    info["p99"] = sketch.quantile(0.99)
+    return threshold, info
+
+
+def auto_enabled(cfg: UpscaleConfig) -> bool:
+    return str(getattr(cfg, "auto_sensitivity", "off") or "off").lower() != "off"
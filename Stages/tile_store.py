@@ -0,0 +1,171 @@
+# Stages/tile_store.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+from Stages.frame_source import RawFormat, scaled_size, source_frame_size
+from Stages.motion_score import compute_motion_scores, raw_format_from_config
+from Stages.profiling import Profiler
+from Stages.score_file import load_score_file, write_score_file
+from Stages.score_kernels import parse_tile_grid, tile_edges
+
+
+BLOCK_FRAMES = 65536  # frames aggregated per vectorized step, bounds temporary memory
+
+
+class TileStore:
+    """
+    Per-frame tile means, shape (frames, gy, gx), float16 in [0, 1].
+
+    Detail, global and percentile scores are all derived from this array
+    without decoding. float16 keeps ~3 significant digits, so derived scores
+    match a fresh scoring pass to ~1e-3 relative. Grids whose counts divide the
+    base grid are pooled from it (area-weighted); their tile edges follow the
+    base grid, which can differ from direct scoring by < base/coarse pixels.
+    """
+
+    def __init__(self, tiles: np.ndarray, fps: float, frame_size: Tuple[int, int], settings: Optional[Dict] = None):
+        if tiles.ndim != 3:
+            raise ValueError(f"Tile array must be (frames, gy, gx), got shape {tiles.shape}")
+        self.tiles = tiles
+        self.fps = float(fps)
+        self.frame_size = (int(frame_size[0]), int(frame_size[1]))
+        self.settings = dict(settings or {})
+
+    @property
+    def grid(self) -> Tuple[int, int]:
+        return int(self.tiles.shape[2]), int(self.tiles.shape[1])
+
+    @property
+    def frame_count(self) -> int:
+        return int(self.tiles.shape[0])
+
+    def areas(self) -> np.ndarray:
+        """Pixel count of each base tile, (gy, gx)."""
+        gx, gy = self.grid
+        w, h = self.frame_size
+        return np.outer(np.diff(tile_edges(h, gy)), np.diff(tile_edges(w, gx))).astype(np.float64)
+
+    def _blocks(self, grid=None):
+        # Yields float32 (frames, cgy, cgx) blocks at `grid`, pooled from the base grid.
+        gx, gy = self.grid
+        cgx, cgy = parse_tile_grid(grid) if grid is not None else (gx, gy)
+        if gx % cgx or gy % cgy:
+            raise ValueError(f"Grid {cgx}x{cgy} is not a divisor of the stored {gx}x{gy} grid")
+        mx, my = gx // cgx, gy // cgy
+        areas = self.areas().reshape(cgy, my, cgx, mx)
+        pooled_areas = areas.sum(axis=(1, 3))
+
+        for start in range(0, self.frame_count, BLOCK_FRAMES):
+            block = np.asarray(self.tiles[start:start + BLOCK_FRAMES], dtype=np.float32)
+            if mx == 1 and my == 1:
+                yield block
+                continue
+            weighted = block.reshape(-1, cgy, my, cgx, mx) * areas
+            yield (weighted.sum(axis=(2, 4)) / pooled_areas).astype(np.float32)
+
+    def detail_scores(self, top_fraction: float = 0.15, grid=None) -> np.ndarray:
+        """Mean of the top `top_fraction` of tiles per frame (the score_detail aggregation)."""
+        out = np.empty(self.frame_count, dtype=np.float32)
+        pos = 0
+        for block in self._blocks(grid):
+            flat = block.reshape(block.shape[0], -1)
+            k = max(1, int(np.ceil(flat.shape[1] * top_fraction)))
+            top = np.partition(flat, -k, axis=1)[:, -k:]
+            out[pos:pos + len(flat)] = top.mean(axis=1)
+            pos += len(flat)
+        return out
+
+    def percentile_scores(self, q: float, grid=None) -> np.ndarray:
+        """Per-frame `q`th percentile of the tile means."""
+        out = np.empty(self.frame_count, dtype=np.float32)
+        pos = 0
+        for block in self._blocks(grid):
+            flat = block.reshape(block.shape[0], -1)
+            out[pos:pos + len(flat)] = np.percentile(flat, q, axis=1)
+            pos += len(flat)
+        return out
+
+    def global_scores(self) -> np.ndarray:
+        """Area-weighted mean of all tiles, i.e. the score_global value."""
+        weights = (self.areas() / self.areas().sum()).astype(np.float32)
+        out = np.empty(self.frame_count, dtype=np.float32)
+        pos = 0
+        for block in self._blocks():
+            out[pos:pos + len(block)] = (block * weights).sum(axis=(1, 2))
+            pos += len(block)
+        return out
+
+    def scores(self, mode: str = "detail", *, grid=None, top_fraction: float = 0.15,
+               percentile: Optional[float] = None) -> np.ndarray:
+        if percentile is not None:
+            return self.percentile_scores(percentile, grid)
+        if str(mode).lower() == "global":
+            return self.global_scores()
+        return self.detail_scores(top_fraction, grid)
+
+    def save(self, path: Path) -> None:
+        write_score_file(
+            path,
+            self.tiles,
+            self.fps,
+            fmt="f16",
+            settings=self.settings,
+            extra={"frame_size": list(self.frame_size)},
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "TileStore":
+        """Memory-maps the tile array; nothing is read until scores are derived."""
+        tiles, fps, header = load_score_file(path)
+        if tiles.ndim != 3:
+            raise ValueError(f"Not a tile store (shape {tiles.shape}): {path}")
+        return cls(tiles, fps, tuple(header.get("frame_size", (0, 0))), header.get("settings", {}))
+
+
+def _preprocessed_size(
+    video_path: Path,
+    max_width: int,
+    roi: Optional[List[int]] = None,
+    raw: Optional[RawFormat] = None,
+) -> Tuple[int, int]:
+    # Analysis frame size, read from container metadata (or the declared raw size), cropped to the scoring ROI.
+    width, height = (raw.width, raw.height) if raw is not None else source_frame_size(video_path)
+    if roi is not None:
+        return scaled_size(roi[2], roi[3], max_width, width)
+    return scaled_size(width, height, max_width)
+
+
+def compute_tile_store(
+    video_path: Path,
+    cfg: UpscaleConfig,
+    *,
+    max_width: int = 640,
+    stats: Optional[Dict] = None,
+    frame_range: Optional[Tuple[int, Optional[int]]] = None,
+    profiler: Optional[Profiler] = None,
+) -> Tuple[np.ndarray, float, TileStore]:
+    """Returns (scores, fps, store): the usual scores plus the tile means they were aggregated from."""
+    tiles: List[np.ndarray] = []
+    stats = {} if stats is None else stats
+    scores, fps = compute_motion_scores(
+        video_path, cfg, max_width=max_width, stats=stats, tiles=tiles, frame_range=frame_range, profiler=profiler
+    )
+    gx, gy = parse_tile_grid(getattr(cfg, "tile_grid", (8, 8)))
+    array = np.stack(tiles) if tiles else np.zeros((0, gy, gx), dtype=np.float16)
+    settings = {
+        "tile_grid": [gx, gy],
+        "sample_every_n": max(1, int(getattr(cfg, "sample_every_n", 1))),
+        "max_width": int(max_width),
+    }
+    if frame_range is not None:
+        settings["frame_range"] = list(frame_range)
+    roi = stats.get("roi")
+    if roi is not None:
+        settings["roi"] = roi  # tiles cover this (x, y, w, h) region of the source frame
+    frame_size = _preprocessed_size(video_path, max_width, roi, raw_format_from_config(cfg))
+    return scores, fps, TileStore(array, fps, frame_size, settings)
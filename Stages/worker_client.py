@@ -0,0 +1,242 @@
+# Stages/worker_client.py
+from __future__ import annotations
+
+import time
+
+T0 = time.perf_counter()  # click-to-start is measured from here (after interpreter startup)
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Only the standard library is imported here: this is what every panel click
+# starts, so it must not pay for numpy/cv2 (the daemon has them loaded).
+
+STAGES = (
+    "Stages.resolve_detect_markers",
+    "Stages.resolve_cut_and_sequence",
+    "Stages.resolve_regroup",
+    "Stages.resolve_upscale_interpolate",
+)
+PING = "ping"  # pseudo-stage: load the Detect stage and connect to Resolve, then return
+SPAWN_TIMEOUT_S = 60.0
+CONNECT_TIMEOUT_S = 2.0
+LOST_EXIT = 3  # the daemon started the stage but the connection dropped before it finished
+
+
+def state_path() -> Path:
+    # Per-user Eternal2x folder, next to the score cache (see Stages.score_cache.default_cache_dir).
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA")
+        if base:
+            return Path(base) / "Eternal2x" / "worker.json"
+    elif sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "Eternal2x" / "worker.json"
+    base = os.environ.get("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "eternal2x" / "worker.json"
+
+
+def read_state() -> Optional[Dict]:
+    try:
+        with state_path().open("r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) and "port" in state and "token" in state else None
+
+
+def _connect(state: Dict) -> Optional[socket.socket]:
+    try:
+        return socket.create_connection(("127.0.0.1", int(state["port"])), timeout=CONNECT_TIMEOUT_S)
+    except OSError:
+        return None
+
+
+def request(state: Dict, stage: str, args: List[str], echo: bool = True) -> Optional[Tuple[int, Dict]]:
+    """
+    Runs `stage` with `args` in the daemon described by `state`, echoing its
+    output as it arrives. Returns (exit code, timings), or None when the stage
+    never started (no daemon answers, or it asks to be restarted because its
+    code changed on disk). If the connection drops after the daemon started
+    the stage, the result is (LOST_EXIT, timings) with timings["lost"] set:
+    the stage may have run, so it must not be run again.
+    """
+    conn = _connect(state)
+    if conn is None:
+        return None
+    timings: Dict = {}
+    started = False
+    try:
+        with conn:
+            conn.settimeout(None)  # stages run as long as they need
+            message = {"token": state["token"], "stage": stage, "args": args, "cwd": os.getcwd()}
+            conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+            for line in conn.makefile("r", encoding="utf-8"):
+                reply = json.loads(line)
+                if "out" in reply and echo:
+                    print(reply["out"], flush=True)
+                elif "err" in reply and echo:
+                    print(reply["err"], file=sys.stderr, flush=True)
+                elif "started" in reply:
+                    started = True
+                    timings["start_ms"] = (time.perf_counter() - T0) * 1000.0
+                elif "restart" in reply:
+                    return None
+                elif "exit" in reply:
+                    timings["stage_s"] = reply.get("seconds", 0.0)
+                    return int(reply["exit"]), timings
+    except (OSError, ValueError):
+        pass  # reset or a torn last line; same as the connection dropping
+    if not started:
+        return None
+    timings["lost"] = True  # the daemon died mid-stage
+    return LOST_EXIT, timings
+
+
+def spawn_daemon() -> Optional[Dict]:
+    """Starts a detached daemon (idle-timed, see Stages.worker_daemon) and waits until it answers."""
+    import subprocess
+
+    root = Path(__file__).resolve().parent.parent
+    log = state_path().with_name("worker.log")
+    log.parent.mkdir(parents=True, exist_ok=True)
+    old = read_state()
+    kwargs: Dict = {"cwd": str(root), "stdin": subprocess.DEVNULL, "close_fds": True}
+    if sys.platform.startswith("win"):
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with log.open("ab") as out:
+        subprocess.Popen([sys.executable, "-m", "Stages.worker_daemon"], stdout=out, stderr=out, **kwargs)
+    deadline = time.perf_counter() + SPAWN_TIMEOUT_S
+    while time.perf_counter() < deadline:
+        state = read_state()
+        if state is not None and state != old:
+            conn = _connect(state)
+            if conn is not None:
+                conn.close()
+                return state
+        time.sleep(0.05)
+    return None
+
+
+def run_local(stage: str, args: List[str]) -> int:
+    """Launch-on-demand path: import the stage here and run its main()."""
+    import importlib
+
+    if stage == PING:
+        importlib.import_module(STAGES[0])._get_resolve()
+        return 0
+    module = importlib.import_module(stage)
+    sys.argv = [module.__file__ or stage] + list(args)
+    try:
+        result = module.main()
+    except SystemExit as exc:
+        return exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    return result if isinstance(result, int) else 0
+
+
+def run(stage: str, args: List[str], spawn: bool = True) -> int:
+    """
+    Runs `stage` through the resident daemon, starting one if none answers
+    (when `spawn`), and falls back to running it in this process if that
+    fails too. Only a stage that never started is retried; one lost mid-run
+    exits with LOST_EXIT. Prints how long the click took to reach the stage.
+    """
+    if stage != PING and stage not in STAGES:
+        print(f"Unknown stage: {stage} (expected one of {', '.join(STAGES)})", file=sys.stderr)
+        return 2
+    state = read_state()
+    result = request(state, stage, args) if state is not None else None
+    path = "warm daemon"
+    if result is None and spawn:
+        state = spawn_daemon()
+        result = request(state, stage, args) if state is not None else None
+        path = "daemon started on demand"
+    if result is not None:
+        code, timings = result
+        if timings.get("lost"):
+            # Never retried: the stage may already have edited the timeline.
+            print(
+                f"[Eternal2x worker] {stage}: lost the daemon while the stage was running; "
+                "check the timeline before running it again.",
+                file=sys.stderr,
+                flush=True,
+            )
+            return code
+        print(f"[Eternal2x worker] {stage}: started {timings.get('start_ms', 0.0):.0f} ms after launch ({path}).")
+        return code
+    print(f"[Eternal2x worker] no daemon; running {stage} in this process.", flush=True)
+    return run_local(stage, args)
+
+
+def _time_command(cmd: List[str]) -> float:
+    # Wall time from spawning `cmd` to its exit, in ms (the ping stage exits as soon as it has started).
+    import subprocess
+
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def bench(repeats: int) -> Dict:
+    """
+    Click-to-start latency of both paths, as the panel sees it (interpreter
+    startup included): a fresh `python -m Stages.worker_client --local ping`
+    (imports and Resolve connection per click) against
+    `python -m Stages.worker_client ping` answered by a warm daemon.
+    """
+    import statistics
+
+    base = [sys.executable, "-m", "Stages.worker_client"]
+    state = read_state()
+    if state is None or request(state, PING, [], echo=False) is None:
+        state = spawn_daemon()
+        if state is None:
+            raise RuntimeError("Could not start the worker daemon")
+    report: Dict = {}
+    for name, cmd in (("launch", base + ["--local", PING]), ("daemon", base + [PING])):
+        _time_command(cmd)  # warm the OS file cache; the first real click would not get this for free
+        samples = [_time_command(cmd) for _ in range(max(1, repeats))]
+        report[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "samples_ms": samples}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run an Eternal2x stage through the resident worker daemon (or in-process if none is running)."
+    )
+    parser.add_argument("stage", nargs="?", help=f"Stage module ({', '.join(STAGES)}) or '{PING}'")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments passed to the stage")
+    parser.add_argument("--local", action="store_true", help="Skip the daemon; run the stage in this process")
+    parser.add_argument("--no_spawn", action="store_true", help="Do not start a daemon if none is running")
+    parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    parser.add_argument(
+        "--bench", type=int, default=None, metavar="N", help="Time click-to-start of both paths, N runs each"
+    )
+    args = parser.parse_args()
+
+    if args.stop:
+        state = read_state()
+        stopped = state is not None and request(state, "stop", [], echo=False) is not None
+        print("Worker daemon stopped." if stopped else "No worker daemon running.")
+        return 0
+    if args.bench is not None:
+        report = bench(args.bench)
+        for name, label in (("launch", "launch on demand"), ("daemon", "warm daemon")):
+            r = report[name]
+            print(f"Click-to-start, {label}: median {r['median_ms']:.0f} ms, min {r['min_ms']:.0f} ms")
+        return 0
+    if not args.stage:
+        parser.error("give a stage, --stop or --bench")
+    if args.local:
+        return run_local(args.stage, args.args)
+    return run(args.stage, args.args, spawn=not args.no_spawn)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
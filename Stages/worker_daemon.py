@@ -0,0 +1,236 @@
+# Stages/worker_daemon.py
+from __future__ import annotations
+
+import argparse
+import importlib
+import io
+import json
+import os
+import secrets
+import socketserver
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict
+
+from Stages.worker_client import PING, STAGES, read_state, request, state_path
+
+
+IDLE_TIMEOUT_S = 1800.0
+POLL_S = 1.0
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _code_stamp() -> float:
+    # Newest source mtime; a change (e.g. an applied update) means the loaded stages are stale.
+    return max((p.stat().st_mtime for d in ("Stages", "Pipeline") for p in (ROOT / d).glob("*.py")), default=0.0)
+
+
+def _keep_resolve_warm() -> bool:
+    """
+    Makes DaVinciResolveScript.scriptapp hand back one cached handle while it
+    still answers, so each stage's _get_resolve() skips the connection, and
+    reconnects if Resolve was restarted. False when the module is missing.
+    """
+    try:
+        import DaVinciResolveScript as bmd  # type: ignore
+    except Exception:
+        return False
+    connect = bmd.scriptapp
+    handles: Dict[str, object] = {}
+
+    def scriptapp(name):
+        app = handles.get(name)
+        if app is not None:
+            try:
+                if app.GetProjectManager() is not None:
+                    return app
+            except Exception:
+                pass
+        app = connect(name)
+        if app is not None:
+            handles[name] = app
+        return app
+
+    bmd.scriptapp = scriptapp
+    scriptapp("Resolve")
+    return True
+
+
+class _LineWriter(io.TextIOBase):
+    # File-like stdout/stderr that forwards each complete line as it is printed.
+
+    def __init__(self, send: Callable[[str], None]):
+        self._send = send
+        self._pending = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._pending + text).split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._send(line)
+        return len(text)
+
+    def flush(self) -> None:
+        pass  # partial lines wait for their newline (or close)
+
+    def close(self) -> None:
+        if self._pending:
+            self._send(self._pending)
+            self._pending = ""
+        super().close()
+
+
+class WorkerDaemon(socketserver.TCPServer):
+    """
+    Resident stage runner on 127.0.0.1. Stage modules (and with them numpy
+    and cv2) are imported once at startup and the Resolve handle is kept
+    warm, so a panel click only costs the small stdlib-only client
+    (Stages.worker_client) and a local round trip.
+
+    One request per connection, one JSON line:
+        {"token", "stage", "args", "cwd"}
+    answered with JSON lines: {"started"}, then {"out"} / {"err"} per printed
+    line, then {"exit", "seconds"}. Requests run one at a time in this
+    process, like clicks through os.execute. Stages whose source changed
+    on disk are answered with {"restart"} and the daemon exits, so the
+    client starts a fresh one. The daemon also exits after `idle_s` seconds
+    without requests.
+    """
+
+    allow_reuse_address = False
+
+    def __init__(self, idle_s: float = IDLE_TIMEOUT_S):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.token = secrets.token_hex(16)
+        self.idle_s = idle_s
+        self.last_used = time.monotonic()
+        self.stamp = _code_stamp()
+        self.modules = {name: importlib.import_module(name) for name in STAGES}
+        self.resolve = _keep_resolve_warm()
+        self.running = True
+
+    def publish(self) -> None:
+        # Port, token and pid for clients; the file is only readable by this user.
+        path = state_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        state = {"port": self.server_address[1], "token": self.token, "pid": os.getpid(), "started": time.time()}
+        fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    def unpublish(self) -> None:
+        state = read_state()
+        if state is not None and state.get("pid") == os.getpid():
+            state_path().unlink(missing_ok=True)
+
+    def run_stage(self, stage: str, args, send: Callable[[Dict], None]) -> int:
+        module = self.modules[STAGES[0] if stage == PING else stage]
+        out = _LineWriter(lambda line: send({"out": line}))
+        err = _LineWriter(lambda line: send({"err": line}))
+        argv = sys.argv
+        sys.argv = [module.__file__ or stage] + [str(a) for a in args]
+        code = 0
+        try:
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    result = None
+                    if stage != PING:
+                        result = module.main()
+                    elif self.resolve:
+                        module._get_resolve()  # what every stage starts with
+                    code = result if isinstance(result, int) else 0
+                except SystemExit as exc:
+                    code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+        finally:
+            sys.argv = argv
+            out.close()
+            err.close()
+        return code
+
+    def serve(self) -> None:
+        self.timeout = POLL_S
+        self.publish()
+        print(f"Eternal2x worker daemon on 127.0.0.1:{self.server_address[1]} (pid {os.getpid()})", flush=True)
+        try:
+            while self.running and time.monotonic() - self.last_used < self.idle_s:
+                self.handle_request()
+        finally:
+            self.unpublish()
+            self.server_close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server: WorkerDaemon = self.server  # type: ignore[assignment]
+        try:
+            message = json.loads(self.rfile.readline(1 << 20) or b"{}")
+        except ValueError:
+            return
+        if not secrets.compare_digest(str(message.get("token", "")), server.token):
+            return  # not one of our clients
+        stage = message.get("stage", "")
+
+        def send(reply: Dict) -> None:
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        server.last_used = time.monotonic()
+        if stage == "stop":
+            server.running = False
+            send({"exit": 0})
+            return
+        if _code_stamp() != server.stamp:
+            server.running = False
+            send({"restart": True})
+            return
+        if stage != PING and stage not in STAGES:
+            send({"err": f"Unknown stage: {stage}"})
+            send({"exit": 2})
+            return
+
+        cwd = os.getcwd()
+        t0 = time.perf_counter()
+        try:
+            os.chdir(message.get("cwd") or cwd)
+            send({"started": True})
+            code = server.run_stage(stage, message.get("args") or [], send)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # the client went away (panel closed); the stage result is lost
+        finally:
+            os.chdir(cwd)
+            server.last_used = time.monotonic()
+        send({"exit": code, "seconds": time.perf_counter() - t0})
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resident Eternal2x worker: keeps stages, numpy/cv2 and the Resolve handle loaded between clicks."
+    )
+    parser.add_argument(
+        "--idle",
+        type=float,
+        default=IDLE_TIMEOUT_S,
+        help=f"Exit after this many idle seconds (default {IDLE_TIMEOUT_S:.0f})",
+    )
+    args = parser.parse_args()
+
+    state = read_state()
+    if state is not None and request(state, PING, [], echo=False) is not None:
+        print(f"A worker daemon is already running (pid {state.get('pid')}).")
+        return
+    WorkerDaemon(idle_s=args.idle).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# tests/baseline.py
+"""
+Reference implementations copied from the baseline tree (before the
+vectorized, parallel and streaming paths), so the tests can check the
+current code against the original behaviour.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+
+def tile_means_loop(diff: np.ndarray, gx: int, gy: int) -> np.ndarray:
+    # The per-tile loop of the original score_detail, as a (gy, gx) matrix.
+    h, w = diff.shape[:2]
+    tw, th = max(1, w // gx), max(1, h // gy)
+
+    vals = []
+    for ty in range(gy):
+        y0 = ty * th
+        y1 = (ty + 1) * th if ty < gy - 1 else h
+        for tx in range(gx):
+            x0 = tx * tw
+            x1 = (tx + 1) * tw if tx < gx - 1 else w
+            tile = diff[y0:y1, x0:x1]
+            vals.append(float(tile.mean()) / 255.0)
+    return np.array(vals, dtype=np.float32).reshape(gy, gx)
+
+
+def top_fraction_mean(values: np.ndarray) -> float:
+    v = np.asarray(values, dtype=np.float32).ravel()
+    k = max(1, int(np.ceil(len(v) * 0.15)))   # top 15%
+    topk = np.partition(v, -k)[-k:]
+    return float(topk.mean())
+
+
+def compute_motion_scores(video_path, cfg, *, max_width: int = 640):
+    # The original serial loop: (list of per-frame scores, fps).
+    import cv2
+
+    def preprocess(frame_bgr):
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        if max_width and gray.shape[1] > max_width:
+            h, w = gray.shape[:2]
+            scale = max_width / float(w)
+            gray = cv2.resize(gray, (max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def score_global(prev, curr):
+        diff = cv2.GaussianBlur(cv2.absdiff(prev, curr), (5, 5), 0)
+        return float(diff.mean()) / 255.0
+
+    def score_detail(prev, curr, grid):
+        diff = cv2.GaussianBlur(cv2.absdiff(prev, curr), (5, 5), 0)
+        return top_fraction_mean(tile_means_loop(diff, grid[0], grid[1]))
+
+    from Stages.score_kernels import parse_tile_grid
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+    n = max(1, int(cfg.sample_every_n))
+    mode = str(cfg.motion_mode).lower()
+    grid = parse_tile_grid(cfg.tile_grid)
+
+    ret, first = cap.read()
+    prev = preprocess(first)
+    scores = [0.0]
+    while True:
+        grabbed = 0
+        for _ in range(n):
+            if not cap.grab():
+                break
+            grabbed += 1
+        if grabbed == 0:
+            break
+        ret2, frame = cap.retrieve()
+        if not ret2:
+            break
+        curr = preprocess(frame)
+        raw = score_global(prev, curr) if mode == "global" else score_detail(prev, curr, grid)
+        scores.extend([raw / grabbed] * grabbed)
+        prev = curr
+    cap.release()
+    return scores, fps
+
+
+def detect_motion_segments(scores, cfg):
+    # The original per-frame loop with merge and filter: list of (start, end), inclusive.
+    segments = []
+    threshold = cfg.sensitivity
+    in_seg = False
+    start = 0
+    for i, s in enumerate(scores):
+        is_motion = s >= threshold
+        if is_motion and not in_seg:
+            in_seg = True
+            start = i
+        elif (not is_motion) and in_seg:
+            in_seg = False
+            segments.append([start, i - 1])
+    if in_seg:
+        segments.append([start, len(scores) - 1])
+
+    merged = segments[:1]
+    for seg in segments[1:]:
+        last = merged[-1]
+        if seg[0] - last[1] - 1 <= cfg.merge_gap_frames:
+            last[1] = max(last[1], seg[1])
+        else:
+            merged.append(seg)
+    return [(s, e) for s, e in merged if e - s + 1 >= cfg.min_segment_frames]
@@ -0,0 +1,33 @@
+# tests/random_cases.py
+"""Seeded random score series and segmentation settings shared by the segmentation tests."""
+from dataclasses import replace
+
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+
+
+def random_scores(rng: np.random.Generator) -> np.ndarray:
+    """Scores shaped like real runs: quiet stretches, bursts, repeated stride-N values and exact ties."""
+    length = int(rng.integers(0, 400))
+    kind = rng.integers(0, 4)
+    if kind == 0:
+        scores = rng.random(length)
+    elif kind == 1:
+        scores = np.repeat(rng.random(length // 3 + 1), 3)[:length]  # stride-3 style plateaus
+    elif kind == 2:
+        scores = rng.choice([0.0, 0.1, 0.2, 0.3], size=length)  # many exact ties with the thresholds
+    else:
+        scores = (rng.random(length) < 0.1).astype(np.float64) * rng.random(length)  # sparse bursts
+    if length and rng.random() < 0.1:
+        scores[rng.integers(0, length, size=3)] = np.nan  # NaN never counts as motion
+    return scores
+
+
+def random_config(rng: np.random.Generator) -> UpscaleConfig:
+    return replace(
+        UpscaleConfig(),
+        sensitivity=float(rng.choice([0.0, 0.1, 0.2, 0.3, rng.random()])),
+        merge_gap_frames=int(rng.integers(0, 8)),
+        min_segment_frames=int(rng.integers(1, 10)),
+    )
@@ -0,0 +1,56 @@
+# tests/test_adaptive_refine.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.frame_detect import detect_motion_segments
+from Stages.motion_score import _refine_windows, compute_motion_scores
+
+SENSITIVITY = 0.03  # the bursts clip peaks around 0.1
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False, sensitivity=SENSITIVITY), **overrides)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_refined_windows_take_full_rate_scores(clip, workers):
+    n = 4
+    full, _fps = compute_motion_scores(clip, _cfg())
+    coarse, _fps = compute_motion_scores(clip, _cfg(sample_every_n=n))
+    stats = {}
+    cfg = _cfg(sample_every_n=n, adaptive_sampling=True, score_workers=workers)
+    adaptive, _fps = compute_motion_scores(clip, cfg, stats=stats)
+
+    windows = _refine_windows(coarse, n, SENSITIVITY, cfg.adaptive_margin)
+    assert windows and stats["refine_windows"] == len(windows)
+    refined = np.zeros(len(adaptive), dtype=bool)
+    for start, end in windows:
+        refined[start:end + 1] = True
+    np.testing.assert_array_equal(adaptive[refined], full[:len(adaptive)][refined])
+    np.testing.assert_array_equal(adaptive[~refined], coarse[~refined])
+    assert stats["refined_frames"] == int(refined.sum()) < stats["total_frames"]
+
+
+def test_adaptive_segments_match_full_rate(clip):
+    cfg = _cfg()
+    full, _fps = compute_motion_scores(clip, cfg)
+    adaptive, _fps = compute_motion_scores(clip, _cfg(sample_every_n=4, adaptive_sampling=True))
+    expected = detect_motion_segments(full, cfg)
+    assert len(expected)
+    np.testing.assert_array_equal(detect_motion_segments(adaptive, cfg), expected)
+
+
+def test_static_clip_is_not_refined(tmp_path_factory):
+    clip = make_clip(ClipSpec(160, 90, 60, "static", seed=1), tmp_path_factory.mktemp("static"))
+    stats = {}
+    compute_motion_scores(clip, _cfg(sample_every_n=4, adaptive_sampling=True), stats=stats)
+    assert stats["refined_frames"] == 0
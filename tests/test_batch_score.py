@@ -0,0 +1,106 @@
+# tests/test_batch_score.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages import batch_score
+from Stages.batch_score import DONE, FAILED, PENDING, Manifest, collect_inputs, run_batch
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores
+from Stages.score_file import load_score_file
+
+
+@pytest.fixture(scope="module")
+def clips(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("shoot_day")
+    return [make_clip(ClipSpec(160, 90, 40 + 10 * i, "bursts", seed=i), folder) for i in range(3)]
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    # Paths handed to the scoring worker, in order (workers=1 scores in this process).
+    calls = []
+    score_job = batch_score._score_job
+
+    def record(path, *args):
+        calls.append(path)
+        return score_job(path, *args)
+
+    monkeypatch.setattr(batch_score, "_score_job", record)
+    return calls
+
+
+def _manifest(tmp_path, clips, **overrides) -> Manifest:
+    cfg = replace(UpscaleConfig(score_cache=False, tile_grid=(4, 4)), **overrides)
+    inputs = collect_inputs([str(clips[0].parent)])
+    return Manifest.create(tmp_path / "manifest.json", inputs, cfg, tmp_path / "scores", "f32")
+
+
+def test_manifest_round_trip(tmp_path, clips):
+    manifest = _manifest(tmp_path, clips, sensitivity=0.07)
+    loaded = Manifest.load(manifest.path)
+    assert loaded.jobs == manifest.jobs
+    assert loaded.config() == replace(manifest.config(), tile_grid=[4, 4])  # JSON has no tuples
+    assert loaded.config().sensitivity == 0.07
+    assert sorted(job["path"] for job in loaded.jobs) == sorted(str(c.resolve()) for c in clips)
+    assert loaded.counts() == {PENDING: 3, DONE: 0, FAILED: 0}
+
+
+def test_resume_skips_finished_jobs(tmp_path, clips, scored):
+    manifest = _manifest(tmp_path, clips)
+    run = run_batch(manifest, workers=1)
+    first, how = next(run)
+    run.close()  # interrupted after one file
+    assert how == "scored" and scored == [first["path"]]
+
+    resumed = Manifest.load(manifest.path)
+    assert resumed.counts() == {PENDING: 2, DONE: 1, FAILED: 0}
+    finished = list(run_batch(resumed, workers=1))
+    assert len(scored) == 3 and first["path"] not in scored[1:]
+    assert sorted(job["path"] for job, _how in finished) == sorted(scored[1:])
+    assert Manifest.load(manifest.path).counts() == {PENDING: 0, DONE: 3, FAILED: 0}
+    assert list(run_batch(Manifest.load(manifest.path), workers=1)) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_outputs_equal_serial_scores(tmp_path, clips, workers):
+    manifest = _manifest(tmp_path, clips)
+    finished = list(run_batch(manifest, workers=workers))
+    assert {how for _job, how in finished} == {"scored"}
+    for job in Manifest.load(manifest.path).jobs:
+        expected, fps = compute_motion_scores(job["path"], manifest.config())
+        scores, file_fps, header = load_score_file(job["output"])
+        np.testing.assert_array_equal(scores, expected.astype(np.float32))
+        assert file_fps == fps and job["frames"] == len(expected)
+        assert header["source"] == job["path"]
+
+
+def test_failed_jobs_are_kept_and_retried(tmp_path, clips, scored):
+    manifest = _manifest(tmp_path, clips)
+    manifest.jobs[0]["path"] = str(tmp_path / "missing.mp4")
+    manifest.save()
+    finished = list(run_batch(manifest, workers=1))
+    assert [how for _job, how in finished].count("failed") == 1
+    assert Manifest.load(manifest.path).counts()[FAILED] == 1
+
+    scored.clear()
+    assert list(run_batch(Manifest.load(manifest.path), workers=1)) == []  # failed jobs wait for retry_failed
+    retried = list(run_batch(Manifest.load(manifest.path), workers=1, retry_failed=True))
+    assert scored == [str(tmp_path / "missing.mp4")] and retried[0][1] == "failed"
+
+
+def test_cached_and_duplicate_inputs_are_not_rescored(tmp_path, clips, scored):
+    copy = tmp_path / "copy" / clips[0].name
+    copy.parent.mkdir()
+    copy.write_bytes(clips[0].read_bytes())
+    cfg = UpscaleConfig(score_cache=True, score_cache_dir=str(tmp_path / "cache"))
+    inputs = collect_inputs([str(clips[0]), str(copy)])
+    manifest = Manifest.create(tmp_path / "manifest.json", inputs, cfg, None, "f32")
+    assert sorted(how for _job, how in run_batch(manifest, workers=1)) == ["copy", "scored"]
+    assert len(scored) == 1
+
+    again = Manifest.create(tmp_path / "again.json", inputs, cfg, None, "f32")
+    assert [how for _job, how in run_batch(again, workers=1)] == ["cache", "cache"]
+    assert len(scored) == 1
@@ -0,0 +1,47 @@
+# tests/test_batched_scoring.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores, stream_motion_scores
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+@pytest.mark.parametrize("batch", [2, 7, 32, 200])
+def test_batched_scores_equal_serial(clip, mode, n, batch):
+    serial, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    batched, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n, score_batch_frames=batch))
+    np.testing.assert_array_equal(batched, serial)
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice", "ignore:invalid value encountered")
+@pytest.mark.parametrize("grid", [(4, 4), (16, 9), (200, 8)])
+def test_batched_tiles_equal_serial(clip, grid):
+    # (200, 8) is finer than the 160-pixel frame, so batching falls back to the per-pair loop.
+    serial_tiles, batched_tiles = [], []
+    serial, _fps = compute_motion_scores(clip, _cfg(tile_grid=grid), tiles=serial_tiles)
+    batched, _fps = compute_motion_scores(clip, _cfg(tile_grid=grid, score_batch_frames=16), tiles=batched_tiles)
+    np.testing.assert_array_equal(batched, serial)
+    np.testing.assert_array_equal(np.stack(batched_tiles), np.stack(serial_tiles))
+
+
+def test_batched_chunks_and_stream_equal_serial(clip):
+    serial, _fps = compute_motion_scores(clip, _cfg())
+    cfg = _cfg(score_batch_frames=8, score_workers=2, score_chunk_frames=30, decode_ahead=2)
+    chunked, _fps = compute_motion_scores(clip, cfg)
+    np.testing.assert_array_equal(chunked, serial)
+    streamed, _fps = stream_motion_scores(clip, _cfg(score_batch_frames=8))
+    np.testing.assert_array_equal(np.fromiter(streamed, dtype=np.float64), serial)
@@ -0,0 +1,56 @@
+# tests/test_decode_ahead.py
+import threading
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import _decode_ahead, compute_motion_scores
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+@pytest.mark.parametrize("depth", [1, 4])
+def test_decode_ahead_scores_equal_serial(clip, mode, n, depth):
+    serial, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    ahead, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n, decode_ahead=depth))
+    np.testing.assert_array_equal(ahead, serial)
+
+
+def test_decode_ahead_chunks_equal_serial(clip):
+    serial, _fps = compute_motion_scores(clip, _cfg())
+    cfg = _cfg(decode_ahead=2, score_workers=2, score_chunk_frames=32)
+    chunked, _fps = compute_motion_scores(clip, cfg)
+    np.testing.assert_array_equal(chunked, serial)
+
+
+def test_decode_ahead_reraises_decoder_errors():
+    def frames():
+        yield 1, np.zeros((2, 2), dtype=np.uint8)
+        raise RuntimeError("decode failed")
+
+    received = []
+    with pytest.raises(RuntimeError, match="decode failed"):
+        for item in _decode_ahead(frames(), 2):
+            received.append(item)
+    assert len(received) == 1
+
+
+def test_decode_ahead_stops_decoder_when_abandoned():
+    stats = {}
+    items = _decode_ahead(((1, np.zeros((2, 2), dtype=np.uint8)) for _ in range(1000)), 2, stats)
+    next(items)
+    items.close()
+    assert not any(t.name == "decode-ahead" for t in threading.enumerate())
+    assert stats["frames"] == 1
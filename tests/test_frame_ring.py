@@ -0,0 +1,100 @@
+# tests/test_frame_ring.py
+import multiprocessing as mp
+import time
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.frame_ring import iter_ring
+from Stages.motion_score import compute_motion_scores
+
+SHAPE = (4, 6)
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+def _decode_counter(job, buffers):
+    # job = (frames, slow). Frame j is filled with the value j; every frame counts as one grab.
+    frames = job[0]
+    for j in range(frames):
+        buffers[j % len(buffers)].fill(j)
+        yield 1
+    return {"frames": frames}
+
+
+def _score_ids(job, prev, frames):
+    if job[1]:
+        time.sleep(0.05 if int(prev[0, 0]) % 2 else 0.0)  # finish out of order
+    return [int(prev[0, 0])] + [int(frame[0, 0]) for _grabbed, frame in frames]
+
+
+def _decode_failing(job, buffers):
+    buffers[0].fill(0)
+    yield 1
+    raise ValueError("decoder broke")
+
+
+def _score_failing(job, prev, frames):
+    raise ValueError("scorer broke")
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+@pytest.mark.parametrize("slots", [3, 16])
+def test_ring_scores_equal_serial(clip, mode, n, slots):
+    serial, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    stats = {}
+    cfg = _cfg(motion_mode=mode, sample_every_n=n, score_workers=2, score_ring_slots=slots)
+    ring, _fps = compute_motion_scores(clip, cfg, stats=stats)
+    np.testing.assert_array_equal(ring, serial)
+    assert stats["ring_slots"] == slots
+
+
+def test_ring_with_batches_and_tiles_equals_serial(clip):
+    serial_tiles, ring_tiles = [], []
+    serial, _fps = compute_motion_scores(clip, _cfg(), tiles=serial_tiles)
+    cfg = _cfg(score_workers=3, score_ring_slots=12, score_batch_frames=4)
+    ring, _fps = compute_motion_scores(clip, cfg, tiles=ring_tiles)
+    np.testing.assert_array_equal(ring, serial)
+    np.testing.assert_array_equal(np.stack(ring_tiles), np.stack(serial_tiles))
+
+
+def test_ring_results_come_back_in_frame_order():
+    summary = {}
+    results = list(iter_ring(_decode_counter, _score_ids, (50, False), SHAPE, 6, 3, 2, summary))
+    # Each span reads the frame before it, so the frame ids chain 0, 1, 2, ... 49.
+    chained = [results[0][0]] + [i for span in results for i in span[1:]]
+    assert chained == list(range(50))
+    assert summary["decoder"] == {"frames": 50} and summary["frames"] == 50
+
+
+def test_ring_slow_scorers_keep_frame_order():
+    slow = list(iter_ring(_decode_counter, _score_ids, (30, True), SHAPE, 4, 3, 1))
+    assert slow == [[i, i + 1] for i in range(29)]
+
+
+@pytest.mark.parametrize("decode, score, message", [
+    (_decode_failing, _score_ids, "decoder broke"),
+    (_decode_counter, _score_failing, "scorer broke"),
+])
+def test_ring_errors_are_raised_and_processes_stopped(decode, score, message):
+    with pytest.raises(RuntimeError, match=message):
+        list(iter_ring(decode, score, (20, False), SHAPE, 4, 2, 2))
+    assert not mp.active_children()
+
+
+def test_closing_the_ring_early_stops_processes():
+    results = iter_ring(_decode_counter, _score_ids, (1000, False), SHAPE, 4, 2, 1)
+    next(results)
+    results.close()
+    assert not mp.active_children()
@@ -0,0 +1,72 @@
+# tests/test_image_sequence.py
+from dataclasses import replace
+
+import cv2
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.image_sequence import is_image_sequence, resolve_sequence
+from Stages.motion_score import compute_motion_scores
+
+FIRST = 1001
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 70, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+@pytest.fixture(scope="module")
+def sequence(clip, tmp_path_factory):
+    # The clip's decoded frames as lossless PNGs, numbered from 1001 like a conform.
+    folder = tmp_path_factory.mktemp("sequence")
+    cap = cv2.VideoCapture(str(clip))
+    index = FIRST
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        cv2.imwrite(str(folder / f"shot_{index:04d}.png"), frame)
+        index += 1
+    cap.release()
+    (folder / "notes.txt").write_text("not a frame")
+    return folder
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+def test_patterns_resolve_to_the_same_frames(sequence):
+    files = resolve_sequence(sequence)
+    assert files[0].name == f"shot_{FIRST}.png" and len(files) == 70
+    for pattern in ("shot_%04d.png", "shot_####.png", f"shot_[{FIRST}-{FIRST + 69}].png", "shot_*.png", "shot_1010.png"):
+        assert is_image_sequence(sequence / pattern)
+        assert resolve_sequence(sequence / pattern) == files
+    assert resolve_sequence(sequence / f"shot_[{FIRST + 10}-{FIRST + 19}].png") == files[10:20]
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+def test_sequence_scores_equal_video_scores(clip, sequence, mode, n):
+    video, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    scores, fps = compute_motion_scores(sequence, _cfg(motion_mode=mode, sample_every_n=n, sequence_fps=23.976))
+    # The video reader can drop a lone trailing frame that the PNGs still have.
+    assert len(video) <= len(scores) <= len(video) + 1 and fps == 23.976
+    np.testing.assert_array_equal(scores[:len(video)], video)
+
+
+@pytest.mark.parametrize("workers, read_ahead", [(1, 0), (1, 8), (4, 2), (8, 16)])
+def test_sequence_scores_do_not_depend_on_workers(sequence, workers, read_ahead):
+    serial, _fps = compute_motion_scores(sequence, _cfg(sequence_workers=1, sequence_read_ahead=0))
+    cfg = _cfg(sequence_workers=workers, sequence_read_ahead=read_ahead, sample_every_n=1)
+    scores, _fps = compute_motion_scores(sequence, cfg)
+    np.testing.assert_array_equal(scores, serial)
+
+
+def test_chunked_sequence_equals_serial(sequence):
+    serial, _fps = compute_motion_scores(sequence, _cfg())
+    chunked, _fps = compute_motion_scores(sequence, _cfg(score_workers=2, score_chunk_frames=16, sequence_workers=2))
+    np.testing.assert_array_equal(chunked, serial)
@@ -0,0 +1,34 @@
+# tests/test_online_segmenter.py
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+from Stages.frame_detect import OnlineSegmenter
+from tests import baseline
+from tests.random_cases import random_config, random_scores
+
+
+def test_online_segments_match_loop():
+    rng = np.random.default_rng(13)
+    for case in range(3000):
+        scores, cfg = random_scores(rng), random_config(rng)
+        first_frame = int(rng.integers(0, 1000))
+        segmenter = OnlineSegmenter(cfg, first_frame=first_frame)
+        got = []
+        pos = 0
+        while pos < len(scores):  # pushed in uneven batches, like scores arriving per chunk
+            step = int(rng.integers(1, 40))
+            got.extend(segmenter.push_many(scores[pos:pos + step].tolist()))
+            pos += step
+        got.extend(segmenter.finish())
+        expected = baseline.detect_motion_segments(scores.tolist(), cfg)
+        expected = [(s + first_frame, e + first_frame) for s, e in expected]
+        assert got == expected, f"case {case}: {cfg}"
+
+
+def test_segments_are_emitted_once_final():
+    cfg = UpscaleConfig(sensitivity=0.5, merge_gap_frames=2, min_segment_frames=1)
+    segmenter = OnlineSegmenter(cfg)
+    assert segmenter.push_many([0.9, 0.9, 0.0, 0.0]) == []  # a burst within 2 frames could still merge
+    assert segmenter.push(0.0) == [(0, 1)]  # 3 quiet frames: final
+    assert segmenter.push(0.9) == []
+    assert segmenter.finish() == [(5, 5)]
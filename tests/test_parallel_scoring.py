@@ -0,0 +1,74 @@
+# tests/test_parallel_scoring.py
+import shutil
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores, stream_motion_scores
+from tests import baseline
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+def test_serial_scores_match_baseline_loop(clip, mode, n):
+    cfg = _cfg(motion_mode=mode, sample_every_n=n)
+    expected, expected_fps = baseline.compute_motion_scores(clip, cfg)
+    scores, fps = compute_motion_scores(clip, cfg)
+    assert fps == expected_fps
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-7)
+
+
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 2, 4])
+@pytest.mark.parametrize("chunk_frames", [16, 45])
+def test_chunked_scores_equal_serial(clip, mode, n, chunk_frames):
+    serial, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    cfg = _cfg(motion_mode=mode, sample_every_n=n, score_workers=2, score_chunk_frames=chunk_frames)
+    chunked, _fps = compute_motion_scores(clip, cfg)
+    np.testing.assert_array_equal(chunked, serial)
+
+
+def test_chunked_tiles_equal_serial(clip):
+    serial_tiles, chunked_tiles = [], []
+    compute_motion_scores(clip, _cfg(), tiles=serial_tiles)
+    compute_motion_scores(clip, _cfg(score_workers=2, score_chunk_frames=20), tiles=chunked_tiles)
+    np.testing.assert_array_equal(np.stack(chunked_tiles), np.stack(serial_tiles))
+
+
+@pytest.mark.parametrize("frame_range", [(0, 59), (17, 101), (40, None)])
+def test_chunked_range_equals_sliced_serial(clip, frame_range):
+    full, _fps = compute_motion_scores(clip, _cfg())
+    cfg = _cfg(score_workers=2, score_chunk_frames=16)
+    ranged, _fps = compute_motion_scores(clip, cfg, frame_range=frame_range)
+    start, end = frame_range
+    np.testing.assert_array_equal(ranged, full[start:None if end is None else end + 1])
+
+
+def test_streamed_chunks_equal_computed(clip):
+    cfg = _cfg(score_workers=2, score_chunk_frames=16)
+    computed, _fps = compute_motion_scores(clip, cfg)
+    streamed, _fps = stream_motion_scores(clip, cfg)
+    np.testing.assert_array_equal(np.fromiter(streamed, dtype=np.float64), computed)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+@pytest.mark.parametrize("chunk_frames", [16, 45])
+def test_ffmpeg_chunked_scores_equal_serial_at_ntsc_rate(tmp_path_factory, chunk_frames):
+    # Chunks start with a seek; at 29.97 fps index / fps used to round past the target frame.
+    clip = make_clip(ClipSpec(160, 90, 130, "bursts", seed=3, fps=30000 / 1001), tmp_path_factory.mktemp("ntsc"))
+    serial, _fps = compute_motion_scores(clip, _cfg(frame_source="ffmpeg"))
+    cfg = _cfg(frame_source="ffmpeg", score_workers=2, score_chunk_frames=chunk_frames)
+    chunked, _fps = compute_motion_scores(clip, cfg)
+    np.testing.assert_array_equal(chunked, serial)
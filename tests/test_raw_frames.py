@@ -0,0 +1,100 @@
+# tests/test_raw_frames.py
+import os
+import threading
+from dataclasses import replace
+
+import cv2
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.frame_source import RawFormat, RawFrameSource
+from Stages.motion_score import compute_motion_scores
+
+W, H = 160, 90
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(W, H, 70, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+@pytest.fixture(scope="module")
+def luma(clip):
+    # The clip's decoded frames as the gray images the OpenCV path scores.
+    cap = cv2.VideoCapture(str(clip))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return np.stack(frames)
+
+
+@pytest.fixture(scope="module")
+def raw_files(luma, tmp_path_factory):
+    folder = tmp_path_factory.mktemp("raw")
+    gray = folder / "clip.gray"
+    gray.write_bytes(luma.tobytes())
+    # yuv420p: the same luma plane followed by (noisy) chroma that must not affect the scores.
+    chroma = np.random.default_rng(0).integers(0, 256, size=(len(luma), 2 * (W // 2) * (H // 2)), dtype=np.uint8)
+    yuv = folder / "clip.yuv"
+    yuv.write_bytes(np.concatenate([luma.reshape(len(luma), -1), chroma], axis=1).tobytes())
+    return {"gray": gray, "yuv420p": yuv}
+
+
+def _cfg(pix_fmt="gray", **overrides) -> UpscaleConfig:
+    raw = {"raw_size": f"{W}x{H}", "raw_pix_fmt": pix_fmt, "raw_fps": 25.0}
+    return replace(UpscaleConfig(score_cache=False), **raw, **overrides)
+
+
+@pytest.mark.parametrize("pix_fmt", ["gray", "yuv420p"])
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+def test_raw_scores_equal_video_scores(clip, raw_files, pix_fmt, mode, n):
+    video, _fps = compute_motion_scores(clip, replace(UpscaleConfig(score_cache=False), motion_mode=mode, sample_every_n=n))
+    scores, fps = compute_motion_scores(raw_files[pix_fmt], _cfg(pix_fmt, motion_mode=mode, sample_every_n=n))
+    assert len(video) <= len(scores) <= len(video) + 1 and fps == 25.0
+    np.testing.assert_array_equal(scores[:len(video)], video)
+
+
+def test_raw_downscale_and_chunks_equal_video(clip, raw_files):
+    video, _fps = compute_motion_scores(clip, UpscaleConfig(score_cache=False), max_width=80)
+    scores, _fps = compute_motion_scores(raw_files["gray"], _cfg(), max_width=80)
+    np.testing.assert_array_equal(scores, video)
+    chunked, _fps = compute_motion_scores(raw_files["gray"], _cfg(score_workers=2, score_chunk_frames=16), max_width=80)
+    np.testing.assert_array_equal(chunked, video)
+
+
+def test_mapped_luma_is_not_copied(raw_files, luma):
+    source = RawFrameSource(raw_files["yuv420p"], RawFormat(W, H, "yuv420p"))
+    try:
+        assert source.frame_count == len(luma)
+        assert source.seek(5) and source.grab()
+        frame = source.retrieve()
+        np.testing.assert_array_equal(frame, luma[5])
+        assert np.shares_memory(frame, source._map)
+    finally:
+        source.release()
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+def test_piped_frames_equal_mapped_frames(raw_files, tmp_path):
+    expected, _fps = compute_motion_scores(raw_files["yuv420p"], _cfg("yuv420p"))
+    pipe = tmp_path / "frames.pipe"
+    os.mkfifo(pipe)
+
+    def feed():
+        with open(pipe, "wb") as f:
+            f.write(raw_files["yuv420p"].read_bytes())
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    try:
+        scores, _fps = compute_motion_scores(pipe, _cfg("yuv420p", score_workers=4))  # pipes stay serial
+    finally:
+        writer.join()
+    np.testing.assert_array_equal(scores, expected)
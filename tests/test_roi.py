@@ -0,0 +1,65 @@
+# tests/test_roi.py
+from dataclasses import replace
+
+import cv2
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.frame_source import open_frame_source
+from Stages.motion_score import compute_motion_scores
+from Stages.score_kernels import score_detail
+from Stages.tile_store import compute_tile_store
+
+MAX_WIDTH = 160
+ROI = (40, 20, 200, 120)  # x, y, w, h in source pixels of the 320x180 clip
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(320, 180, 40, "bursts", seed=5), tmp_path_factory.mktemp("clips"))
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False), **overrides)
+
+
+def _crop_then_score(clip, roi, max_width):
+    # Crop each decoded frame, scale it by the full-frame factor, then score pairs.
+    x, y, w, h = roi
+    cap = cv2.VideoCapture(str(clip))
+    scale = max_width / float(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    size = (int(w * scale), int(h * scale))
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        gray = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+        frames.append(cv2.resize(gray, size, interpolation=cv2.INTER_AREA))
+    cap.release()
+    cfg = _cfg()
+    return [0.0] + [score_detail(a, b, cfg.tile_grid) for a, b in zip(frames, frames[1:])], size
+
+
+def test_roi_frames_never_larger_than_full_frame(clip):
+    full = open_frame_source(clip, "opencv", MAX_WIDTH)
+    cropped = open_frame_source(clip, "opencv", MAX_WIDTH, roi=ROI)
+    try:
+        full_frame = full.read()
+        roi_frame = cropped.read()
+    finally:
+        full.release()
+        cropped.release()
+    assert roi_frame.size <= full_frame.size
+    assert roi_frame.shape == (int(ROI[3] * 0.5), int(ROI[2] * 0.5))
+
+
+def test_roi_scores_match_crop_then_score(clip):
+    expected, size = _crop_then_score(clip, ROI, MAX_WIDTH)
+    scores, _fps = compute_motion_scores(clip, _cfg(score_roi="40,20,200,120"), max_width=MAX_WIDTH)
+    np.testing.assert_allclose(scores, expected, rtol=0, atol=1e-7)
+
+    _scores, _fps, store = compute_tile_store(clip, _cfg(score_roi="40,20,200,120"), max_width=MAX_WIDTH)
+    assert tuple(store.frame_size) == size
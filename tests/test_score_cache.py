@@ -0,0 +1,91 @@
+# tests/test_score_cache.py
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores
+from Stages.score_cache import ScoreCache, cached_motion_scores, cached_score_stream, lookup_scores
+
+
+def _put_entries(root, worker, count):
+    cache = ScoreCache(root)
+    for i in range(count):
+        cache.put(f"w{worker}_{i}", np.full(10, worker + i / 100.0), 30.0)
+
+
+def test_concurrent_puts_keep_every_entry(tmp_path):
+    workers, count = 4, 15
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(_put_entries, tmp_path, w, count) for w in range(workers)]:
+            future.result()
+    entries = json.loads((tmp_path / "index.json").read_text(encoding="utf-8"))["entries"]
+    assert len(entries) == workers * count
+    assert not (tmp_path / "index.lock").exists()
+    scores, fps = ScoreCache(tmp_path).get("w2_7")
+    np.testing.assert_array_equal(scores, np.full(10, 2.07))
+    assert fps == 30.0
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 70, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+def test_cached_scores_round_trip(clip, tmp_path):
+    cfg = UpscaleConfig()
+    cache = ScoreCache(tmp_path)
+    fresh, fresh_fps = compute_motion_scores(clip, cfg)
+    first, _fps = cached_motion_scores(clip, cfg, cache)
+    second, fps = cached_motion_scores(clip, cfg, cache)
+    assert (cache.misses, cache.hits) == (1, 1)
+    np.testing.assert_array_equal(first, fresh)
+    np.testing.assert_array_equal(second, fresh)
+    assert fps == fresh_fps
+
+    streamed, _fps = cached_score_stream(clip, cfg, ScoreCache(tmp_path))
+    np.testing.assert_array_equal(np.fromiter(streamed, dtype=np.float64), fresh)
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"motion_mode": "global"},
+        {"tile_grid": (4, 4)},
+        {"sample_every_n": 2},
+        {"score_roi": "0,0,80,45"},
+        {"static_cascade": True},
+    ],
+)
+def test_cache_key_changes_with_scoring_params(clip, tmp_path, overrides):
+    cfg = UpscaleConfig()
+    cache = ScoreCache(tmp_path)
+    key, _hit = lookup_scores(cache, clip, cfg)
+    cached_motion_scores(clip, cfg, cache)
+    changed = replace(cfg, **overrides)
+    other, hit = lookup_scores(cache, clip, changed)
+    assert other != key and hit is None
+    scores, _fps = cached_motion_scores(clip, changed, cache)
+    np.testing.assert_array_equal(scores, compute_motion_scores(clip, changed)[0])
+
+
+def test_cache_key_ignores_segmenting_params(clip, tmp_path):
+    cache = ScoreCache(tmp_path)
+    key, _hit = lookup_scores(cache, clip, UpscaleConfig())
+    same, _hit = lookup_scores(cache, clip, UpscaleConfig(sensitivity=0.5, min_segment_frames=3))
+    assert same == key
+
+
+def test_cache_key_changes_with_file_content(clip, tmp_path):
+    cache = ScoreCache(tmp_path / "cache")
+    copy = tmp_path / "copy.mp4"
+    copy.write_bytes(clip.read_bytes())
+    key, _hit = lookup_scores(cache, copy, UpscaleConfig())
+    assert lookup_scores(cache, clip, UpscaleConfig())[0] == key  # content, not path
+    with copy.open("ab") as f:
+        f.write(b"\0")
+    assert lookup_scores(cache, copy, UpscaleConfig())[0] != key
@@ -0,0 +1,63 @@
+# tests/test_score_file.py
+import numpy as np
+import pytest
+
+from Stages.score_file import ALIGN, PREAMBLE, load_score_file, read_score_header, write_score_file
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(11)
+    return rng.random(1000) * 0.2
+
+
+def test_f32_round_trip_is_exact_in_float32(tmp_path, scores):
+    path = tmp_path / "scores.e2xs"
+    write_score_file(path, scores, 29.97, settings={"tile_grid": [8, 8]}, extra={"source": "clip.mp4"})
+    loaded, fps, header = load_score_file(path)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, scores.astype(np.float32))
+    assert fps == 29.97
+    assert header["settings"] == {"tile_grid": [8, 8]}
+    assert header["source"] == "clip.mp4"
+    assert header["format"] == "f32"
+
+
+def test_u16_round_trip_within_one_quantization_step(tmp_path, scores):
+    path = tmp_path / "scores.e2xs"
+    write_score_file(path, scores, 24.0, fmt="u16")
+    loaded, _fps, header = load_score_file(path)
+    step = scores.max() / 65535.0
+    assert header["scale"] == pytest.approx(step)
+    assert np.max(np.abs(loaded - scores)) <= step / 2 + 1e-7
+
+
+def test_f16_round_trip_keeps_shape(tmp_path):
+    tiles = np.random.default_rng(2).random((20, 9, 16)).astype(np.float16)
+    path = tmp_path / "tiles.e2xs"
+    write_score_file(path, tiles, 30.0, fmt="f16")
+    loaded, _fps, header = load_score_file(path)
+    assert header["frame_count"] == 20
+    np.testing.assert_array_equal(loaded, tiles)
+
+
+def test_values_start_on_an_aligned_offset(tmp_path, scores):
+    path = tmp_path / "scores.e2xs"
+    write_score_file(path, scores, 30.0)
+    _header, offset, dtype = read_score_header(path)
+    assert offset % ALIGN == 0 and offset >= PREAMBLE.size
+    assert path.stat().st_size == offset + scores.size * dtype.itemsize
+
+
+def test_empty_and_foreign_files(tmp_path):
+    path = tmp_path / "empty.e2xs"
+    write_score_file(path, [], 30.0, fmt="u16")
+    loaded, fps, _header = load_score_file(path)
+    assert loaded.shape == (0,) and fps == 30.0
+
+    foreign = tmp_path / "scores.npy"
+    np.save(foreign, np.zeros(4))
+    with pytest.raises(ValueError, match="Not an Eternal2x score file"):
+        load_score_file(foreign)
+    with pytest.raises(ValueError, match="Unknown score format"):
+        write_score_file(tmp_path / "x.e2xs", [0.0], 30.0, fmt="f64")
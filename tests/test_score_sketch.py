@@ -0,0 +1,85 @@
+# tests/test_score_sketch.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores
+from Stages.score_sketch import ScoreSketch, auto_threshold
+from tests.random_cases import random_scores
+
+
+def _finite_scores(seed: int) -> np.ndarray:
+    scores = random_scores(np.random.default_rng(seed))
+    return scores[~np.isnan(scores)]  # the sketch skips NaN
+
+
+def _sketch(values, bins=4096) -> ScoreSketch:
+    sketch = ScoreSketch(bins)
+    sketch.update(values)
+    return sketch
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("fraction", [0.01, 0.1, 0.5])
+def test_top_fraction_threshold_is_exact_to_one_bin(seed, fraction):
+    scores = _finite_scores(seed)
+    sketch = _sketch(scores)
+    t = sketch.top_fraction_threshold(fraction)
+    if not len(scores):
+        assert t == 1.0
+        return
+    need = max(1.0, fraction * len(scores))
+    assert np.count_nonzero(scores >= t) >= need
+    # One bin higher would leave fewer than `fraction` of the scores above it.
+    assert np.count_nonzero(scores >= t + 1.0 / sketch.bins) < need or t >= 1.0
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99])
+def test_quantile_within_one_bin_width(seed, q):
+    scores = _finite_scores(seed)
+    if not len(scores):
+        assert ScoreSketch().quantile(q) == 0.0
+        return
+    sketch = _sketch(scores)
+    exact = float(np.quantile(scores, q, method="inverted_cdf"))
+    assert abs(sketch.quantile(q) - exact) <= 1.0 / sketch.bins + 1e-12
+
+
+def test_merge_and_removal_are_exact():
+    scores = _finite_scores(3)
+    parts = np.array_split(scores, 5)
+    merged = ScoreSketch(4096)
+    for part in parts:
+        merged.merge(_sketch(part))
+    np.testing.assert_array_equal(merged.counts, _sketch(scores).counts)
+
+    merged.update(parts[0], weight=-1)
+    np.testing.assert_array_equal(merged.counts, _sketch(np.concatenate(parts[1:])).counts)
+    with pytest.raises(ValueError):
+        merged.merge(ScoreSketch(1024))
+
+
+def test_split_threshold_separates_two_modes():
+    rng = np.random.default_rng(0)
+    still = rng.normal(0.01, 0.002, 900).clip(0, 1)
+    motion = rng.normal(0.2, 0.02, 100).clip(0, 1)
+    t = _sketch(np.concatenate([still, motion])).split_threshold()
+    assert still.max() < t <= motion.min()
+    assert _sketch(np.full(10, 0.5)).split_threshold() is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scoring_sketch_counts_every_score(tmp_path_factory, workers):
+    clip = make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+    cfg = UpscaleConfig(score_cache=False, score_workers=workers, score_chunk_frames=32)
+    sketch = ScoreSketch()
+    scores, _fps = compute_motion_scores(clip, cfg, sketch=sketch)
+    np.testing.assert_array_equal(sketch.counts, _sketch(scores, sketch.bins).counts)
+
+    threshold, info = auto_threshold(sketch, replace(cfg, auto_sensitivity="percent", auto_motion_percent=10.0))
+    assert not info["fallback"]
+    assert np.count_nonzero(scores >= threshold) >= 0.1 * len(scores)
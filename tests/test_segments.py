@@ -0,0 +1,26 @@
+# tests/test_segments.py
+import numpy as np
+
+from Pipeline.config import UpscaleConfig
+from Stages.frame_detect import detect_motion_segments
+from tests import baseline
+from tests.random_cases import random_config, random_scores
+
+
+def as_pairs(segments) -> list:
+    return list(zip(segments["start"].tolist(), segments["end"].tolist()))
+
+
+def test_detect_motion_segments_matches_loop():
+    rng = np.random.default_rng(12)
+    for case in range(3000):
+        scores, cfg = random_scores(rng), random_config(rng)
+        expected = baseline.detect_motion_segments(scores.tolist(), cfg)
+        assert as_pairs(detect_motion_segments(scores, cfg)) == expected, f"case {case}: {cfg}"
+
+
+def test_detect_motion_segments_accepts_lists_and_empty_input():
+    cfg = UpscaleConfig(sensitivity=0.5, merge_gap_frames=1, min_segment_frames=2)
+    scores = [0.0, 0.6, 0.7, 0.1, 0.9, 0.9, 0.0, 0.0, 0.0, 0.8]
+    assert as_pairs(detect_motion_segments(scores, cfg)) == [(1, 5)]
+    assert len(detect_motion_segments([], cfg)) == 0
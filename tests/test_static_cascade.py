@@ -0,0 +1,60 @@
+# tests/test_static_cascade.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.frame_detect import detect_motion_segments
+from Stages.motion_score import compute_motion_scores
+
+FLOOR = 0.02
+
+
+def _cfg(**overrides) -> UpscaleConfig:
+    return replace(UpscaleConfig(score_cache=False, sensitivity=0.03), **overrides)
+
+
+@pytest.mark.parametrize("pattern", ["bursts", "static", "pan"])
+@pytest.mark.parametrize("mode", ["detail", "global"])
+@pytest.mark.parametrize("n", [1, 3])
+def test_cascade_is_exact_above_the_floor(tmp_path_factory, pattern, mode, n):
+    clip = make_clip(ClipSpec(160, 90, 130, pattern, seed=3), tmp_path_factory.mktemp("clips"))
+    full, _fps = compute_motion_scores(clip, _cfg(motion_mode=mode, sample_every_n=n))
+    stats = {}
+    cfg = _cfg(motion_mode=mode, sample_every_n=n, static_cascade=True, static_floor=FLOOR)
+    cascade, _fps = compute_motion_scores(clip, cfg, stats=stats)
+
+    # Samples that took the fast path keep their thumbnail score, which is under the
+    # floor (per frame: under floor / n); every other sample is the full-kernel score.
+    fast = cascade != full
+    assert np.all(cascade[fast] * n < FLOOR + 1e-12)
+    assert stats["cascade_samples"] > 0
+    if pattern == "static":
+        assert stats["cascade_fast"] == stats["cascade_samples"]
+    if pattern == "static" and mode == "global":
+        # |mean(a) - mean(b)| <= mean(|a - b|) per block, so the thumbnail never scores above the full kernel.
+        assert np.all(cascade <= full + 1e-6)
+    if pattern == "pan":
+        assert stats["cascade_fast"] == 0
+        np.testing.assert_array_equal(cascade, full)
+
+
+def test_cascade_keeps_the_segments(tmp_path_factory):
+    clip = make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+    cfg = _cfg()
+    full, _fps = compute_motion_scores(clip, cfg)
+    cascade, _fps = compute_motion_scores(clip, _cfg(static_cascade=True, static_floor=FLOOR))
+    np.testing.assert_array_equal(detect_motion_segments(cascade, cfg), detect_motion_segments(full, cfg))
+
+
+def test_chunked_cascade_equals_serial(tmp_path_factory):
+    clip = make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+    serial_stats, chunked_stats = {}, {}
+    serial, _fps = compute_motion_scores(clip, _cfg(static_cascade=True), stats=serial_stats)
+    cfg = _cfg(static_cascade=True, score_workers=2, score_chunk_frames=32)
+    chunked, _fps = compute_motion_scores(clip, cfg, stats=chunked_stats)
+    np.testing.assert_array_equal(chunked, serial)
+    assert chunked_stats["cascade_fast"] == serial_stats["cascade_fast"]
+    assert chunked_stats["cascade_samples"] == serial_stats["cascade_samples"]
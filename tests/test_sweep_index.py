@@ -0,0 +1,44 @@
+# tests/test_sweep_index.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Stages.frame_detect import SweepIndex
+from tests import baseline
+from tests.random_cases import random_config, random_scores
+
+
+def _thresholds(rng: np.random.Generator, scores: np.ndarray, index: SweepIndex) -> np.ndarray:
+    # Exact score values and breakpoints hit the >= ties; the rest probe between them.
+    finite = scores[np.isfinite(scores)]
+    picks = [rng.random(4), [0.0, 1.0, np.inf]]
+    if finite.size:
+        picks.append(rng.choice(finite, size=min(6, finite.size)))
+    if index.breakpoints().size:
+        picks.append(rng.choice(index.breakpoints(), size=min(4, index.breakpoints().size)))
+    return np.concatenate(picks)
+
+
+def test_sweep_segments_and_curve_match_loop():
+    rng = np.random.default_rng(14)
+    for case in range(1500):
+        scores, cfg = random_scores(rng), random_config(rng)
+        index = SweepIndex.from_config(scores, cfg)
+        thresholds = _thresholds(rng, scores, index)
+        min_len = cfg.min_segment_frames + int(rng.integers(0, 3))
+        curve = index.curve(thresholds, min_segment_frames=min_len)
+        for i, t in enumerate(thresholds.tolist()):
+            at_t = replace(cfg, sensitivity=t, min_segment_frames=min_len)
+            expected = baseline.detect_motion_segments(scores.tolist(), at_t)
+            got = index.segments(t, min_segment_frames=min_len)
+            assert list(zip(got["start"].tolist(), got["end"].tolist())) == expected, f"case {case}, t={t}"
+            assert curve["segments"][i] == len(expected), f"case {case}, t={t}"
+            assert curve["motion_frames"][i] == sum(e - s + 1 for s, e in expected), f"case {case}, t={t}"
+            assert curve["above_frames"][i] == int(np.count_nonzero(scores >= t)), f"case {case}, t={t}"
+
+
+def test_min_segment_frames_cannot_go_below_the_index():
+    index = SweepIndex(np.linspace(0.0, 1.0, 50), merge_gap_frames=2, min_segment_frames=4)
+    with pytest.raises(ValueError):
+        index.segments(0.5, min_segment_frames=3)
@@ -0,0 +1,60 @@
+# tests/test_tile_means.py
+import cv2
+import numpy as np
+import pytest
+
+from Stages.score_kernels import parse_tile_grid, score_detail, tile_means
+from tests.baseline import tile_means_loop, top_fraction_mean
+
+
+def _blurred_diff(prev: np.ndarray, curr: np.ndarray) -> np.ndarray:
+    return cv2.GaussianBlur(cv2.absdiff(prev, curr), (5, 5), 0)
+
+
+def _random_frame(rng: np.random.Generator, h: int, w: int) -> np.ndarray:
+    return rng.integers(0, 256, size=(h, w), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_tile_means_match_per_tile_loop(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(250):
+        gx, gy = int(rng.integers(1, 20)), int(rng.integers(1, 20))
+        h, w = int(rng.integers(gy, 200)), int(rng.integers(gx, 200))
+        diff = _random_frame(rng, h, w)
+        expected = tile_means_loop(diff, gx, gy)
+        got = tile_means(diff, gx, gy)
+        assert got.shape == (gy, gx)
+        assert got.dtype == np.float32
+        np.testing.assert_allclose(got, expected, rtol=0, atol=1e-7, err_msg=f"{w}x{h} grid {gx}x{gy}")
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice", "ignore:invalid value encountered")
+def test_grid_finer_than_frame_keeps_loop_behaviour():
+    diff = np.random.default_rng(3).integers(0, 256, size=(5, 6), dtype=np.uint8)
+    np.testing.assert_array_equal(tile_means(diff, 8, 8), tile_means_loop(diff, 8, 8))
+
+
+def test_tile_means_reuses_sat_buffer():
+    rng = np.random.default_rng(7)
+    diff = _random_frame(rng, 90, 160)
+    sat = np.empty((91, 161), dtype=np.int32)
+    np.testing.assert_array_equal(tile_means(diff, 8, 8, sat=sat), tile_means(diff, 8, 8))
+
+
+def test_wide_frames_fall_back_to_float64_sums():
+    # 4096x2160 * 255 no longer fits int32 sums.
+    diff = np.full((2160, 4096), 255, dtype=np.uint8)
+    diff[:1080, :2048] = 0
+    np.testing.assert_allclose(tile_means(diff, 2, 2), [[0.0, 1.0], [1.0, 1.0]], atol=1e-7)
+
+
+@pytest.mark.parametrize("grid", [8, (16, 9), "4x3", "5,7"])
+def test_score_detail_matches_baseline(grid):
+    rng = np.random.default_rng(11)
+    gx, gy = parse_tile_grid(grid)
+    for _ in range(50):
+        h, w = int(rng.integers(gy, 120)), int(rng.integers(gx, 200))
+        prev, curr = _random_frame(rng, h, w), _random_frame(rng, h, w)
+        expected = top_fraction_mean(tile_means_loop(_blurred_diff(prev, curr), gx, gy))
+        assert score_detail(prev, curr, grid) == pytest.approx(expected, abs=1e-7)
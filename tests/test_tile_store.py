@@ -0,0 +1,74 @@
+# tests/test_tile_store.py
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from Pipeline.config import UpscaleConfig
+from Stages.bench_motion import ClipSpec, make_clip
+from Stages.motion_score import compute_motion_scores
+from Stages.score_kernels import tile_edges
+from Stages.tile_store import TileStore, compute_tile_store
+
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    return make_clip(ClipSpec(160, 90, 130, "bursts", seed=3), tmp_path_factory.mktemp("clips"))
+
+
+@pytest.fixture(scope="module")
+def store(clip):
+    scores, _fps, store = compute_tile_store(clip, UpscaleConfig(score_cache=False))
+    return scores, store
+
+
+def _direct(clip, **overrides):
+    return compute_motion_scores(clip, replace(UpscaleConfig(score_cache=False), **overrides))[0]
+
+
+def test_base_grid_scores_within_float16_precision(clip, store):
+    scores, store = store
+    assert store.tiles.shape == (len(scores), 8, 8)
+    # float16 tile means keep ~3 significant digits.
+    np.testing.assert_allclose(store.detail_scores(), scores, rtol=1e-3, atol=1e-6)
+    np.testing.assert_allclose(store.global_scores(), _direct(clip, motion_mode="global"), rtol=1e-3, atol=1e-6)
+
+
+@pytest.mark.parametrize("grid", [(4, 4), (2, 2), (4, 2)])
+def test_pooled_grids_match_direct_scoring_on_aligned_edges(tmp_path_factory, grid):
+    # 160x96: every coarse edge falls on a base edge, so only float16 rounding remains.
+    clip = make_clip(ClipSpec(160, 96, 70, "bursts", seed=4), tmp_path_factory.mktemp("aligned"))
+    _scores, _fps, store = compute_tile_store(clip, UpscaleConfig(score_cache=False))
+    np.testing.assert_allclose(store.scores(grid=grid), _direct(clip, tile_grid=grid), rtol=1e-3, atol=1e-6)
+
+
+@pytest.mark.parametrize("grid", [(4, 4), (2, 2), (4, 2)])
+def test_pooled_grids_stay_within_edge_shift_bound(clip, store, grid):
+    _scores, store = store
+    (gx, gy), (w, h) = store.grid, store.frame_size
+    # A pooled tile can gain or lose `shift` rows (columns) of the direct tile, each
+    # row contributing at most 1.0 to the tile mean: error < 2 * shift / tile rows.
+    bound = 0.0
+    for length, base, coarse in ((h, gy, grid[1]), (w, gx, grid[0])):
+        pooled = tile_edges(length, base)[::base // coarse]
+        direct = tile_edges(length, coarse)
+        shift = int(np.max(np.abs(pooled - direct)))
+        bound += 2.0 * shift / float(np.min(np.diff(direct)))
+    np.testing.assert_allclose(store.scores(grid=grid), _direct(clip, tile_grid=grid), rtol=0, atol=bound + 1e-3)
+
+
+def test_save_load_round_trip(tmp_path, store):
+    _scores, store = store
+    path = tmp_path / "clip_tiles.e2xs"
+    store.save(path)
+    loaded = TileStore.load(path)
+    np.testing.assert_array_equal(loaded.tiles, store.tiles)
+    assert loaded.frame_size == store.frame_size
+    assert loaded.fps == store.fps
+    np.testing.assert_array_equal(loaded.detail_scores(), store.detail_scores())
+
+
+def test_non_divisor_grid_is_rejected(store):
+    _scores, store = store
+    with pytest.raises(ValueError, match="not a divisor"):
+        store.scores(grid=(3, 3))
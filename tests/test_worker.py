@@ -0,0 +1,122 @@
+# tests/test_worker.py
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from Stages import worker_client
+from Stages.worker_client import LOST_EXIT, PING, read_state, request, run
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    # worker.json (port + token) goes to a private folder instead of the user's cache.
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    return tmp_path
+
+
+def _fake_daemon(replies):
+    # One-shot server that reads the request line, sends `replies` and hangs up.
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.server.requests.append(json.loads(self.rfile.readline()))
+            for reply in replies:
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+    server = socketserver.TCPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    threading.Thread(target=server.handle_request, daemon=True).start()
+    return server, {"port": server.server_address[1], "token": "t"}
+
+
+@pytest.fixture
+def no_fallback(monkeypatch):
+    # Records every spawn / in-process run that run() falls back to.
+    calls = []
+    monkeypatch.setattr(worker_client, "spawn_daemon", lambda: calls.append("spawn"))
+    monkeypatch.setattr(worker_client, "run_local", lambda stage, args: calls.append(("local", stage)) or 0)
+    return calls
+
+
+def test_finished_stage_returns_its_exit_code(capsys):
+    server, state = _fake_daemon([{"started": True}, {"out": "hello"}, {"err": "warn"}, {"exit": 4, "seconds": 0.5}])
+    code, timings = request(state, PING, ["--x"])
+    server.server_close()
+    assert code == 4 and timings["stage_s"] == 0.5 and "lost" not in timings
+    assert server.requests[0]["args"] == ["--x"] and server.requests[0]["token"] == "t"
+    out = capsys.readouterr()
+    assert out.out == "hello\n" and out.err == "warn\n"
+
+
+def test_connection_lost_mid_stage_is_not_retried(monkeypatch, no_fallback):
+    server, state = _fake_daemon([{"started": True}, {"out": "half way"}])  # then the daemon dies
+    monkeypatch.setattr(worker_client, "read_state", lambda: state)
+    assert run("Stages.resolve_regroup", []) == LOST_EXIT
+    server.server_close()
+    assert no_fallback == []
+    assert len(server.requests) == 1
+
+
+def test_restart_request_falls_back_to_a_fresh_run(monkeypatch, no_fallback):
+    server, state = _fake_daemon([{"restart": True}])
+    assert request(state, PING, []) is None
+    server.server_close()
+
+    server, state = _fake_daemon([{"restart": True}])
+    monkeypatch.setattr(worker_client, "read_state", lambda: state)
+    assert run("Stages.resolve_regroup", []) == 0
+    server.server_close()
+    assert no_fallback == ["spawn", ("local", "Stages.resolve_regroup")]
+
+
+def test_no_daemon_means_not_started():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # nothing listens here once the socket is closed
+    assert request({"port": port, "token": "t"}, PING, []) is None
+
+
+@pytest.fixture
+def daemon(state_dir):
+    # A real daemon process (in-process, its stdout redirection would swallow the client's echo).
+    env = dict(os.environ, XDG_CACHE_HOME=str(state_dir))
+    root = Path(__file__).resolve().parent.parent
+    proc = subprocess.Popen([sys.executable, "-m", "Stages.worker_daemon", "--idle", "60"], cwd=root, env=env)
+    deadline = time.monotonic() + 60.0
+    while read_state() is None:
+        assert proc.poll() is None and time.monotonic() < deadline, "worker daemon did not start"
+        time.sleep(0.05)
+    try:
+        yield proc
+    finally:
+        request(read_state(), "stop", [], echo=False)
+        assert proc.wait(timeout=10) == 0
+        assert read_state() is None  # unpublished on exit
+
+
+def test_daemon_runs_stages_and_forwards_output(daemon, capsys):
+    state = read_state()
+    code, timings = request(state, PING, [])
+    assert code == 0 and "start_ms" in timings
+    capsys.readouterr()
+
+    code, _timings = request(state, "Stages.resolve_regroup", ["--help"])
+    assert code == 0
+    assert "usage: " in capsys.readouterr().out
+
+    code, _timings = request(state, "Stages.nope", [])
+    assert code == 2
+    assert "Unknown stage" in capsys.readouterr().err
+
+
+def test_daemon_ignores_other_tokens(daemon):
+    state = dict(read_state(), token="not-the-token")
+    assert request(state, PING, []) is None
+    assert request(read_state(), PING, [])[0] == 0